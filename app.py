@@ -7,52 +7,84 @@ This app demonstrates Google ADK's SequentialAgent pattern:
 3. Insight Pipeline (SequentialAgent: Visualization → Explanation)
 """
 
-import gradio as gr
 import asyncio
+import os
+
+import gradio as gr
 from dotenv import load_dotenv
+from google.adk.agents.run_config import RunConfig, StreamingMode
 from google.genai import types
 
-# Import marketing agent runners
-from bi_agent import root_runner, editor_runner
-
-# Load environment variables from bi_agent/.env
+# Load environment variables from bi_agent/.env (before bi_agent reads its settings on import)
 load_dotenv(dotenv_path='bi_agent/.env')
 
+# Import marketing agents and the session managers of their runners
+from bi_agent import strategist_agent
+from bi_agent.campaign_cache import campaign_cache
+from bi_agent.session_manager import campaign_sessions, copywriter_sessions, editor_sessions, strategist_sessions
 
-async def run_campaign_async(user_text: str):
-    """
-    Run the marketing campaign builder pipeline using root_runner.
 
-    Pipeline:
-    1) Strategist Agent -> strategy_text
-    2) Copywriter Agent -> campaign_text
+# Token streaming: partial events carry the text chunks as they arrive
+STREAMING_CONFIG = RunConfig(streaming_mode=StreamingMode.SSE)
+
+
+def _event_text(event) -> str:
+    """Visible text of an event (model thoughts excluded)."""
+    if not event.content or not event.content.parts:
+        return ""
+    return "".join(part.text for part in event.content.parts if part.text and not part.thought)
+
+
+async def stream_agent_async(sessions, user_text: str, results: dict):
     """
-    # Create session
-    session = await root_runner.session_service.create_session(
-        user_id="user",
-        app_name="marketing_agent"
-    )
+    Run an agent (pipeline) with token streaming.
 
-    # Create user message
+    Yields (author, text_so_far) whenever an agent produced more text.
+    State changes (e.g. strategy_text, campaign_text) are collected into
+    results as they arrive. The run's session is deleted afterwards.
+    """
     content = types.Content(
         role="user",
         parts=[types.Part(text=user_text)]
     )
 
-    # Run the pipeline
-    events_async = root_runner.run_async(
-        user_id="user",
-        session_id=session.id,
-        new_message=content
-    )
+    async with sessions.session(user_id="user") as session:
+        events_async = sessions.runner.run_async(
+            user_id="user",
+            session_id=session.id,
+            new_message=content,
+            run_config=STREAMING_CONFIG
+        )
+
+        texts = {}
+        async for event in events_async:
+            if event.actions and event.actions.state_delta:
+                for key, value in event.actions.state_delta.items():
+                    results[key] = value
+
+            text = _event_text(event)
+            if not text:
+                continue
+            if event.partial:
+                texts[event.author] = texts.get(event.author, "") + text
+            else:
+                # The final event repeats the whole response
+                texts[event.author] = text
+            yield event.author, texts[event.author]
 
-    # Extract results from state
-    results = {}
-    async for event in events_async:
-        if event.actions and event.actions.state_delta:
-            for key, value in event.actions.state_delta.items():
-                results[key] = value
 
+async def run_campaign_async(user_text: str):
+    """
+    Run the marketing campaign builder pipeline using root_runner
+    (sessions managed by campaign_sessions).
+
+    Pipeline:
+    1) Strategist Agent -> strategy_text
+    2) Copywriter Agent -> campaign_text
+    """
+    results = {}
+    async for _ in stream_agent_async(campaign_sessions, user_text, results):
+        pass
     return results
 
 
@@ -66,68 +98,179 @@ Tonalität/Brand Voice: {tone}
 Zusatzinfos: {extra or ""}""".strip()
 
 
-async def process_request_async(product, audience, goal, platform, tone, extra):
+def format_platform_outputs(texts: dict) -> str:
+    """Combine the copywriter outputs of several platforms into one text."""
+    return "\n\n---\n\n".join(f"# {platform}\n\n{text or 'Wird geschrieben …'}" for platform, text in texts.items())
+
+
+async def get_strategy_async(brief: str, fresh: bool = False):
+    """
+    Run the strategist alone, with strategy_text cached per brief.
+
+    Yields the strategy text so far while it is being written.
+    """
+    cache_key = campaign_cache.make_key(brief, agents=(strategist_agent,))
+    cached = None if fresh else campaign_cache.get(cache_key)
+    if cached is not None and cached.get("strategy_text"):
+        yield cached["strategy_text"]
+        return
+
+    results = {}
+    async for _, text in stream_agent_async(strategist_sessions, brief, results):
+        yield text
+
+    if results.get("strategy_text"):
+        campaign_cache.put(cache_key, {"strategy_text": results["strategy_text"]})
+        yield results["strategy_text"]
+
+
+async def _write_platform_async(platform: str, prompt: str, texts: dict, updates: asyncio.Queue):
+    """Run the copywriter for one platform, publishing its text as it streams."""
+    try:
+        results = {}
+        async for _, text in stream_agent_async(copywriter_sessions, prompt, results):
+            texts[platform] = text
+            updates.put_nowait(platform)
+        texts[platform] = results.get("campaign_text", "Kein Ergebnis erhalten.")
+        return results
+    except Exception as e:
+        texts[platform] = f"Error: {str(e)}"
+        raise
+    finally:
+        updates.put_nowait(platform)
+
+
+async def process_multi_platform_async(product, audience, goal, platforms, tone, extra, fresh=False):
+    """
+    Generate campaigns for several platforms with one shared strategy.
+
+    The strategist runs once per brief (cached), then one copywriter call
+    per platform runs in parallel, so latency is about one strategist call
+    plus the slowest copywriter call. Platforms whose campaign is already
+    cached are not regenerated (unless fresh is set).
+    """
+    texts = {platform: "" for platform in platforms}
+    prompts = {platform: build_campaign_prompt(product, audience, goal, platform, tone, extra)
+               for platform in platforms}
+    cache_keys = {platform: campaign_cache.make_key(prompt) for platform, prompt in prompts.items()}
+
+    missing = []
+    for platform in platforms:
+        cached = None if fresh else campaign_cache.get(cache_keys[platform])
+        if cached is not None and cached.get("campaign_text"):
+            texts[platform] = cached["campaign_text"]
+        else:
+            missing.append(platform)
+    if fresh:
+        campaign_cache.record_bypass()
+    if not missing:
+        yield format_platform_outputs(texts)
+        return
+
+    brief = build_campaign_prompt(product, audience, goal, ", ".join(platforms), tone, extra)
+    yield "Strategie wird erstellt …"
+    strategy_text = ""
+    async for strategy_text in get_strategy_async(brief, fresh=fresh):
+        yield f"Strategie wird erstellt …\n\n{strategy_text}"
+
+    updates = asyncio.Queue()
+    gathered = asyncio.gather(*(
+        _write_platform_async(
+            platform,
+            f"{prompts[platform]}\n\nKampagnenrichtung vom Strategist:\n{strategy_text}",
+            texts,
+            updates
+        )
+        for platform in missing
+    ), return_exceptions=True)
+
+    try:
+        while not gathered.done():
+            update = asyncio.ensure_future(updates.get())
+            await asyncio.wait({gathered, update}, return_when=asyncio.FIRST_COMPLETED)
+            update.cancel()
+            yield format_platform_outputs(texts)
+    finally:
+        # Client disconnected: stop the remaining copywriter calls
+        gathered.cancel()
+
+    for platform, results in zip(missing, gathered.result()):
+        if isinstance(results, dict) and results.get("campaign_text"):
+            campaign_cache.put(cache_keys[platform], {"strategy_text": strategy_text,
+                                                      "campaign_text": results["campaign_text"]})
+    yield format_platform_outputs(texts)
+
+
+async def process_request_async(product, audience, goal, platform, tone, extra, fresh=False):
     try:
         # Validate inputs
         if not product.strip() or not audience.strip() or not goal.strip():
-            return "Bitte Produkt, Zielgruppe und Marketingziel ausfüllen."
+            yield "Bitte Produkt, Zielgruppe und Marketingziel ausfüllen."
+            return
+
+        platforms = [platform] if isinstance(platform, str) else list(platform or [])
+        if not platforms:
+            yield "Bitte mindestens eine Plattform auswählen."
+            return
+        if len(platforms) > 1:
+            async for text in process_multi_platform_async(product, audience, goal, platforms, tone, extra,
+                                                           fresh=fresh):
+                yield text
+            return
+        platform = platforms[0]
 
         user_text = build_campaign_prompt(product, audience, goal, platform, tone, extra)
 
-        # Run marketing pipeline
-        results = await run_campaign_async(user_text)
+        # Repeat requests are answered from the campaign cache unless a
+        # fresh variant is requested (which then replaces the cached one)
+        cache_key = campaign_cache.make_key(user_text)
+        if fresh:
+            campaign_cache.record_bypass()
+        else:
+            cached = campaign_cache.get(cache_key)
+            if cached is not None and cached.get("campaign_text"):
+                yield cached["campaign_text"]
+                return
+
+        # Run marketing pipeline: show the strategy while it is written,
+        # then the copywriter's posts token by token
+        yield "Strategie wird erstellt …"
+        results = {}
+        async for author, text in stream_agent_async(campaign_sessions, user_text, results):
+            if author == strategist_agent.name:
+                yield f"Strategie wird erstellt …\n\n{text}"
+            else:
+                yield text
 
         # Final output from copywriter agent
-        return results.get("campaign_text", "Kein Ergebnis erhalten.")
+        if results.get("campaign_text"):
+            campaign_cache.put(cache_key, {key: results[key] for key in ("strategy_text", "campaign_text")
+                                           if key in results})
+        yield results.get("campaign_text", "Kein Ergebnis erhalten.")
 
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
 
-def process_request(product, audience, goal, platform, tone, extra):
-    try:
-        return asyncio.run(process_request_async(product, audience, goal, platform, tone, extra))
-    except Exception as e:
-        return f"Error: {str(e)}"
-
 async def refine_async(current_output: str, refine_text: str):
-    if not (current_output or "").strip():
-        return "Kein Output vorhanden. Bitte erst eine Kampagne generieren."
-    if not (refine_text or "").strip():
-        return "Bitte eine Verfeinerung eingeben (z.B. 'kürzer', 'mehr B2B', 'weniger Aufzählungen')."
-
-    session = await editor_runner.session_service.create_session(
-        user_id="user",
-        app_name="marketing_editor"
-    )
-
-    content = types.Content(
-        role="user",
-        parts=[types.Part(
-            text=f"CURRENT OUTPUT:\n{current_output}\n\nREFINE INSTRUCTION:\n{refine_text}"
-        )]
-    )
-
-    events_async = editor_runner.run_async(
-        user_id="user",
-        session_id=session.id,
-        new_message=content
-    )
+    try:
+        if not (current_output or "").strip():
+            yield "Kein Output vorhanden. Bitte erst eine Kampagne generieren."
+            return
+        if not (refine_text or "").strip():
+            yield "Bitte eine Verfeinerung eingeben (z.B. 'kürzer', 'mehr B2B', 'weniger Aufzählungen')."
+            return
 
-    results = {}
-    async for event in events_async:
-        if event.actions and event.actions.state_delta:
-            for key, value in event.actions.state_delta.items():
-                results[key] = value
+        user_text = f"CURRENT OUTPUT:\n{current_output}\n\nREFINE INSTRUCTION:\n{refine_text}"
 
-    return results.get("refined_text", "Kein Refinement erhalten.")
+        results = {}
+        async for _, text in stream_agent_async(editor_sessions, user_text, results):
+            yield text
 
+        yield results.get("refined_text", "Kein Refinement erhalten.")
 
-def refine(current_output: str, refine_text: str):
-    try:
-        return asyncio.run(refine_async(current_output, refine_text))
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
 
 
 
@@ -145,7 +288,12 @@ with gr.Blocks(title="Social Media Ad Builder") as demo:
 
     with gr.Row():
         product = gr.Textbox(label="Produkt / Dienstleistung", placeholder="z.B. Premium Notizbuch A5", lines=1)
-        platform = gr.Dropdown(["Instagram", "LinkedIn", "TikTok"], value="Instagram", label="Plattform")
+        platform = gr.Dropdown(
+            ["Instagram", "LinkedIn", "TikTok"],
+            value=["Instagram"],
+            multiselect=True,
+            label="Plattform(en)"
+        )
 
     with gr.Row():
         audience = gr.Textbox(label="Zielgruppe", placeholder="z.B. Studenten, junge Berufstätige", lines=1)
@@ -158,7 +306,9 @@ with gr.Blocks(title="Social Media Ad Builder") as demo:
     goal = gr.Textbox(label="Marketingziel", placeholder="z.B. Reichweite, Leads, Sales", lines=1)
     extra = gr.Textbox(label="Zusatzinfos (optional)", placeholder="USPs, Preis, Besonderheiten, Aktionen ...", lines=3)
 
-    generate_btn = gr.Button("Content generieren", variant="primary")
+    with gr.Row():
+        generate_btn = gr.Button("Content generieren", variant="primary")
+        fresh = gr.Checkbox(label="Neue Variante (Cache ignorieren)", value=False)
     output = gr.Textbox(label="Ergebnis", lines=18)
 
     gr.Markdown("## Verfeinern")
@@ -168,18 +318,27 @@ with gr.Blocks(title="Social Media Ad Builder") as demo:
     )
     refine_btn = gr.Button("Ergebnis verfeinern")
 
+    # Async handlers run directly on Gradio's event loop: concurrent requests
+    # share one loop (and the agents' HTTP clients) instead of each pinning
+    # a worker thread with its own asyncio.run() loop.
     generate_btn.click(
-        fn=process_request,
-        inputs=[product, audience, goal, platform, tone, extra],
+        fn=process_request_async,
+        inputs=[product, audience, goal, platform, tone, extra, fresh],
         outputs=[output]
     )
 
     refine_btn.click(
-        fn=refine,
+        fn=refine_async,
         inputs=[output, refine_text],
         outputs=[output]
     )
 
+# Waiting LLM calls only hold a coroutine, so many requests can run at once
+demo.queue(
+    default_concurrency_limit=int(os.getenv("GRADIO_CONCURRENCY_LIMIT", "32")),
+    max_size=int(os.getenv("GRADIO_MAX_QUEUE", "256")),
+)
+
 
 if __name__ == "__main__":
     demo.launch()
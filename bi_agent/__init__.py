@@ -1 +1 @@
-from .agent import root_runner, editor_runner
+from .agent import root_runner, editor_runner, strategist_agent
@@ -0,0 +1,190 @@
+"""
+Admission control for SQL execution.
+
+Bounds the number of queries running against the database at once, both
+globally and per user/session. Callers beyond the limit wait in a bounded
+queue (with a timeout); when the queue is full they are rejected right away
+with a clear error instead of piling up on the connection pool. Queue
+length and wait times are recorded for capacity planning.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class AdmissionError(RuntimeError):
+    """Raised when a query is not admitted (queue full, quota exceeded or wait timed out)."""
+
+
+class AdmissionController:
+    """Global and per-user concurrency limits with a bounded wait queue."""
+
+    def __init__(self, max_concurrent: int = 16, per_user_limit: Optional[int] = 4,
+                 max_queue: int = 64, queue_timeout: float = 30.0):
+        """
+        Initialize the admission controller.
+
+        Args:
+            max_concurrent: Maximum queries running at once (all users)
+            per_user_limit: Maximum queries running at once per user (None = no quota);
+                a user may additionally have this many queries waiting
+            max_queue: Maximum number of waiting queries before new ones are rejected
+            queue_timeout: Default seconds a query may wait for a slot
+        """
+        self.max_concurrent = max_concurrent
+        self.per_user_limit = per_user_limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._user_active: Dict[str, int] = {}
+        self._user_waiting: Dict[str, int] = {}
+        self._waiters: List[tuple] = []
+        self.stats = {'admitted': 0, 'rejected_queue_full': 0, 'rejected_quota': 0, 'timeouts': 0,
+                      'queued': 0, 'max_queue_length': 0, 'wait_time_total': 0.0, 'wait_time_max': 0.0}
+
+    def _has_slot(self, user: Optional[str]) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        if user is not None and self.per_user_limit is not None:
+            return self._user_active.get(user, 0) < self.per_user_limit
+        return True
+
+    def _first_eligible(self, ticket: tuple) -> bool:
+        """FIFO among waiters that could run now (a user at its quota does not block others)."""
+        for waiter in self._waiters:
+            if self._has_slot(waiter[1]):
+                return waiter is ticket
+        return False
+
+    def _admit(self, user: Optional[str], waited: float):
+        self._active += 1
+        if user is not None:
+            self._user_active[user] = self._user_active.get(user, 0) + 1
+        self.stats['admitted'] += 1
+        self.stats['wait_time_total'] += waited
+        self.stats['wait_time_max'] = max(self.stats['wait_time_max'], waited)
+
+    def acquire(self, user: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Wait for a query slot.
+
+        Args:
+            user: User or session identifier for the per-user quota (None = shared)
+            timeout: Seconds to wait (default: queue_timeout)
+
+        Raises:
+            AdmissionError: If the queue is full, the user already has too many
+                queries waiting, or no slot became free in time
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self._cond:
+            if self._has_slot(user) and not any(self._has_slot(waiter[1]) for waiter in self._waiters):
+                self._admit(user, 0.0)
+                return
+
+            if len(self._waiters) >= self.max_queue:
+                self.stats['rejected_queue_full'] += 1
+                raise AdmissionError(
+                    f"Database is busy: {self._active} queries running and {len(self._waiters)} waiting. "
+                    f"Please try again shortly."
+                )
+            if user is not None and self.per_user_limit is not None \
+                    and self._user_waiting.get(user, 0) >= self.per_user_limit:
+                self.stats['rejected_quota'] += 1
+                raise AdmissionError(
+                    f"Too many concurrent queries for this session (limit {self.per_user_limit}). "
+                    f"Wait for running queries to finish."
+                )
+
+            ticket = (object(), user)
+            self._waiters.append(ticket)
+            if user is not None:
+                self._user_waiting[user] = self._user_waiting.get(user, 0) + 1
+            self.stats['queued'] += 1
+            self.stats['max_queue_length'] = max(self.stats['max_queue_length'], len(self._waiters))
+
+            start = time.monotonic()
+            try:
+                admitted = self._cond.wait_for(lambda: self._first_eligible(ticket), timeout)
+            finally:
+                self._waiters.remove(ticket)
+                if user is not None:
+                    self._user_waiting[user] -= 1
+                    if not self._user_waiting[user]:
+                        del self._user_waiting[user]
+
+            waited = time.monotonic() - start
+            if not admitted:
+                self.stats['timeouts'] += 1
+                # Our departure may make another waiter the first eligible one
+                self._cond.notify_all()
+                raise AdmissionError(f"Timed out after {timeout:g} seconds waiting for a free query slot")
+
+            self._admit(user, waited)
+            self._cond.notify_all()
+
+    def release(self, user: Optional[str] = None):
+        """
+        Free a slot taken by acquire().
+
+        Args:
+            user: Same identifier that was passed to acquire()
+        """
+        with self._cond:
+            self._active -= 1
+            if user is not None:
+                self._user_active[user] -= 1
+                if not self._user_active[user]:
+                    del self._user_active[user]
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, user: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        Hold a query slot for the duration of a with block.
+
+        Args:
+            user: User or session identifier
+            timeout: Seconds to wait (default: queue_timeout)
+        """
+        self.acquire(user, timeout)
+        try:
+            yield
+        finally:
+            self.release(user)
+
+    def get_stats(self) -> dict:
+        """
+        Return admission statistics.
+
+        Returns:
+            Dictionary with active, queue_length, active_users, admitted,
+            rejections, timeouts, queued, max_queue_length and wait times
+            (total, max and average over admitted queries, in seconds)
+        """
+        with self._cond:
+            stats = dict(self.stats)
+            stats['active'] = self._active
+            stats['queue_length'] = len(self._waiters)
+            stats['active_users'] = len(self._user_active)
+            stats['max_concurrent'] = self.max_concurrent
+
+        stats['wait_time_avg'] = stats['wait_time_total'] / stats['admitted'] if stats['admitted'] else 0.0
+        return stats
+
+
+def _optional_int(value: Optional[str]) -> Optional[int]:
+    return int(value) if value else None
+
+
+# Global query slots; limits apply across all sessions of the process
+admission_controller = AdmissionController(
+    max_concurrent=int(os.getenv("SQL_MAX_CONCURRENT", "16")),
+    per_user_limit=_optional_int(os.getenv("SQL_PER_USER_LIMIT", "4")),
+    max_queue=int(os.getenv("SQL_MAX_QUEUE", "64")),
+    queue_timeout=float(os.getenv("SQL_QUEUE_TIMEOUT", "30")),
+)
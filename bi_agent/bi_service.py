@@ -6,12 +6,27 @@ keeping the app.py focused on UI and agent orchestration.
 """
 
 import pandas as pd
-import json
-from typing import Dict, Tuple, Optional
+import threading
+import time
+import uuid
+from typing import Dict, List, Tuple, Optional, Union
 from sqlalchemy.engine import Engine
 
-from .db_config import create_db_engine, get_schema_info, validate_connection
-from .sql_executor import execute_query
+from .db_config import format_schema_info, validate_connection
+from .engine_registry import engine_registry, get_engine
+from .sql_executor import ResultStream, aexecute_query, execute_query, execute_query_page
+from .result_summary import encode_summary, summarize_result
+from .chart_data import aggregate_query, prepare_chart_data
+from .result_cache import result_cache
+from .result_spill import SpilledResult, result_spill
+from .extract_cache import extract_cache
+from .statement_cache import statement_cache
+from .admission import admission_controller
+from .single_flight import query_flights
+from .db_executor import db_executor
+from .schema_cache import schema_cache
+from .schema_index import SchemaIndex
+from .column_profiler import column_profiler
 
 
 class BIService:
@@ -33,16 +48,25 @@ class BIService:
         self.password = password
         self.engine: Optional[Engine] = None
         self.schema_info: Optional[str] = None
+        self.schema_index: Optional[SchemaIndex] = None
+        # Owner of spilled result files (released in close())
+        self.session_id = uuid.uuid4().hex
 
-    def connect(self) -> Tuple[bool, str]:
+    def connect(self, warm_up: bool = True) -> Tuple[bool, str]:
         """
         Connect to the database and validate connection.
 
+        The engine is taken from the shared engine registry, so services and
+        agent tools with the same credentials reuse one connection pool.
+
+        Args:
+            warm_up: Open the pool's connections right away (default: True)
+
         Returns:
             Tuple of (success: bool, message: str)
         """
         try:
-            self.engine = create_db_engine(
+            self.engine = get_engine(
                 self.server,
                 self.database,
                 self.username,
@@ -50,17 +74,21 @@ class BIService:
             )
 
             is_connected, message = validate_connection(self.engine)
+            if is_connected and warm_up:
+                engine_registry.warm_up(self.engine)
             return is_connected, message
 
         except Exception as e:
             return False, f"Connection error: {str(e)}"
 
-    def load_schema(self, max_tables: int = 20) -> str:
+    def load_schema(self, max_tables: int = 20, profile_columns: bool = False) -> str:
         """
         Load database schema information.
 
         Args:
             max_tables: Maximum number of tables to include
+            profile_columns: Sample all tables for column statistics in the
+                background (otherwise only tables used in questions are profiled)
 
         Returns:
             Formatted schema string
@@ -68,18 +96,43 @@ class BIService:
         if self.engine is None:
             raise RuntimeError("Not connected to database. Call connect() first.")
 
-        self.schema_info = get_schema_info(self.engine, max_tables=max_tables)
+        try:
+            tables = schema_cache.get_tables(self.engine)
+        except Exception as e:
+            self.schema_index = None
+            self.schema_info = f"Error retrieving schema: {str(e)}"
+            return self.schema_info
+
+        self.schema_index = SchemaIndex(tables)
+        self.schema_info = format_schema_info(tables, max_tables=max_tables)
+        if profile_columns:
+            column_profiler.schedule(self.engine, tables)
         return self.schema_info
 
-    def execute_sql(self, sql_query: str) -> Dict:
+    def execute_sql(self, sql_query: str, **options) -> Dict:
         """
         Execute a SQL query and return results.
 
+        Results are served from the shared result cache when the same
+        (normalized) query ran recently; pass cache=None to bypass it.
+        Concurrent identical queries are coalesced into one execution.
+        Queries on fresh local extracts (see extract_cache) are answered
+        without SQL Server; pass extracts=None to force the live server.
+        Pass statements=statement_cache to send literals as bound parameters
+        (see statement_stats() for the shape cache hit rate). Live queries
+        go through the shared admission controller with this service's
+        session as the quota owner (see admission_stats()).
+
+        Large results can be spilled to disk with spill=result_spill; the
+        spill files belong to this service and are deleted by close().
+
         Args:
             sql_query: SQL query to execute
+            **options: Extra execute_query options (e.g. stream=True, batch_size=500)
 
         Returns:
-            Dictionary with keys: success, data (DataFrame), error, row_count, columns
+            Dictionary with keys: success, data (DataFrame, ResultStream or
+            SpilledResult), error, row_count, columns
         """
         if self.engine is None:
             return {
@@ -90,28 +143,281 @@ class BIService:
                 'columns': []
             }
 
-        return execute_query(self.engine, sql_query)
+        options.setdefault('cache', result_cache)
+        options.setdefault('single_flight', query_flights)
+        options.setdefault('extracts', extract_cache)
+        options.setdefault('admission', admission_controller)
+        options.setdefault('user', self.session_id)
+        if options.get('spill') is not None:
+            options.setdefault('session_id', self.session_id)
+        return execute_query(self.engine, sql_query, **options)
+
+    def execute_many(self, queries: List[str], max_concurrency: int = 4, **options) -> List[Dict]:
+        """
+        Execute several independent SQL queries concurrently.
+
+        Queries run on the shared database executor, whose worker count is
+        the global cap on concurrent database calls; max_concurrency further
+        limits this batch and never exceeds the connection pool capacity.
+        Called from an executor worker, the queries run one after another on
+        the calling thread instead.
+
+        Args:
+            queries: SQL queries to execute
+            max_concurrency: Maximum number of queries of this batch running at once
+            **options: Extra execute_query options applied to every query
+
+        Returns:
+            List of result dictionaries in the order of the queries, each with
+            the keys of execute_sql() plus elapsed_ms
+        """
+        if self.engine is None:
+            return [{
+                'success': False,
+                'data': None,
+                'error': 'Not connected to database',
+                'row_count': 0,
+                'columns': [],
+                'elapsed_ms': 0.0
+            } for _ in queries]
+
+        if db_executor.in_worker():
+            # Waiting on the executor from its own workers deadlocks once all of them wait
+            return [self._execute_timed(sql_query, options) for sql_query in queries]
+
+        limit = max(1, min(max_concurrency, engine_registry.capacity(self.engine)))
+        gate = threading.BoundedSemaphore(limit)
+
+        futures = []
+        for sql_query in queries:
+            # Submit only when a slot is free, so waiting queries do not occupy workers
+            gate.acquire()
+            try:
+                future = db_executor.submit(self._execute_timed, sql_query, options)
+            except Exception:
+                gate.release()
+                raise
+            future.add_done_callback(lambda _: gate.release())
+            futures.append(future)
+
+        return [future.result() for future in futures]
+
+    def _execute_timed(self, sql_query: str, options: Dict) -> Dict:
+        """Run execute_sql() and add the elapsed time in milliseconds."""
+        start = time.perf_counter()
+        try:
+            result = self.execute_sql(sql_query, **options)
+        except Exception as e:
+            result = {
+                'success': False,
+                'data': None,
+                'error': str(e),
+                'row_count': 0,
+                'columns': []
+            }
+        result['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        return result
+
+    async def aload_schema(self, max_tables: int = 20, timeout: Optional[float] = None) -> str:
+        """
+        Async variant of load_schema() running on the database executor.
+
+        Args:
+            max_tables: Maximum number of tables to include
+            timeout: Optional seconds to wait before raising TimeoutError
+
+        Returns:
+            Formatted schema string
+        """
+        if self.engine is None:
+            raise RuntimeError("Not connected to database. Call connect() first.")
 
-    def prepare_data_for_agents(self, df: pd.DataFrame, sql_query: str = "") -> str:
+        return await db_executor.run(self.load_schema, max_tables, timeout=timeout)
+
+    async def aexecute_sql(self, sql_query: str, timeout: int = 30, **options) -> Dict:
         """
-        Prepare query results as a formatted string for agents.
+        Async variant of execute_sql() that never blocks the event loop.
+
+        The query runs on the bounded database executor and shares the
+        result cache and in-flight coalescing with execute_sql().
 
         Args:
-            df: Query results as DataFrame
+            sql_query: SQL query to execute
+            timeout: Query timeout in seconds (default: 30)
+            **options: Extra aexecute_query options (e.g. max_rows=100)
+
+        Returns:
+            Dictionary with keys: success, data (DataFrame or SpilledResult),
+            error, row_count, columns
+        """
+        if self.engine is None:
+            return {
+                'success': False,
+                'data': None,
+                'error': 'Not connected to database',
+                'row_count': 0,
+                'columns': []
+            }
+
+        options.setdefault('cache', result_cache)
+        options.setdefault('single_flight', query_flights)
+        options.setdefault('executor', db_executor)
+        options.setdefault('extracts', extract_cache)
+        options.setdefault('admission', admission_controller)
+        options.setdefault('user', self.session_id)
+        if options.get('spill') is not None:
+            options.setdefault('session_id', self.session_id)
+        return await aexecute_query(self.engine, sql_query, timeout=timeout, **options)
+
+    def executor_metrics(self) -> Dict:
+        """
+        Get metrics of the database executor used by the async API.
+
+        Returns:
+            Dictionary with max_workers, queue_depth, active, completed, failed
+        """
+        return db_executor.metrics()
+
+    def admission_stats(self) -> Dict:
+        """
+        Get queue and wait-time statistics of the SQL admission controller.
+
+        Returns:
+            Dictionary with active, queue_length, admitted, rejections,
+            timeouts and wait times
+        """
+        return admission_controller.get_stats()
+
+    def statement_stats(self) -> Dict:
+        """
+        Get hit statistics of the auto-parameterization statement cache.
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries and hit_rate
+        """
+        return statement_cache.get_stats()
+
+    def execute_sql_page(self, sql_query: str, page: int = 1, page_size: int = 100) -> Dict:
+        """
+        Execute a SQL query and return one page of results.
+
+        Args:
+            sql_query: SQL query to execute
+            page: 1-based page number
+            page_size: Rows per page
+
+        Returns:
+            Dictionary with keys: success, data (DataFrame), error, row_count, columns,
+            page, page_size, has_more
+        """
+        if self.engine is None:
+            return {
+                'success': False,
+                'data': None,
+                'error': 'Not connected to database',
+                'row_count': 0,
+                'columns': [],
+                'page': page,
+                'page_size': page_size,
+                'has_more': False
+            }
+
+        return execute_query_page(self.engine, sql_query, page=page, page_size=page_size)
+
+    def execute_chart_query(self, sql_query: str, x: str, y: Optional[str] = None, color: Optional[str] = None,
+                            agg: str = 'sum', time_unit: Optional[str] = None, max_points: int = 5000,
+                            server_side: bool = False, **options) -> Dict:
+        """
+        Execute a SQL query and reduce its result to chart-ready data.
+
+        The result is streamed (not capped at max_rows) and reduced with
+        prepare_chart_data(), so the chart gets at most max_points points
+        regardless of the result size. With server_side=True the query is
+        first wrapped by aggregate_query(), so SQL Server groups by x (and
+        time_unit) and only the aggregated rows are transferred.
+
+        Args:
+            sql_query: SQL query to execute
+            x: Column for the x axis
+            y: Column for the y axis (None = count rows)
+            color: Optional column that splits the data into series
+            agg: Aggregation: sum, mean, min, max or count (default: sum)
+            time_unit: Optional time bucket for temporal x (minute ... year)
+            max_points: Point budget of the chart (default: 5000)
+            server_side: Aggregate in SQL Server instead of in the process
+            **options: Extra execute_query options
+
+        Returns:
+            Dictionary with the keys of execute_sql() (data is the reduced
+            DataFrame) plus source_rows and method
+        """
+        try:
+            if server_side:
+                sql_query = aggregate_query(sql_query, x, y=y, color=color, agg=agg, time_unit=time_unit)
+
+            options.setdefault('stream', True)
+            options.setdefault('max_rows', None)
+            result = self.execute_sql(sql_query, **options)
+            if not result['success']:
+                return result
+
+            if server_side:
+                # Rows are already one point each; only folded categories are combined again
+                y = y if y is not None else 'count'
+                agg = 'sum' if agg == 'count' else agg
+
+            data = result['data']
+            try:
+                prepared = prepare_chart_data(data, x, y=y, color=color, agg=agg, max_points=max_points,
+                                              time_unit=time_unit)
+            finally:
+                if isinstance(data, ResultStream):
+                    data.close()
+        except (KeyError, ValueError) as e:
+            return {
+                'success': False,
+                'data': None,
+                'error': f"Chart preparation failed: {str(e)}",
+                'row_count': 0,
+                'columns': []
+            }
+
+        return {
+            'success': True,
+            'data': prepared,
+            'error': None,
+            'row_count': len(prepared),
+            'columns': list(prepared.columns),
+            'source_rows': prepared.attrs['source_rows'],
+            'method': prepared.attrs['method']
+        }
+
+    def prepare_data_for_agents(self, df: Union[pd.DataFrame, ResultStream, SpilledResult], sql_query: str = "",
+                                max_chars: int = 4000, sample_rows: int = 10, top_k: int = 5) -> str:
+        """
+        Prepare query results as a compact, budgeted payload for agents.
+
+        Dtypes, null counts, numeric statistics, top values of categorical
+        columns and sample rows are computed in a single pass and encoded as
+        columnar JSON of at most max_chars characters.
+
+        Args:
+            df: Query results as DataFrame, ResultStream or SpilledResult (read
+                batch by batch; only the sample rows are kept in memory)
             sql_query: Original SQL query (optional)
+            max_chars: Size budget for the encoded data (default: 4000)
+            sample_rows: Number of leading rows to include (default: 10)
+            top_k: Number of most frequent values per categorical column (default: 5)
 
         Returns:
             Formatted string with data summary, sample, and statistics
         """
-        if df is None or df.empty:
+        if df is None or (isinstance(df, pd.DataFrame) and df.empty):
             return "No data available"
 
-        data_summary = {
-            'columns': df.columns.tolist(),
-            'row_count': len(df),
-            'sample_data': df.head(10).to_dict(orient='records'),
-            'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()}
-        }
+        summarizer = summarize_result(df, keep_rows=sample_rows, top_k=top_k)
+        if summarizer.row_count == 0:
+            return "No data available"
 
         # Build formatted prompt
         prompt = f"""Here are the query results:
@@ -121,31 +427,32 @@ class BIService:
             prompt += f"\nSQL Query: {sql_query}\n"
 
         prompt += f"""
-Results: {len(df)} rows returned
-
-Columns: {', '.join(data_summary['columns'])}
-Data Types: {json.dumps(data_summary['dtypes'])}
-
-Sample Data (first 10 rows):
-{json.dumps(data_summary['sample_data'], indent=2)}
-"""
+Results: {summarizer.row_count} rows returned
 
-        # Add summary statistics if there are numeric columns
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
-        if numeric_cols:
-            prompt += f"""
-Summary Statistics:
-{df.describe().to_string()}
+Data (compact columnar JSON: cols/types/nulls per column, stats for numeric
+columns, top [value, count] pairs for text columns, sample as one value list
+per column):
+{encode_summary(summarizer.summary(), max_chars=max_chars)}
 """
 
         return prompt
 
-    def get_schema_for_sql_generation(self, question: str) -> str:
+    def get_schema_for_sql_generation(self, question: str, top_k: int = 10, max_chars: int = 8000,
+                                      stats_chars: int = 2000) -> str:
         """
         Get formatted prompt for SQL generation agent.
 
+        Only the tables most relevant to the question are included,
+        ranked by the schema index and bounded by a character budget.
+        Sampled column values of these tables (see column_profiler) are
+        appended so the model does not have to guess filter values; tables
+        without a fresh profile are queued for background profiling.
+
         Args:
             question: User's natural language question
+            top_k: Maximum number of tables to include (default: 10)
+            max_chars: Character budget for the schema part (default: 8000)
+            stats_chars: Character budget for column statistics (0 = none, default: 2000)
 
         Returns:
             Formatted prompt with schema and question
@@ -153,13 +460,57 @@ Summary Statistics:
         if self.schema_info is None:
             raise RuntimeError("Schema not loaded. Call load_schema() first.")
 
-        return f"""{self.schema_info}
+        if self.schema_index is not None:
+            selected = self.schema_index.select_tables(question, top_k=top_k, max_chars=max_chars)
+            schema_text = self.schema_index.format_for_question(question, selected=selected)
+            if stats_chars and self.engine is not None:
+                column_profiler.schedule(self.engine, self.schema_index.tables, selected)
+                stats_text = column_profiler.format_stats(self.engine, selected, max_chars=stats_chars)
+                if stats_text:
+                    schema_text = f"{schema_text}\n{stats_text}"
+        else:
+            schema_text = self.schema_info
+
+        return f"""{schema_text}
 
 User Question: {question}
 """
 
+    def refresh_extracts(self, full: bool = False, only_stale: bool = True) -> Dict[str, int]:
+        """
+        Refresh the local extracts of hot tables from the live database.
+
+        Args:
+            full: Take full snapshots instead of incremental ones
+            only_stale: Skip tables whose snapshot is still fresh (default: True)
+
+        Returns:
+            Dictionary of table -> number of rows loaded
+        """
+        if self.engine is None:
+            raise RuntimeError("Not connected to database")
+
+        if only_stale:
+            return extract_cache.refresh_stale(self.engine, full=full)
+        return extract_cache.refresh(self.engine, full=full)
+
+    def pool_stats(self) -> Dict:
+        """
+        Get connection pool statistics of the shared engine.
+
+        Returns:
+            Dictionary with checked-out connections, overflow and wait times
+        """
+        if self.engine is None:
+            return {}
+        return engine_registry.pool_stats(self.engine)
+
     def close(self):
-        """Close database connection."""
-        if self.engine:
-            self.engine.dispose()
-            self.engine = None
+        """
+        Release the database connection and delete spilled results.
+
+        The pooled engine is shared with other users of the registry and is
+        therefore not disposed here (see engine_registry.dispose_all()).
+        """
+        result_spill.cleanup_session(self.session_id)
+        self.engine = None
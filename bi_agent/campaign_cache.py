@@ -0,0 +1,236 @@
+"""
+Content-addressed cache for campaign pipeline results.
+
+Users regenerate the same product/audience/goal/platform/tone combinations
+over and over, and every run pays for two LLM calls. Results are cached
+under a hash of the normalized campaign prompt together with the name,
+model and instruction of every pipeline agent, so a changed prompt or a
+model switch never serves stale output. Memory is bounded by total entry
+size with LRU eviction and a per-entry TTL; an optional JSON directory acts
+as a second tier that survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from .agent import copywriter_agent, strategist_agent
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Normalize a campaign prompt for cache lookups.
+
+    Unicode normalization, case folding and collapsed whitespace make
+    prompts that only differ in formatting share one entry.
+
+    Args:
+        text: Prompt built by build_campaign_prompt()
+
+    Returns:
+        Normalized prompt
+    """
+    text = unicodedata.normalize('NFKC', text)
+    lines = (_WHITESPACE.sub(' ', line).strip() for line in text.splitlines())
+    return '\n'.join(line for line in lines if line).casefold()
+
+
+def pipeline_fingerprint(agents: Sequence) -> str:
+    """
+    Fingerprint the agents whose output is cached.
+
+    Args:
+        agents: LlmAgents of the pipeline, in order
+
+    Returns:
+        Hex digest over every agent's name, model and instruction
+    """
+    digest = hashlib.sha256()
+    for agent in agents:
+        model = agent.model if isinstance(agent.model, str) else getattr(agent.model, 'model', repr(agent.model))
+        for part in (agent.name, model, str(agent.instruction)):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class CampaignCache:
+    """LRU cache of pipeline results (state dicts) bounded by total size."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 86400.0,
+                 disk_dir: Optional[str] = None, disk_ttl: float = 7 * 86400.0):
+        """
+        Initialize the campaign cache.
+
+        Args:
+            max_bytes: Memory budget for all cached results
+            ttl: Seconds a cached result stays valid in memory
+            disk_dir: Optional directory for the JSON tier
+            disk_ttl: Seconds a JSON file stays valid
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_ttl = disk_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'bypassed': 0, 'evictions': 0, 'expirations': 0,
+                      'disk_hits': 0, 'disk_errors': 0}
+
+    @staticmethod
+    def make_key(prompt: str, agents: Optional[Sequence] = None) -> str:
+        """
+        Build the content address of a pipeline run.
+
+        Args:
+            prompt: Campaign prompt (normalized here)
+            agents: Pipeline agents (default: strategist and copywriter)
+
+        Returns:
+            Hex digest of the agent fingerprint and the normalized prompt
+        """
+        agents = agents if agents is not None else (strategist_agent, copywriter_agent)
+        digest = hashlib.sha256(pipeline_fingerprint(agents).encode('ascii'))
+        digest.update(normalize_prompt(prompt).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            Copy of the cached state dict or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                results, size, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return dict(results)
+
+                del self._entries[key]
+                self.total_bytes -= size
+                self.stats['expirations'] += 1
+
+        results = self._read_disk(key)
+        if results is not None:
+            self.stats['disk_hits'] += 1
+            self._store(key, results)
+            return dict(results)
+
+        self.stats['misses'] += 1
+        return None
+
+    def record_bypass(self):
+        """Count a run that skipped the lookup on purpose (fresh variant)."""
+        with self._lock:
+            self.stats['bypassed'] += 1
+
+    def put(self, key: str, results: Dict[str, str]):
+        """
+        Store a pipeline result.
+
+        Args:
+            key: Key from make_key()
+            results: State values of the run (e.g. strategy_text, campaign_text)
+        """
+        self._store(key, dict(results))
+        self._write_disk(key, results)
+
+    def _store(self, key: str, results: Dict[str, str]):
+        size = len(json.dumps(results, ensure_ascii=False, default=str).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+            self._entries[key] = (results, size, time.monotonic() + self.ttl)
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, misses, bypassed lookups, evictions,
+            expirations, disk hits, entry count, used bytes and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self.total_bytes
+
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"campaign_{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, str]]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.disk_ttl:
+                os.remove(path)
+                return None
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self.stats['disk_errors'] += 1
+            return None
+
+    def _write_disk(self, key: str, results: Dict[str, str]):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError):
+            self.stats['disk_errors'] += 1
+
+
+# Process-wide cache for the campaign pipeline
+campaign_cache = CampaignCache(
+    max_bytes=int(os.getenv("CAMPAIGN_CACHE_MAX_BYTES", str(32 * 1024 * 1024))),
+    ttl=float(os.getenv("CAMPAIGN_CACHE_TTL", "86400")),
+    disk_dir=os.getenv("CAMPAIGN_CACHE_DIR"),
+)
@@ -0,0 +1,311 @@
+"""
+Chart-data preparation for large query results.
+
+Vega-Lite renders every data point in the browser and altair refuses
+datasets above its row limit (5000 by default), so raw results of 100k rows
+cannot be charted directly. This module reduces a result to a point budget
+before it is handed to altair: categorical axes are aggregated (rare
+categories folded into "Other"), temporal axes are bucketed when a time unit
+is given, and series are downsampled with Largest-Triangle-Three-Buckets
+(LTTB), which keeps peaks and troughs that plain sampling would drop.
+aggregate_query() pushes the aggregation to SQL Server instead, so only the
+aggregated rows are transferred.
+"""
+
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .sql_rewrite import derived_table_parts
+
+AGGREGATIONS = ('sum', 'mean', 'min', 'max', 'count')
+
+# Pandas period frequencies of the supported time units
+TIME_UNITS = {
+    'minute': 'min', 'hour': 'h', 'day': 'D', 'week': 'W-SUN', 'month': 'M', 'quarter': 'Q', 'year': 'Y',
+}
+
+# T-SQL expressions truncating {col} to a time unit (weeks start on Monday)
+_SQL_TIME_BUCKETS = {
+    'minute': "DATEADD(minute, DATEDIFF(minute, 0, {col}), 0)",
+    'hour': "DATEADD(hour, DATEDIFF(hour, 0, {col}), 0)",
+    'day': "CAST({col} AS date)",
+    # DATEDIFF(week) counts Sunday boundaries whatever DATEFIRST is; shifting by a day
+    # moves Sundays into the week that started the Monday before (pandas W-SUN)
+    'week': "DATEADD(week, DATEDIFF(week, 0, DATEADD(day, -1, {col})), 0)",
+    'month': "DATEFROMPARTS(YEAR({col}), MONTH({col}), 1)",
+    'quarter': "DATEFROMPARTS(YEAR({col}), (DATEPART(quarter, {col}) - 1) * 3 + 1, 1)",
+    'year': "DATEFROMPARTS(YEAR({col}), 1, 1)",
+}
+
+_SQL_AGGREGATIONS = {
+    'sum': "SUM({col})",
+    'mean': "AVG(CAST({col} AS float))",
+    'min': "MIN({col})",
+    'max': "MAX({col})",
+    'count': "COUNT({col})",
+}
+
+OTHER_LABEL = "Other"
+
+
+def _quote(identifier: str) -> str:
+    return f"[{identifier.replace(']', ']]')}]"
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Select the points of a series with Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Sorted x values (numeric)
+        y: y values (numeric, no NaN)
+        threshold: Number of points to keep
+
+    Returns:
+        Sorted array of selected row positions (always includes first and last point)
+    """
+    n = len(x)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)])
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        # Average of the next bucket (the last point for the final bucket)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    selected[-1] = n - 1
+    return selected
+
+
+def _axis_type(series: pd.Series) -> str:
+    """Vega-Lite type of a column: 'temporal', 'quantitative' or 'nominal'."""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return 'temporal'
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return 'nominal'
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        return 'quantitative'
+    if pd.api.types.infer_dtype(series, skipna=True) in ('date', 'datetime', 'datetime64'):
+        return 'temporal'
+    return 'nominal'
+
+
+def _collect(data, columns: List[str]) -> pd.DataFrame:
+    """Materialize only the charted columns of a DataFrame, ResultStream or SpilledResult."""
+    if isinstance(data, pd.DataFrame):
+        return data[columns]
+    if hasattr(data, 'read'):
+        # SpilledResult: column projection reads only these columns from the file
+        return data.read(columns=columns)
+
+    frames = [batch[columns] for batch in data]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _aggregate(df: pd.DataFrame, keys: List[str], y: Optional[str], agg: str) -> pd.DataFrame:
+    grouped = df.groupby(keys, sort=True, observed=True, dropna=False)
+    if y is None:
+        return grouped.size().rename('count').reset_index()
+    return grouped[y].agg(agg).reset_index()
+
+
+def prepare_chart_data(data: Union[pd.DataFrame, Iterable[pd.DataFrame]], x: str, y: Optional[str] = None,
+                       color: Optional[str] = None, agg: str = 'sum', max_points: int = 5000,
+                       time_unit: Optional[str] = None, max_categories: int = 50,
+                       bins: int = 50) -> pd.DataFrame:
+    """
+    Reduce a query result to at most max_points chart points.
+
+    - Categorical x: y is aggregated per category (and color); categories
+      beyond max_categories are folded into "Other".
+    - Temporal or numeric x: y is aggregated per distinct x (per time
+      bucket if time_unit is given) and series that still exceed the
+      budget are downsampled with LTTB to their share of it.
+    - Without y: counts per category, time bucket or numeric bin (histogram).
+
+    The chosen method, the x axis type and the source row count are stored
+    in the result's attrs ('method', 'x_type', 'source_rows').
+
+    Args:
+        data: DataFrame, ResultStream or SpilledResult (only x, y and color are read)
+        x: Column for the x axis
+        y: Column for the y axis (None = count rows)
+        color: Optional column that splits the data into series
+        agg: Aggregation for repeated x values: sum, mean, min, max or count
+        max_points: Point budget of the chart (default: 5000, altair's row limit)
+        time_unit: Bucket temporal x values by minute, hour, day, week,
+            month, quarter or year (default: no bucketing)
+        max_categories: Maximum number of categories on a categorical axis
+        bins: Number of bins for histograms of numeric x
+
+    Returns:
+        DataFrame with columns x, color (if given) and y (or 'count')
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {agg} (expected one of {', '.join(AGGREGATIONS)})")
+    if time_unit is not None and time_unit not in TIME_UNITS:
+        raise ValueError(f"Unsupported time unit: {time_unit} (expected one of {', '.join(TIME_UNITS)})")
+
+    columns = [x] + [col for col in (y, color) if col is not None and col != x]
+    df = _collect(data, columns)
+    source_rows = len(df)
+    df = df[df[x].notna()]
+
+    x_type = _axis_type(df[x])
+    if x_type == 'temporal' and not pd.api.types.is_datetime64_any_dtype(df[x].dtype):
+        df = df.assign(**{x: pd.to_datetime(df[x])})
+    if y is not None and not pd.api.types.is_numeric_dtype(df[y].dtype):
+        df = df.assign(**{y: pd.to_numeric(df[y], errors='coerce')})
+    keys = [x] + ([color] if color is not None else [])
+    bucketed = x_type == 'temporal' and time_unit is not None
+    if bucketed:
+        df = df.assign(**{x: df[x].dt.to_period(TIME_UNITS[time_unit]).dt.start_time})
+
+    if x_type == 'nominal':
+        categories = df[x].value_counts() if y is None else df.groupby(x, observed=True)[y].sum().abs()
+        limit = max(1, min(max_categories, max_points // max(1, df[color].nunique() if color else 1)))
+        if len(categories) > limit:
+            keep = set(categories.sort_values(ascending=False).index[:limit - 1])
+            df = df.assign(**{x: df[x].where(df[x].isin(keep), OTHER_LABEL)})
+            method = 'top_n'
+        else:
+            method = 'aggregate'
+        result = _aggregate(df, keys, y, agg)
+
+    elif y is None:
+        if bucketed:
+            starts = df[x]
+            method = 'time_bucket'
+        else:
+            values = df[x].astype('int64' if x_type == 'temporal' else np.float64)
+            edges = np.histogram_bin_edges(values, bins=bins)
+            starts = edges[np.clip(np.searchsorted(edges, values, side='right') - 1, 0, bins - 1)]
+            if x_type == 'temporal':
+                unit = np.datetime_data(df[x].to_numpy().dtype)[0]
+                starts = pd.to_datetime(starts.astype('int64'), unit=unit)
+            method = 'histogram'
+        result = _aggregate(df.assign(**{x: starts}), keys, None, agg)
+
+    else:
+        # One point per distinct x (or time bucket) and series, then LTTB per series
+        # Rows with unique x are already one point each, except that count must still count them
+        if agg == 'count' or df.duplicated(keys).any():
+            result = _aggregate(df, keys, y, agg)
+        else:
+            result = df.sort_values(keys)
+        result = result[result[y].notna()]
+        method = 'time_bucket' if bucketed else 'aggregate'
+        if len(result) > max_points:
+            series = [group for _, group in result.groupby(color, sort=False, observed=True)] \
+                if color is not None else [result]
+            budget = max(3, max_points // len(series))
+            parts = []
+            for group in series:
+                group = group.sort_values(x)
+                x_values = group[x].astype('int64') if x_type == 'temporal' else group[x]
+                parts.append(group.iloc[lttb_indices(x_values.to_numpy(), group[y].to_numpy(), budget)])
+            result = pd.concat(parts, ignore_index=True)
+            method = 'lttb'
+
+    result = result.reset_index(drop=True)
+    result.attrs.update({'method': method, 'x_type': x_type, 'source_rows': source_rows})
+    return result
+
+
+def aggregate_query(query: str, x: str, y: Optional[str] = None, color: Optional[str] = None,
+                    agg: str = 'sum', time_unit: Optional[str] = None) -> str:
+    """
+    Wrap a SELECT so that SQL Server returns chart-ready aggregated rows.
+
+    The query becomes a derived table grouped by x (truncated to time_unit
+    if given) and color, so only one row per chart point is transferred.
+    A leading WITH clause and trailing OPTION clause are kept in place; a
+    top-level ORDER BY without TOP/OFFSET is dropped (not allowed in a
+    derived table).
+
+    Args:
+        query: Validated SELECT query
+        x: Column for the x axis
+        y: Column for the y axis (None = count rows)
+        color: Optional column that splits the data into series
+        agg: Aggregation of y: sum, mean, min, max or count
+        time_unit: Truncate x to minute, hour, day, week, month, quarter or year
+
+    Returns:
+        Aggregating query, ordered by x
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Unsupported aggregation: {agg} (expected one of {', '.join(AGGREGATIONS)})")
+    if time_unit is not None and time_unit not in _SQL_TIME_BUCKETS:
+        raise ValueError(f"Unsupported time unit: {time_unit} (expected one of {', '.join(_SQL_TIME_BUCKETS)})")
+
+    parts = derived_table_parts(query)
+    if parts is None:
+        raise ValueError("Query cannot be parsed")
+    prefix, body, tail = parts
+
+    source = "_chart"
+    x_column = f"{source}.{_quote(x)}"
+    x_expr = _SQL_TIME_BUCKETS[time_unit].format(col=x_column) if time_unit else x_column
+    group_by = [x_expr]
+    select = [f"{x_expr} AS {_quote(x)}"]
+    if color is not None:
+        group_by.append(f"{source}.{_quote(color)}")
+        select.append(f"{source}.{_quote(color)} AS {_quote(color)}")
+    if y is None:
+        select.append(f"COUNT(*) AS {_quote('count')}")
+    else:
+        select.append(f"{_SQL_AGGREGATIONS[agg].format(col=f'{source}.{_quote(y)}')} AS {_quote(y)}")
+
+    return (f"{prefix}SELECT {', '.join(select)} FROM ({body}) AS {source} "
+            f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}{tail}")
+
+
+def build_chart(prepared: pd.DataFrame, x: str, y: Optional[str] = None, color: Optional[str] = None,
+                mark: Optional[str] = None):
+    """
+    Build an altair chart from prepare_chart_data() output.
+
+    Args:
+        prepared: Reduced chart data
+        x: Column for the x axis
+        y: Column for the y axis (None = 'count')
+        color: Optional series column
+        mark: Mark type (default: bar for categories and histograms, line otherwise)
+
+    Returns:
+        altair.Chart
+    """
+    import altair as alt  # imported on first use, altair is slow to import
+
+    x_type = prepared.attrs.get('x_type') or _axis_type(prepared[x])
+    if mark is None:
+        mark = 'bar' if x_type == 'nominal' or prepared.attrs.get('method') == 'histogram' else 'line'
+
+    encoding = {
+        'x': alt.X(x, type=x_type),
+        'y': alt.Y(y or 'count', type='quantitative'),
+    }
+    if color is not None:
+        encoding['color'] = alt.Color(color, type='nominal')
+    return getattr(alt.Chart(prepared), f"mark_{mark}")().encode(**encoding)
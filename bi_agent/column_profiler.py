@@ -0,0 +1,409 @@
+"""
+Sampled column statistics for SQL generation.
+
+The SQL-generation prompt only knows column names and types, so the model
+has to guess filter values. This module samples tables (TABLESAMPLE on large
+tables, TOP-N otherwise) in a background thread and keeps per-column
+statistics: (sampled) distinct count, min/max and frequent values. Profiles
+live in a local index that is persisted as JSON per server, database and
+login (sampled values are only shown to sessions with the same access) and
+refreshed incrementally when a table changed or its profile got too old.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .admission import admission_controller
+from .db_config import engine_key, engine_user, fetch_table_modify_dates
+from .result_summary import to_jsonable
+from .sql_executor import set_query_timeout
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+
+# Admission quota owner for sampling queries
+PROFILER_USER = "column-profiler"
+
+# Types that cannot be compared/grouped or are too large to be useful as hints
+_SKIPPED_TYPES = {
+    'binary', 'varbinary', 'image', 'text', 'ntext', 'xml', 'geography', 'geometry',
+    'hierarchyid', 'timestamp', 'rowversion', 'sql_variant', 'uniqueidentifier',
+}
+
+
+def _quote(identifier: str) -> str:
+    return f"[{identifier.replace(']', ']]')}]"
+
+
+def _quote_table(table_name: str) -> str:
+    schema, _, table = table_name.partition('.')
+    return f"{_quote(schema)}.{_quote(table)}"
+
+
+def _profile_key(engine: Engine) -> str:
+    """Server, database and login a profile index belongs to."""
+    return f"{engine_key(engine)}|{engine_user(engine)}"
+
+
+def _format_value(value) -> str:
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def profile_frame(df: pd.DataFrame, top_values: int = 5, max_top_distinct: int = 50,
+                  max_value_chars: int = 40) -> Dict[str, dict]:
+    """
+    Compute column statistics of a sampled DataFrame.
+
+    Args:
+        df: Sampled rows
+        top_values: Number of frequent values kept per column
+        max_top_distinct: Frequent values are only kept for columns with at
+            most this many distinct values (categorical columns)
+        max_value_chars: Text values are truncated to this length
+
+    Returns:
+        Dictionary mapping column name to {'distinct', 'nulls', 'min', 'max', 'top'}
+        (min/max for numeric and temporal columns, top for other low-cardinality columns)
+    """
+    profiles = {}
+    for name in df.columns:
+        series = df[name]
+        if isinstance(series, pd.DataFrame):
+            continue  # duplicate column name
+        non_null = series.dropna()
+        stats = {'distinct': int(non_null.nunique()), 'nulls': int(len(series) - len(non_null))}
+
+        ordered = pd.api.types.is_datetime64_any_dtype(non_null.dtype) or (
+            pd.api.types.is_numeric_dtype(non_null.dtype) and not pd.api.types.is_bool_dtype(non_null.dtype))
+        if len(non_null) and ordered:
+            stats['min'] = to_jsonable(non_null.min())
+            stats['max'] = to_jsonable(non_null.max())
+        elif len(non_null) and pd.api.types.infer_dtype(non_null, skipna=True) in ('date', 'datetime', 'decimal'):
+            # Object columns of dates/decimals as returned by pyodbc
+            stats['min'] = to_jsonable(min(non_null))
+            stats['max'] = to_jsonable(max(non_null))
+
+        if 'min' not in stats and 0 < stats['distinct'] <= max_top_distinct:
+            top = []
+            for value in non_null.value_counts().index[:top_values]:
+                value = to_jsonable(value)
+                if isinstance(value, str) and len(value) > max_value_chars:
+                    value = value[:max_value_chars]
+                top.append(value)
+            stats['top'] = top
+
+        profiles[str(name)] = stats
+    return profiles
+
+
+class ColumnProfiler:
+    """Persisted index of sampled column statistics, refreshed in the background."""
+
+    def __init__(self, index_dir: Optional[str] = None, sample_rows: int = 10000,
+                 max_age: float = 86400.0, top_values: int = 5, timeout: int = 30, batch_size: int = 100):
+        """
+        Initialize the column profiler.
+
+        Args:
+            index_dir: Optional directory for the persisted profile index
+            sample_rows: Rows sampled per table
+            max_age: Seconds after which a table profile is refreshed even if
+                the table definition did not change
+            top_values: Frequent values kept per column
+            timeout: Query timeout in seconds for sampling one table
+            batch_size: Queued tables the background worker profiles per
+                connection and index write
+        """
+        self.index_dir = index_dir
+        self.sample_rows = sample_rows
+        self.max_age = max_age
+        self.top_values = top_values
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self._profiles: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.Lock()
+        self._pending: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._worker: Optional[threading.Thread] = None
+        self.stats = {'tables_profiled': 0, 'failures': 0, 'skipped_fresh': 0, 'index_loads': 0}
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _index(self, key: str) -> Dict[str, dict]:
+        """Profiles of one server, database and login (loaded from disk on first use)."""
+        with self._lock:
+            profiles = self._profiles.get(key)
+            if profiles is None:
+                profiles = self._profiles[key] = self._load_index(key)
+            return profiles
+
+    def get_profile(self, engine: Engine, table_name: str) -> Optional[dict]:
+        """
+        Return the stored profile of a table.
+
+        Args:
+            engine: SQLAlchemy Engine object
+            table_name: Full table name ("schema.table")
+
+        Returns:
+            Dictionary with row_count, sampled_rows, modify_date, profiled_at
+            and columns, or None if the table was not profiled yet
+        """
+        return self._index(_profile_key(engine)).get(table_name)
+
+    def _is_fresh(self, profile: Optional[dict], modify_date: Optional[str]) -> bool:
+        if profile is None:
+            return False
+        if modify_date is not None and profile.get('modify_date') != modify_date:
+            return False
+        return time.time() - profile.get('profiled_at', 0) < self.max_age
+
+    def _sample_table(self, connection, table_name: str, columns: List[dict]) -> dict:
+        """Sample one table and compute its column statistics."""
+        selected = [col['name'] for col in columns if str(col['type']).lower() not in _SKIPPED_TYPES]
+        row_count = connection.execute(text("""
+            SELECT SUM(p.rows)
+            FROM sys.partitions p
+            WHERE p.object_id = OBJECT_ID(:name) AND p.index_id IN (0, 1)
+        """), {'name': _quote_table(table_name)}).scalar()
+        row_count = int(row_count or 0)
+
+        profile = {'row_count': row_count, 'sampled_rows': 0, 'columns': {}}
+        if not selected:
+            return profile
+
+        column_list = ', '.join(_quote(name) for name in selected)
+        base = f"SELECT TOP ({int(self.sample_rows)}) {column_list} FROM {_quote_table(table_name)}"
+        df = None
+        if row_count > 4 * self.sample_rows:
+            # Page sampling; oversample because TABLESAMPLE is approximate
+            percent = min(100.0, 200.0 * self.sample_rows / row_count)
+            df = pd.read_sql_query(text(f"{base} TABLESAMPLE SYSTEM ({percent:.4f} PERCENT)"), connection)
+        if df is None or df.empty:
+            df = pd.read_sql_query(text(base), connection)
+
+        profile['sampled_rows'] = len(df)
+        profile['columns'] = profile_frame(df, top_values=self.top_values)
+        return profile
+
+    def refresh(self, engine: Engine, tables: Dict[str, dict], table_names: Optional[List[str]] = None,
+                force: bool = False) -> int:
+        """
+        Profile tables whose profile is missing, outdated or older than max_age.
+
+        Args:
+            engine: SQLAlchemy Engine object
+            tables: Schema model mapping "schema.table" to {'columns': [...]}
+            table_names: Tables to consider (default: all tables of the model)
+            force: Profile even fresh tables
+
+        Returns:
+            Number of tables profiled
+        """
+        key = _profile_key(engine)
+        profiles = self._index(key)
+        names = [name for name in (table_names if table_names is not None else tables) if name in tables]
+        if not names:
+            return 0
+
+        profiled = 0
+        with engine.connect() as connection:
+            set_query_timeout(connection, self.timeout)
+            modify_dates = fetch_table_modify_dates(connection)
+            for name in names:
+                modify_date = modify_dates.get(name)
+                if not force and self._is_fresh(profiles.get(name), modify_date):
+                    self._count('skipped_fresh')
+                    continue
+                try:
+                    # Sampling competes with user queries for the same slots
+                    with admission_controller.admit(user=PROFILER_USER):
+                        profile = self._sample_table(connection, name, tables[name]['columns'])
+                except Exception as e:
+                    logger.warning("Profiling %s failed: %s", name, e)
+                    self._count('failures')
+                    connection.rollback()
+                    continue
+
+                profile['modify_date'] = modify_date
+                profile['profiled_at'] = time.time()
+                with self._lock:
+                    profiles[name] = profile
+                    self.stats['tables_profiled'] += 1
+                profiled += 1
+
+        if profiled:
+            self._save_index(key, profiles)
+        return profiled
+
+    def schedule(self, engine: Engine, tables: Dict[str, dict], table_names: Optional[List[str]] = None):
+        """
+        Profile tables in a background thread (non-blocking).
+
+        Tables that are already queued are not queued twice; fresh tables are
+        skipped by the worker.
+
+        Args:
+            engine: SQLAlchemy Engine object
+            tables: Schema model mapping "schema.table" to {'columns': [...]}
+            table_names: Tables to profile (default: all tables of the model)
+        """
+        key = _profile_key(engine)
+        profiles = self._index(key)
+        names = table_names if table_names is not None else list(tables)
+        with self._lock:
+            for name in names:
+                if name in tables and not self._is_fresh(profiles.get(name), None):
+                    self._pending[(key, name)] = (engine, tables)
+            if self._pending and (self._worker is None or not self._worker.is_alive()):
+                self._worker = threading.Thread(target=self._run_pending, name="bi-profiler", daemon=True)
+                self._worker.start()
+
+    def _next_batch(self) -> Optional[tuple]:
+        """Pop up to batch_size queued tables of the oldest queued index."""
+        with self._lock:
+            if not self._pending:
+                self._worker = None
+                return None
+            key = next(iter(self._pending))[0]
+            engine = None
+            batch: Dict[str, dict] = {}
+            for pending_key in list(self._pending):
+                if pending_key[0] != key:
+                    continue
+                engine, tables = self._pending.pop(pending_key)
+                batch[pending_key[1]] = tables[pending_key[1]]
+                if len(batch) >= self.batch_size:
+                    break
+            return engine, batch
+
+    def _run_pending(self):
+        """Worker loop: profile queued tables in batches per database."""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            engine, tables = batch
+            try:
+                # One connection, modify-date query and index write per batch
+                self.refresh(engine, tables)
+            except Exception as e:
+                logger.warning("Background profiling of %d tables failed: %s", len(tables), e)
+                self._count('failures', len(tables))
+
+    def format_stats(self, engine: Engine, table_names: List[str], max_chars: int = 2000) -> str:
+        """
+        Format the stored statistics of some tables as LLM context.
+
+        Lines are added in the given table order until the budget is used up.
+
+        Args:
+            engine: SQLAlchemy Engine object
+            table_names: Tables to describe, most relevant first
+            max_chars: Character budget
+
+        Returns:
+            Formatted statistics (empty string if nothing is profiled or fits)
+        """
+        profiles = self._index(_profile_key(engine))
+        header = "Column Values (sampled):\n"
+        lines = []
+        used = len(header)
+
+        for table_name in table_names:
+            profile = profiles.get(table_name)
+            if not profile:
+                continue
+            approximate = profile['sampled_rows'] < profile['row_count']
+            for column, stats in profile['columns'].items():
+                parts = []
+                if stats.get('top'):
+                    parts.append("values " + ", ".join(_format_value(value) for value in stats['top']))
+                if stats.get('min') is not None:
+                    parts.append(f"range {_format_value(stats['min'])} .. {_format_value(stats['max'])}")
+                if not parts:
+                    continue
+                distinct = f"{'~' if approximate else ''}{stats['distinct']} distinct"
+                line = f"  - {table_name}.{column}: {distinct}; {'; '.join(parts)}\n"
+                if used + len(line) > max_chars:
+                    continue
+                lines.append(line)
+                used += len(line)
+
+        if not lines:
+            return ""
+        return header + "".join(lines)
+
+    def get_stats(self) -> dict:
+        """
+        Return profiler counters.
+
+        Returns:
+            Dictionary with tables_profiled, failures, skipped_fresh,
+            index_loads, profiled tables in memory and queued tables
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['profiles'] = sum(len(profiles) for profiles in self._profiles.values())
+            stats['pending'] = len(self._pending)
+        return stats
+
+    def _index_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.index_dir, f"profiles_{digest}.json")
+
+    def _save_index(self, key: str, profiles: Dict[str, dict]):
+        """Write the profiles of one index to disk (no-op without index_dir)."""
+        if not self.index_dir:
+            return
+
+        with self._lock:
+            snapshot = {'version': INDEX_VERSION, 'key': key, 'tables': dict(profiles)}
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            path = self._index_path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The index is only an optimization
+            pass
+
+    def _load_index(self, key: str) -> Dict[str, dict]:
+        """Read the profiles of one index from disk (empty if missing; caller holds the lock)."""
+        if not self.index_dir:
+            return {}
+
+        try:
+            with open(self._index_path(key), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        if snapshot.get('version') != INDEX_VERSION or snapshot.get('key') != key:
+            return {}
+        self.stats['index_loads'] += 1
+        return snapshot['tables']
+
+
+# Process-wide column profiler shared by all BIService instances
+column_profiler = ColumnProfiler(
+    index_dir=os.getenv("COLUMN_PROFILE_DIR"),
+    sample_rows=int(os.getenv("COLUMN_PROFILE_SAMPLE_ROWS", "10000")),
+    max_age=float(os.getenv("COLUMN_PROFILE_MAX_AGE", "86400")),
+)
@@ -6,11 +6,16 @@ and retrieving schema information for the LLM context.
 """
 
 import urllib.parse
-from sqlalchemy import create_engine, text, inspect
+from typing import Optional, TYPE_CHECKING
+from sqlalchemy import create_engine, text, inspect, bindparam
 from sqlalchemy.engine import Engine
 
+if TYPE_CHECKING:
+    from .schema_cache import SchemaCache
 
-def create_db_engine(server: str, database: str, username: str, password: str, driver: str = "ODBC Driver 18 for SQL Server") -> Engine:
+
+def create_db_engine(server: str, database: str, username: str, password: str,
+                     driver: str = "ODBC Driver 18 for SQL Server", **engine_kwargs) -> Engine:
     """
     Create a SQLAlchemy engine for MS SQL Server connection.
 
@@ -20,6 +25,7 @@ def create_db_engine(server: str, database: str, username: str, password: str, d
         username: Database username
         password: Database password
         driver: ODBC driver name (default: ODBC Driver 18 for SQL Server)
+        **engine_kwargs: Extra create_engine options (pool_size, pool_recycle, ...)
 
     Returns:
         SQLAlchemy Engine object
@@ -41,7 +47,7 @@ def create_db_engine(server: str, database: str, username: str, password: str, d
     connection_string = f"mssql+pyodbc:///?odbc_connect={params}"
 
     # Create engine
-    engine = create_engine(connection_string, echo=False)
+    engine = create_engine(connection_string, echo=False, **engine_kwargs)
 
     return engine
 
@@ -65,82 +71,368 @@ def validate_connection(engine: Engine) -> tuple[bool, str]:
         return False, f"Connection failed: {str(e)}"
 
 
-def get_schema_info(engine: Engine, limit_tables: list[str] = None, max_tables: int = 20) -> str:
+def _odbc_parts(engine: Engine) -> dict:
+    """Parse the odbc_connect string of an engine URL into uppercased keys."""
+    parts = {}
+    odbc_string = engine.url.query.get('odbc_connect')
+    if odbc_string:
+        for item in odbc_string.split(';'):
+            if '=' in item:
+                name, value = item.split('=', 1)
+                parts[name.strip().upper()] = value.strip()
+    return parts
+
+
+def engine_key(engine: Engine) -> str:
+    """
+    Build a stable cache key identifying the server/database behind an engine.
+
+    Args:
+        engine: SQLAlchemy Engine object
+
+    Returns:
+        Key of the form "server/database" (falls back to the URL without password)
+    """
+    parts = _odbc_parts(engine)
+    if 'SERVER' in parts:
+        return f"{parts['SERVER']}/{parts.get('DATABASE', '')}"
+
+    return engine.url.render_as_string(hide_password=True)
+
+
+def engine_user(engine: Engine) -> str:
+    """
+    Return the login an engine authenticates as.
+
+    Args:
+        engine: SQLAlchemy Engine object
+
+    Returns:
+        URL username or ODBC UID ("" for integrated authentication)
+    """
+    if engine.url.username:
+        return engine.url.username
+    parts = _odbc_parts(engine)
+    return parts.get('UID', parts.get('USER ID', ''))
+
+
+def fetch_catalog_fingerprint(connection) -> tuple:
+    """
+    Fetch a cheap fingerprint of the table catalog for change detection.
+
+    Args:
+        connection: Open SQLAlchemy connection
+
+    Returns:
+        Tuple of (table_count: int, last_modified: str or None)
+    """
+    row = connection.execute(text("""
+        SELECT COUNT(*), MAX(modify_date)
+        FROM sys.tables
+        WHERE is_ms_shipped = 0
+    """)).one()
+    return int(row[0]), str(row[1]) if row[1] is not None else None
+
+
+def fetch_table_modify_dates(connection) -> dict[str, str]:
+    """
+    Fetch the last modification date of every user table.
+
+    Args:
+        connection: Open SQLAlchemy connection
+
+    Returns:
+        Dictionary mapping "schema.table" to its modify_date as string
+    """
+    result = connection.execute(text("""
+        SELECT s.name, t.name, t.modify_date
+        FROM sys.tables t
+        INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+        WHERE t.is_ms_shipped = 0
+    """))
+    return {f"{row[0]}.{row[1]}": str(row[2]) for row in result}
+
+
+# Base tables in catalog order; {top} and {name_filter} are filled in per call
+_TABLES_QUERY = """
+    SELECT {top} s.name AS schema_name, t.name AS table_name, t.object_id
+    FROM sys.tables t
+    INNER JOIN sys.schemas s ON t.schema_id = s.schema_id
+    WHERE t.is_ms_shipped = 0{name_filter}
+    {order_by}
+"""
+
+_COLUMNS_QUERY = """
+    WITH selected AS ({tables_query})
+    SELECT
+        sel.schema_name,
+        sel.table_name,
+        c.name,
+        ty.name,
+        CASE WHEN c.is_nullable = 1 THEN 'YES' ELSE 'NO' END,
+        dc.definition
+    FROM selected sel
+    INNER JOIN sys.columns c ON c.object_id = sel.object_id
+    INNER JOIN sys.types ty ON ty.user_type_id = c.user_type_id
+    LEFT JOIN sys.default_constraints dc ON dc.object_id = c.default_object_id
+    ORDER BY sel.schema_name, sel.table_name, c.column_id
+"""
+
+_PRIMARY_KEYS_QUERY = """
+    WITH selected AS ({tables_query})
+    SELECT sel.schema_name, sel.table_name, c.name
+    FROM selected sel
+    INNER JOIN sys.indexes i ON i.object_id = sel.object_id AND i.is_primary_key = 1
+    INNER JOIN sys.index_columns ic ON ic.object_id = i.object_id AND ic.index_id = i.index_id
+    INNER JOIN sys.columns c ON c.object_id = ic.object_id AND c.column_id = ic.column_id
+    ORDER BY sel.schema_name, sel.table_name, ic.key_ordinal
+"""
+
+_FOREIGN_KEYS_QUERY = """
+    WITH selected AS ({tables_query})
+    SELECT sel.schema_name, sel.table_name, pc.name, rs.name, rt.name, rc.name
+    FROM selected sel
+    INNER JOIN sys.foreign_key_columns fkc ON fkc.parent_object_id = sel.object_id
+    INNER JOIN sys.columns pc
+        ON pc.object_id = fkc.parent_object_id AND pc.column_id = fkc.parent_column_id
+    INNER JOIN sys.tables rt ON rt.object_id = fkc.referenced_object_id
+    INNER JOIN sys.schemas rs ON rs.schema_id = rt.schema_id
+    INNER JOIN sys.columns rc
+        ON rc.object_id = fkc.referenced_object_id AND rc.column_id = fkc.referenced_column_id
+    ORDER BY sel.schema_name, sel.table_name, fkc.constraint_object_id, fkc.constraint_column_id
+"""
+
+
+def _catalog_statement(query: str, names: list[str] = None, max_tables: int = None):
+    """
+    Build a catalog query restricted to a name list and/or the first max_tables tables.
+
+    Args:
+        query: One of the catalog queries with a {tables_query} placeholder
+        names: Optional "schema.table" names (filtered on the server)
+        max_tables: Optional TOP limit on the selected tables
+
+    Returns:
+        Tuple of (TextClause, parameters)
+    """
+    params = {}
+    top = order_by = name_filter = ""
+    if max_tables is not None:
+        top = "TOP (:max_tables)"
+        order_by = "ORDER BY s.name, t.name"
+        params['max_tables'] = max_tables
+    if names is not None:
+        name_filter = " AND s.name + '.' + t.name IN :names"
+        params['names'] = names
+
+    tables_query = _TABLES_QUERY.format(top=top, name_filter=name_filter, order_by=order_by)
+    statement = text(query.format(tables_query=tables_query))
+    if names is not None:
+        statement = statement.bindparams(bindparam('names', expanding=True))
+    return statement, params
+
+
+def _name_batches(table_names: Optional[list[str]]) -> list:
+    """Split a name list into batches (None = one unfiltered batch)."""
+    if table_names is None:
+        return [None]
+    # Keep well below SQL Server's 2100 parameter limit
+    names = list(table_names)
+    return [names[i:i + 1000] for i in range(0, len(names), 1000)]
+
+
+def count_tables(connection, table_names: list[str] = None) -> int:
+    """
+    Count user tables, optionally restricted to a list of names.
+
+    Args:
+        connection: Open SQLAlchemy connection
+        table_names: Optional list of "schema.table" names (None = all tables)
+
+    Returns:
+        Number of matching tables
+    """
+    total = 0
+    for batch in _name_batches(table_names):
+        if batch == []:
+            continue
+        statement, params = _catalog_statement(
+            "SELECT COUNT(*) FROM ({tables_query}) AS selected", batch
+        )
+        total += int(connection.execute(statement, params).scalar())
+    return total
+
+
+def _attach_keys(connection, tables: dict[str, dict], batches: list, max_tables: Optional[int]):
+    """Add primary and foreign key information to fetched tables."""
+    for batch in batches:
+        if batch == []:
+            continue
+        statement, params = _catalog_statement(_PRIMARY_KEYS_QUERY, batch, max_tables)
+        for row in connection.execute(statement, params):
+            table_info = tables.get(f"{row[0]}.{row[1]}")
+            if table_info is not None:
+                table_info['primary_key'].append(row[2])
+
+        statement, params = _catalog_statement(_FOREIGN_KEYS_QUERY, batch, max_tables)
+        for row in connection.execute(statement, params):
+            table_info = tables.get(f"{row[0]}.{row[1]}")
+            if table_info is not None:
+                table_info['foreign_keys'].append({
+                    'column': row[2],
+                    'references': f"{row[3]}.{row[4]}",
+                    'referenced_column': row[5],
+                })
+
+
+def fetch_schema_model(connection, table_names: list[str] = None, max_tables: int = None,
+                       include_keys: bool = True) -> dict[str, dict]:
+    """
+    Fetch table, column and key information from the SQL Server catalog.
+
+    The name filter and table limit are applied on the server, and rows are
+    streamed instead of being buffered, so asking for a handful of tables
+    does not transfer the whole catalog.
+
+    Args:
+        connection: Open SQLAlchemy connection
+        table_names: Optional list of "schema.table" names to fetch (None = all tables)
+        max_tables: Optional maximum number of tables (first ones in catalog order)
+        include_keys: Also fetch primary and foreign keys (default: True)
+
+    Returns:
+        Dictionary mapping "schema.table" to {'columns': [column_info, ...],
+        'primary_key': [column, ...], 'foreign_keys': [fk_info, ...]},
+        ordered by schema and table name
+    """
+    batches = _name_batches(table_names)
+    # With several name batches TOP would apply per batch; limit after merging instead
+    server_limit = max_tables if len(batches) == 1 else None
+
+    streaming = connection.execution_options(yield_per=1000)
+    tables = {}
+    for batch in batches:
+        if batch == []:
+            continue
+        statement, params = _catalog_statement(_COLUMNS_QUERY, batch, server_limit)
+        for row in streaming.execute(statement, params):
+            full_table_name = f"{row[0]}.{row[1]}"
+            table_info = tables.get(full_table_name)
+            if table_info is None:
+                table_info = tables[full_table_name] = {'columns': [], 'primary_key': [], 'foreign_keys': []}
+
+            table_info['columns'].append({
+                'name': row[2],
+                'type': row[3],
+                'nullable': row[4],
+                'default': row[5]
+            })
+
+    if len(batches) > 1:
+        names = sorted(tables, key=str.lower)
+        if max_tables is not None:
+            names = names[:max_tables]
+        tables = {name: tables[name] for name in names}
+
+    if include_keys and tables:
+        _attach_keys(connection, tables, batches, server_limit)
+
+    return tables
+
+
+def format_table_block(table_name: str, table_info: dict) -> str:
+    """
+    Format a single table of the schema model as text.
+
+    Primary key columns are marked with PK, foreign key columns with the
+    column they reference.
+
+    Args:
+        table_name: Full table name ("schema.table")
+        table_info: Table entry of the schema model ({'columns': [...], ...})
+
+    Returns:
+        Formatted table block, terminated by a blank line
+    """
+    primary_key = set(table_info.get('primary_key', ()))
+    references = {}
+    for fk in table_info.get('foreign_keys', ()):
+        references.setdefault(fk['column'], []).append(f"{fk['references']}.{fk['referenced_column']}")
+
+    lines = [f"Table: {table_name}", "Columns:"]
+    for col in table_info['columns']:
+        details = [col['type'], "NULL" if col['nullable'] == 'YES' else "NOT NULL"]
+        if col['name'] in primary_key:
+            details.append("PK")
+        for target in references.get(col['name'], ()):
+            details.append(f"FK -> {target}")
+        lines.append(f"  - {col['name']} ({', '.join(details)})")
+
+    lines.append("\n")
+    return "\n".join(lines)
+
+
+def format_schema_info(tables: dict[str, dict], limit_tables: list[str] = None, max_tables: int = 20,
+                       total_tables: int = None) -> str:
+    """
+    Format a table/column model as readable text for LLM context.
+
+    Args:
+        tables: Dictionary mapping "schema.table" to {'columns': [...], ...}
+        limit_tables: Optional list of table names to include (None = all tables)
+        max_tables: Maximum number of tables to include (default: 20)
+        total_tables: Number of matching tables when tables was already limited
+            on the server (default: len of the filtered tables)
+
+    Returns:
+        Formatted string containing schema information
+    """
+    if limit_tables:
+        wanted = set(limit_tables)
+        table_names = [name for name in tables if name in wanted]
+    else:
+        table_names = list(tables)
+
+    total = len(table_names) if total_tables is None else total_tables
+
+    parts = ["Database Schema:\n\n"]
+    parts.extend(format_table_block(name, tables[name]) for name in table_names[:max_tables])
+
+    if total > max_tables:
+        parts.append(f"\n... and {total - max_tables} more tables\n")
+
+    return "".join(parts)
+
+
+def get_schema_info(engine: Engine, limit_tables: list[str] = None, max_tables: int = 20,
+                    cache: Optional["SchemaCache"] = None) -> str:
     """
     Retrieve database schema information formatted for LLM context.
 
+    Without a cache only the requested tables are read from the catalog.
+
     Args:
         engine: SQLAlchemy Engine object
         limit_tables: Optional list of table names to include (None = all tables)
         max_tables: Maximum number of tables to include (default: 20)
+        cache: Optional SchemaCache to serve the table/column model from
 
     Returns:
         Formatted string containing schema information
     """
     try:
+        if cache is not None:
+            tables = cache.get_tables(engine)
+            return format_schema_info(tables, limit_tables=limit_tables, max_tables=max_tables)
+
+        table_names = limit_tables or None
         with engine.connect() as connection:
-            # Query to get table and column information
-            query = text("""
-                SELECT
-                    t.TABLE_SCHEMA,
-                    t.TABLE_NAME,
-                    c.COLUMN_NAME,
-                    c.DATA_TYPE,
-                    c.IS_NULLABLE,
-                    c.COLUMN_DEFAULT
-                FROM INFORMATION_SCHEMA.TABLES t
-                INNER JOIN INFORMATION_SCHEMA.COLUMNS c
-                    ON t.TABLE_SCHEMA = c.TABLE_SCHEMA
-                    AND t.TABLE_NAME = c.TABLE_NAME
-                WHERE t.TABLE_TYPE = 'BASE TABLE'
-                ORDER BY t.TABLE_SCHEMA, t.TABLE_NAME, c.ORDINAL_POSITION
-            """)
-
-            result = connection.execute(query)
-            rows = result.fetchall()
-
-            # Organize data by table
-            tables = {}
-            for row in rows:
-                schema_name = row[0]
-                table_name = row[1]
-                full_table_name = f"{schema_name}.{table_name}"
-
-                # Skip if not in limit_tables (if specified)
-                if limit_tables and full_table_name not in limit_tables:
-                    continue
-
-                if full_table_name not in tables:
-                    tables[full_table_name] = []
-
-                column_info = {
-                    'name': row[2],
-                    'type': row[3],
-                    'nullable': row[4],
-                    'default': row[5]
-                }
-                tables[full_table_name].append(column_info)
-
-            # Limit number of tables if needed
-            table_names = list(tables.keys())[:max_tables]
-
-            # Format as readable text
-            schema_text = "Database Schema:\n\n"
-
-            for table_name in table_names:
-                schema_text += f"Table: {table_name}\n"
-                schema_text += "Columns:\n"
-
-                for col in tables[table_name]:
-                    nullable = "NULL" if col['nullable'] == 'YES' else "NOT NULL"
-                    schema_text += f"  - {col['name']} ({col['type']}, {nullable})\n"
-
-                schema_text += "\n"
-
-            if len(tables) > max_tables:
-                schema_text += f"\n... and {len(tables) - max_tables} more tables\n"
-
-            return schema_text
+            tables = fetch_schema_model(connection, table_names=table_names, max_tables=max_tables)
+            total = len(tables)
+            if total >= max_tables:
+                total = count_tables(connection, table_names)
+
+        return format_schema_info(tables, max_tables=max_tables, total_tables=total)
 
     except Exception as e:
         return f"Error retrieving schema: {str(e)}"
@@ -0,0 +1,135 @@
+"""
+Dedicated, bounded executor for blocking database work.
+
+pyodbc calls block the calling thread. The async APIs run them on this
+executor so a slow query never blocks the event loop, and the number of
+concurrent database calls stays bounded. Queue depth and activity are
+tracked for monitoring.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+class DatabaseExecutor(Executor):
+    """Thread pool executor with queue-depth metrics."""
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Maximum number of concurrently running database calls
+        """
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bi-sql")
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+
+    def _track(self, fn: Callable, *args, **kwargs) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+        self._local.in_worker = True
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            self._local.in_worker = False
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+        return result
+
+    def in_worker(self) -> bool:
+        """
+        Check whether the calling thread is running a call of this executor.
+
+        Blocking on further calls from inside a worker can deadlock once every
+        worker waits; callers use this to run nested work inline instead.
+
+        Returns:
+            True inside a call submitted to this executor
+        """
+        return getattr(self._local, 'in_worker', False)
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """
+        Schedule fn(*args, **kwargs) on the executor.
+
+        Args:
+            fn: Blocking callable
+
+        Returns:
+            concurrent.futures.Future of the call
+        """
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._pool.submit(self._track, fn, *args, **kwargs)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            raise
+
+        # A call cancelled while queued never reaches _track
+        def _on_done(f: Future):
+            if f.cancelled():
+                with self._lock:
+                    self._queued -= 1
+
+        future.add_done_callback(_on_done)
+        return future
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Await a blocking call on the executor.
+
+        Cancelling the awaiting task (or hitting the timeout) cancels the
+        call if it has not started yet; a running call finishes in the
+        background.
+
+        Args:
+            fn: Blocking callable
+            timeout: Optional seconds to wait before raising TimeoutError
+
+        Returns:
+            Result of fn
+        """
+        future = self.submit(functools.partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+
+    def metrics(self) -> dict:
+        """
+        Return executor metrics.
+
+        Returns:
+            Dictionary with max_workers, queue_depth (waiting calls), active,
+            completed and failed call counts
+        """
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'queue_depth': self._queued,
+                'active': self._active,
+                'completed': self._completed,
+                'failed': self._failed,
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# Process-wide executor shared by the async database APIs
+db_executor = DatabaseExecutor(max_workers=int(os.getenv("DB_EXECUTOR_WORKERS", "8")))
@@ -0,0 +1,224 @@
+"""
+Process-wide registry of pooled database engines.
+
+Agent tools and services used to create (and dispose) an engine per call,
+paying a new ODBC connection and TLS handshake every time. This module keeps
+one pooled engine per set of connection parameters, with explicit pool
+sizing, pre-ping and recycle settings, warm-up and pool statistics.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+from .db_config import create_db_engine
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_count += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+
+class EngineRegistry:
+    """Shared, pooled SQLAlchemy engines keyed by connection parameters."""
+
+    def __init__(self, pool_size: int = 5, max_overflow: int = 10, pool_timeout: float = 30,
+                 pool_recycle: int = 1800, pool_pre_ping: bool = True):
+        """
+        Initialize the registry with the pool settings used for new engines.
+
+        Args:
+            pool_size: Number of connections kept open per engine
+            max_overflow: Extra connections allowed above pool_size under load
+            pool_timeout: Seconds to wait for a free connection before failing
+            pool_recycle: Seconds after which connections are re-established
+            pool_pre_ping: Test connections for liveness on checkout
+        """
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pool_pre_ping = pool_pre_ping
+        self._engines: Dict[tuple, Engine] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(server: str, database: str, username: str, password: str, driver: str) -> tuple:
+        # Never keep the plain password in the registry key
+        password_hash = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        return (server, database, username, password_hash, driver)
+
+    def get_engine(self, server: str, database: str, username: str, password: str,
+                   driver: str = "ODBC Driver 18 for SQL Server") -> Engine:
+        """
+        Return the shared engine for the given connection parameters.
+
+        The engine is created on first use and reused afterwards.
+
+        Args:
+            server: SQL Server hostname
+            database: Database name
+            username: Database username
+            password: Database password
+            driver: ODBC driver name
+
+        Returns:
+            Pooled SQLAlchemy Engine object
+        """
+        key = self._key(server, database, username, password, driver)
+
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = create_db_engine(
+                    server, database, username, password, driver,
+                    poolclass=TimedQueuePool,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    pool_recycle=self.pool_recycle,
+                    pool_pre_ping=self.pool_pre_ping,
+                )
+                self._engines[key] = engine
+
+        return engine
+
+    def warm_up(self, engine: Engine, connections: Optional[int] = None) -> int:
+        """
+        Open pooled connections ahead of the first request.
+
+        Args:
+            engine: Engine returned by get_engine()
+            connections: Number of connections to open (default: pool_size)
+
+        Returns:
+            Number of connections that were opened successfully
+        """
+        target = self.pool_size if connections is None else min(connections, self.pool_size)
+        opened = []
+        try:
+            # Hold all connections at once so the pool has to open new ones
+            for _ in range(target):
+                opened.append(engine.connect())
+        except Exception:
+            pass
+        finally:
+            for connection in opened:
+                connection.close()
+
+        return len(opened)
+
+    def capacity(self, engine: Engine) -> int:
+        """
+        Return the maximum number of concurrent connections of an engine.
+
+        Args:
+            engine: SQLAlchemy Engine object
+
+        Returns:
+            pool_size + max_overflow for queue pools, otherwise pool_size
+        """
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            return pool.size() + max(pool._max_overflow, 0)
+        return self.pool_size
+
+    def pool_stats(self, engine: Engine) -> dict:
+        """
+        Return connection pool statistics for an engine.
+
+        Args:
+            engine: SQLAlchemy Engine object
+
+        Returns:
+            Dictionary with pool size, checked-in/out connections, overflow
+            and checkout wait times (seconds)
+        """
+        pool = engine.pool
+        stats = {'status': pool.status()}
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+
+        if isinstance(pool, TimedQueuePool):
+            stats.update({
+                'checkouts': pool.wait_count,
+                'wait_time_total': pool.wait_time_total,
+                'wait_time_avg': pool.wait_time_total / pool.wait_count if pool.wait_count else 0.0,
+                'wait_time_max': pool.wait_time_max,
+            })
+
+        return stats
+
+    def all_pool_stats(self) -> Dict[str, dict]:
+        """
+        Return pool statistics for every registered engine.
+
+        Returns:
+            Dictionary mapping "server/database" to pool statistics
+        """
+        with self._lock:
+            items = list(self._engines.items())
+        return {f"{key[0]}/{key[1]}": self.pool_stats(engine) for key, engine in items}
+
+    def dispose_all(self):
+        """Dispose all registered engines and clear the registry."""
+        with self._lock:
+            engines = list(self._engines.values())
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose()
+
+
+# One connection pool per server/database/login for the whole process
+engine_registry = EngineRegistry(
+    pool_size=int(os.getenv("MSSQL_POOL_SIZE", "5")),
+    max_overflow=int(os.getenv("MSSQL_POOL_MAX_OVERFLOW", "10")),
+    pool_timeout=float(os.getenv("MSSQL_POOL_TIMEOUT", "30")),
+    pool_recycle=int(os.getenv("MSSQL_POOL_RECYCLE", "1800")),
+)
+
+
+def get_engine(server: str, database: str, username: str, password: str,
+               driver: str = "ODBC Driver 18 for SQL Server") -> Engine:
+    """
+    Return the shared pooled engine for the given connection parameters.
+
+    Args:
+        server: SQL Server hostname
+        database: Database name
+        username: Database username
+        password: Database password
+        driver: ODBC driver name
+
+    Returns:
+        Pooled SQLAlchemy Engine object
+    """
+    return engine_registry.get_engine(server, database, username, password, driver)
@@ -0,0 +1,652 @@
+"""
+Local columnar extracts of hot tables.
+
+Configured tables (typically the campaign/performance tables most questions
+hit) are snapshotted into local Parquet files per server, database and
+login, either fully or incrementally by watermark and key columns.
+Validated SELECTs that only reference fresh extracts of the same engine are
+answered by an embedded DuckDB engine; everything else (other tables, stale
+extracts, string literals under a case-insensitive collation, T-SQL DuckDB
+cannot run) falls back to the live server. Each DuckDB cursor is set up to
+match SQL Server semantics where results would otherwise differ silently:
+integer division truncates, NULLs sort first ascending and last descending,
+and string comparison ignores case. Requires duckdb and pyarrow (the
+"extracts" extra).
+"""
+
+import datetime
+import decimal
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from .db_config import engine_key, engine_user
+from .sql_lexer import OPERATOR, QUOTED_IDENT, STRING, WORD, Token, significant_tokens, tokenize
+from .sql_rewrite import analyze_query
+
+try:
+    import duckdb
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependencies
+    duckdb = None
+
+META_FILE = "extracts.json"
+
+# T-SQL functions that DuckDB knows under another name (ISNULL is reserved in DuckDB)
+_MACROS = (
+    "CREATE OR REPLACE MACRO getdate() AS now()::TIMESTAMP",
+    "CREATE OR REPLACE MACRO sysdatetime() AS now()::TIMESTAMP",
+)
+
+
+def _split_name(name: str) -> List[str]:
+    """Split a dotted table name and strip [..] / ".." quoting."""
+    parts = []
+    for token in significant_tokens(tokenize(name)):
+        if token.type == QUOTED_IDENT:
+            parts.append(token.value[1:-1])
+        elif token.type == WORD:
+            parts.append(token.value)
+    return parts
+
+
+def _table_key(parts: List[str], default_schema: str) -> Optional[str]:
+    """Normalized "schema.table" key (None for database-qualified names)."""
+    if len(parts) == 1:
+        parts = [default_schema] + parts
+    if len(parts) != 2:
+        return None
+    return '.'.join(part.lower() for part in parts)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _engine_scope(engine: Engine) -> str:
+    """Server, database and login a snapshot belongs to."""
+    return f"{engine_key(engine)}|{engine_user(engine)}"
+
+
+# Watermark types stored as strings in the metadata, with their parsers
+_WATERMARK_TYPES = {
+    'datetime': datetime.datetime.fromisoformat,
+    'date': datetime.date.fromisoformat,
+    'decimal': decimal.Decimal,
+    'binary': bytes.fromhex,
+}
+
+
+def _dump_watermark(value: Any) -> tuple:
+    """JSON-compatible (value, type) pair for the extract metadata."""
+    if isinstance(value, datetime.datetime):
+        return value.isoformat(), 'datetime'
+    if isinstance(value, datetime.date):
+        return value.isoformat(), 'date'
+    if isinstance(value, decimal.Decimal):
+        return str(value), 'decimal'
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex(), 'binary'  # rowversion
+    return value, None
+
+
+def _load_watermark(meta: dict) -> Any:
+    """Watermark from the extract metadata, typed so it binds as the column's type."""
+    value = meta.get('watermark_value')
+    parse = _WATERMARK_TYPES.get(meta.get('watermark_type'))
+    return parse(value) if parse is not None and value is not None else value
+
+
+def _read_table_ref(tokens: List[Token], i: int) -> tuple:
+    """Read a (possibly dotted) table name at tokens[i]; returns (parts, index after it)."""
+    parts = []
+    while i < len(tokens) and tokens[i].type in (WORD, QUOTED_IDENT):
+        parts.extend(_split_name(tokens[i].value))
+        if i + 1 < len(tokens) and tokens[i + 1].value == '.':
+            i += 2
+        else:
+            i += 1
+            break
+    return parts, i
+
+
+def referenced_tables(tokens: List[Token], default_schema: str = "dbo") -> Optional[set]:
+    """
+    Collect the tables a query reads from.
+
+    Args:
+        tokens: Significant tokens of the query
+        default_schema: Schema of unqualified names
+
+    Returns:
+        Set of normalized "schema.table" keys (CTE names excluded), or None if
+        the query reads from something that cannot be served from extracts
+        (database-qualified names, table-valued functions)
+    """
+    ctes = set()
+    for i in range(len(tokens) - 2):
+        if tokens[i].type in (WORD, QUOTED_IDENT) and tokens[i + 1].is_keyword('AS') \
+                and tokens[i + 2].value == '(':
+            ctes.add(_split_name(tokens[i].value)[0].lower())
+
+    tables = set()
+    depth = 0
+    from_depth = None  # depth of the FROM list whose commas separate tables
+    for i, token in enumerate(tokens):
+        if token.type == OPERATOR and token.value == '(':
+            depth += 1
+            continue
+        if token.type == OPERATOR and token.value == ')':
+            depth -= 1
+            if from_depth is not None and depth < from_depth:
+                from_depth = None
+            continue
+
+        if token.is_keyword('FROM', 'JOIN'):
+            from_depth = depth
+        elif token.value == ',' and from_depth == depth:
+            pass
+        else:
+            if depth == from_depth and token.is_keyword('WHERE', 'GROUP', 'HAVING', 'ORDER', 'UNION', 'EXCEPT',
+                                                         'INTERSECT', 'OPTION', 'FOR', 'SELECT'):
+                from_depth = None
+            continue
+
+        if i + 1 >= len(tokens) or tokens[i + 1].value == '(':
+            # Derived table: its own FROM clauses are visited by the scan
+            continue
+
+        parts, end = _read_table_ref(tokens, i + 1)
+        if end < len(tokens) and tokens[end].value == '(':
+            return None  # table-valued function
+        if len(parts) == 1 and parts[0].lower() in ctes:
+            continue
+
+        key = _table_key(parts, default_schema)
+        if key is None:
+            return None
+        tables.add(key)
+    return tables
+
+
+def to_duckdb_sql(query: str) -> Optional[str]:
+    """
+    Translate the T-SQL dialect bits of a SELECT into DuckDB SQL.
+
+    [bracketed] identifiers become "quoted" identifiers and a literal
+    TOP (n) becomes LIMIT n.
+
+    Args:
+        query: Validated SELECT query
+
+    Returns:
+        DuckDB query, or None if the query cannot be translated (TOP with
+        PERCENT/WITH TIES or a non-literal count)
+    """
+    structure = analyze_query(query)
+    if structure is None:
+        return None
+
+    edits = []
+    limit = None
+    if structure.top is not None:
+        first, last, literal, percent = structure.top
+        tokens = structure.tokens
+        with_ties = last + 2 < len(tokens) and tokens[last + 1].is_keyword('WITH') \
+            and tokens[last + 2].is_keyword('TIES')
+        if literal is None or percent or with_ties or structure.offset is not None:
+            return None
+        limit = tokens[literal].value
+        edits.append((tokens[first].start, tokens[last].end, ''))
+
+    for token in structure.tokens:
+        if token.type == QUOTED_IDENT and token.value.startswith('['):
+            edits.append((token.start, token.end, _quote(token.value[1:-1].replace(']]', ']'))))
+
+    end = structure.tokens[-1].end
+    result = []
+    pos = 0
+    for start, stop, new_text in sorted(edits):
+        result.append(query[pos:start])
+        result.append(new_text)
+        pos = stop
+    result.append(query[pos:end])
+    translated = ''.join(result)
+
+    if limit is not None:
+        # FOR XML/JSON and OPTION tails are not eligible anyway
+        if structure.tail < len(structure.tokens):
+            return None
+        translated += f" LIMIT {limit}"
+    return translated
+
+
+class ExtractCache:
+    """Local Parquet snapshots of hot tables, queried through DuckDB."""
+
+    def __init__(self, extract_dir: Optional[str], tables: Optional[Dict[str, dict]] = None,
+                 max_staleness: float = 900.0, default_schema: str = "dbo", case_sensitive: bool = False):
+        """
+        Initialize the extract cache.
+
+        Snapshots belong to the server, database and login they were taken
+        with; queries are only answered from snapshots of the same engine.
+
+        Args:
+            extract_dir: Directory for Parquet snapshots (None disables the cache)
+            tables: Table name -> options. Options (all optional):
+                - watermark: column for incremental refreshes (rows with a
+                  larger value are appended; requires key)
+                - key: list of key columns; only the latest version of each
+                  key is visible and keys deleted at the source disappear
+                - source: SQL source to snapshot instead of the table itself
+                - max_staleness: seconds a snapshot may be served after its
+                  refresh (default: max_staleness)
+            max_staleness: Default freshness limit in seconds
+            default_schema: Schema of unqualified table names
+            case_sensitive: Whether the source database compares strings
+                case-sensitively. With the default (case-insensitive
+                collation) DuckDB compares columns with the NOCASE collation
+                and queries with string literals go to the live server.
+        """
+        self.extract_dir = extract_dir
+        self.max_staleness = max_staleness
+        self.default_schema = default_schema
+        self.case_sensitive = case_sensitive
+        self.tables: Dict[str, dict] = {}
+        self._meta: Dict[str, Dict[str, dict]] = {}
+        self._lock = threading.RLock()
+        self._refresh_locks: Dict[tuple, threading.Lock] = {}
+        self._cons: Dict[str, Any] = {}
+        self.stats = {'hits': 0, 'ineligible': 0, 'stale': 0, 'errors': 0, 'refreshes': 0, 'rows_loaded': 0}
+
+        for name, options in (tables or {}).items():
+            self.add_table(name, **options)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether extracts can be used (directory configured, duckdb/pyarrow installed)."""
+        return bool(self.extract_dir) and duckdb is not None
+
+    def add_table(self, name: str, watermark: Optional[str] = None, key: Optional[List[str]] = None,
+                  source: Optional[str] = None, max_staleness: Optional[float] = None):
+        """
+        Register a table for extraction.
+
+        Args:
+            name: Table name as used in queries (e.g. "dbo.Campaigns")
+            watermark: Column for incremental refreshes
+            key: Key columns for de-duplicating incremental rows (required
+                with a watermark)
+            source: SQL source to snapshot (default: the table itself)
+            max_staleness: Freshness limit in seconds
+        """
+        table_key = _table_key(_split_name(name), self.default_schema)
+        if table_key is None:
+            raise ValueError(f"Invalid extract table name: {name}")
+        if watermark and not key:
+            # Updated rows would be appended as a second version
+            raise ValueError(f"Extract table {name} has a watermark but no key columns")
+
+        with self._lock:
+            self.tables[table_key] = {
+                'name': name,
+                'watermark': watermark,
+                'key': list(key or []),
+                'source': source,
+                'max_staleness': self.max_staleness if max_staleness is None else max_staleness,
+            }
+            for scope, con in self._cons.items():
+                if table_key in self._scope_meta(scope):
+                    self._create_view(con, scope, table_key)
+
+    # -- snapshots -------------------------------------------------------
+
+    def _scope_dir(self, scope: str) -> str:
+        return os.path.join(self.extract_dir, hashlib.sha1(scope.encode('utf-8')).hexdigest()[:16])
+
+    def _table_dir(self, scope: str, table_key: str) -> str:
+        return os.path.join(self._scope_dir(scope), table_key)
+
+    def _keys_path(self, scope: str, table_key: str) -> str:
+        """Parquet file with the keys currently present at the source."""
+        return os.path.join(self._table_dir(scope, table_key), 'keys', 'current.parquet')
+
+    def _scope_meta(self, scope: str) -> Dict[str, dict]:
+        """Snapshot metadata of one engine (loaded from disk on first use)."""
+        with self._lock:
+            meta = self._meta.get(scope)
+            if meta is None:
+                try:
+                    with open(os.path.join(self._scope_dir(scope), META_FILE), encoding='utf-8') as f:
+                        meta = json.load(f).get('tables', {})
+                except (FileNotFoundError, ValueError):
+                    meta = {}
+                self._meta[scope] = meta
+            return meta
+
+    def _save_meta(self, scope: str):
+        scope_dir = self._scope_dir(scope)
+        os.makedirs(scope_dir, exist_ok=True)
+        path = os.path.join(scope_dir, META_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'scope': scope, 'tables': self._meta[scope]}, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def refresh(self, engine: Engine, tables: Optional[List[str]] = None, full: bool = False,
+                batch_size: int = 10000) -> Dict[str, int]:
+        """
+        Snapshot tables from the live database.
+
+        Tables with a watermark column and an existing snapshot are refreshed
+        incrementally (only rows with a larger watermark are fetched, plus
+        the current key list to drop deleted rows) unless full=True.
+
+        Args:
+            engine: SQLAlchemy Engine of the live database
+            tables: Table names to refresh (default: all configured tables)
+            full: Force full snapshots
+            batch_size: Rows fetched and written per batch
+
+        Returns:
+            Dictionary of table key -> number of rows loaded
+        """
+        if not self.enabled:
+            return {}
+
+        scope = _engine_scope(engine)
+        keys = self.tables if tables is None else [_table_key(_split_name(name), self.default_schema)
+                                                   for name in tables]
+        return {table_key: self._refresh_table(engine, scope, table_key, full, batch_size) for table_key in keys}
+
+    def refresh_stale(self, engine: Engine, **kwargs) -> Dict[str, int]:
+        """
+        Refresh only tables whose snapshot is missing or stale.
+
+        Args:
+            engine: SQLAlchemy Engine of the live database
+            **kwargs: Extra refresh() options
+
+        Returns:
+            Dictionary of table key -> number of rows loaded
+        """
+        stale = [table_key for table_key in self.tables if not self.is_fresh(engine, table_key)]
+        return self.refresh(engine, tables=stale, **kwargs) if stale else {}
+
+    def _fetch_to_parquet(self, connection, query: str, params: dict, path: str, batch_size: int,
+                          watermark: Optional[str] = None, max_watermark: Any = None,
+                          write_empty: bool = True) -> tuple:
+        """Stream a query into a Parquet file; returns (rows, max watermark value)."""
+        rows = 0
+        writer = None
+        try:
+            result = connection.execute(text(query), params)
+            columns = list(result.keys())
+            while True:
+                batch_rows = result.fetchmany(batch_size)
+                if not batch_rows:
+                    break
+                # Built from the rows directly: nullable integers stay integers, decimals exact
+                table = pa.Table.from_arrays([pa.array([row[i] for row in batch_rows])
+                                              for i in range(len(columns))], names=columns)
+                if writer is None:
+                    schema = pa.schema([
+                        field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                        for field in table.schema
+                    ]).remove_metadata()
+                    writer = pq.ParquetWriter(path, schema)
+                writer.write_table(table.cast(writer.schema, safe=False))
+                rows += table.num_rows
+                batch_max = pc.max(table[watermark]).as_py() if watermark else None
+                if batch_max is not None and (max_watermark is None or batch_max > max_watermark):
+                    max_watermark = batch_max
+            if writer is None and write_empty:
+                # Empty result: keep an empty file so queries still work
+                pq.write_table(pa.Table.from_pandas(pd.DataFrame(columns=columns)), path)
+            if writer is not None:
+                writer.close()
+                writer = None
+        except BaseException:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(path):
+                os.remove(path)
+            raise
+        return rows, max_watermark
+
+    def _refresh_table(self, engine: Engine, scope: str, table_key: str, full: bool, batch_size: int) -> int:
+        config = self.tables[table_key]
+        with self._lock:
+            lock = self._refresh_locks.setdefault((scope, table_key), threading.Lock())
+
+        with lock:
+            meta = self._scope_meta(scope).get(table_key, {})
+            watermark = config['watermark']
+            last_watermark = _load_watermark(meta)
+            incremental = bool(watermark) and not full and last_watermark is not None
+
+            source = config['source'] or '.'.join(f"[{part}]" for part in table_key.split('.'))
+            query = f"SELECT * FROM {source}"
+            params = {}
+            if incremental:
+                query += f" WHERE [{watermark}] > :watermark"
+                params['watermark'] = last_watermark
+
+            table_dir = self._table_dir(scope, table_key)
+            keys_path = self._keys_path(scope, table_key)
+            os.makedirs(os.path.dirname(keys_path), exist_ok=True)
+            part = f"{'inc' if incremental else 'full'}_{time.time_ns()}.parquet"
+            tmp_path = os.path.join(table_dir, f"{part}.tmp")
+            keys_tmp_path = f"{keys_path}.tmp"
+
+            with engine.connect().execution_options(stream_results=True, max_row_buffer=batch_size) as connection:
+                rows, max_watermark = self._fetch_to_parquet(
+                    connection, query, params, tmp_path, batch_size, watermark=watermark,
+                    max_watermark=last_watermark if incremental else None,
+                    write_empty=not incremental)
+                if incremental:
+                    # Keys still present at the source; rows of other keys were deleted
+                    key_list = ', '.join(f"[{column}]" for column in config['key'])
+                    try:
+                        self._fetch_to_parquet(connection, f"SELECT {key_list} FROM {source}", {},
+                                               keys_tmp_path, batch_size)
+                    except BaseException:
+                        if os.path.exists(tmp_path):
+                            os.remove(tmp_path)
+                        raise
+
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, os.path.join(table_dir, part))
+            if incremental:
+                os.replace(keys_tmp_path, keys_path)
+            else:
+                # The new full snapshot replaces all older parts and the key list
+                for old in glob.glob(os.path.join(table_dir, '*.parquet')) + [keys_path]:
+                    if os.path.basename(old) != part and os.path.exists(old):
+                        os.remove(old)
+
+            watermark_value, watermark_type = _dump_watermark(max_watermark)
+            with self._lock:
+                self._scope_meta(scope)[table_key] = {
+                    'refreshed_at': time.time(),
+                    'watermark_value': watermark_value,
+                    'watermark_type': watermark_type,
+                    'rows': (meta.get('rows', 0) if incremental else 0) + rows,
+                    'mode': 'incremental' if incremental else 'full',
+                }
+                self._save_meta(scope)
+                self.stats['refreshes'] += 1
+                self.stats['rows_loaded'] += rows
+                con = self._cons.get(scope)
+                if con is not None:
+                    self._create_view(con, scope, table_key)
+            return rows
+
+    def is_fresh(self, engine: Engine, table_name: str) -> bool:
+        """
+        Check whether a table can be served from its snapshot.
+
+        Args:
+            engine: SQLAlchemy Engine the query would run against
+            table_name: Table name or normalized key
+
+        Returns:
+            True if a snapshot of this engine exists and is within the
+            table's max_staleness
+        """
+        table_key = _table_key(_split_name(table_name), self.default_schema)
+        config = self.tables.get(table_key)
+        meta = self._scope_meta(_engine_scope(engine)).get(table_key)
+        if config is None or meta is None:
+            return False
+        return time.time() - meta['refreshed_at'] <= config['max_staleness']
+
+    # -- queries ---------------------------------------------------------
+
+    def _connection(self, scope: str):
+        with self._lock:
+            con = self._cons.get(scope)
+            if con is None:
+                con = self._cons[scope] = duckdb.connect(database=':memory:')
+                for macro in _MACROS:
+                    con.execute(macro)
+                for table_key in self.tables:
+                    if table_key in self._scope_meta(scope):
+                        self._create_view(con, scope, table_key)
+            cursor = con.cursor()
+
+        # Settings are per connection: resolve unqualified names in the default schema
+        # and compute like SQL Server (7 / 2 = 3, NULLs lowest in sort order)
+        cursor.execute(f"SET search_path = '{self.default_schema.lower()},main'")
+        cursor.execute("SET integer_division = true")
+        cursor.execute("SET default_null_order = 'nulls_first_on_asc_last_on_desc'")
+        if not self.case_sensitive:
+            cursor.execute("SET default_collation = 'nocase'")
+        return cursor
+
+    def _create_view(self, con, scope: str, table_key: str):
+        """(Re)create the DuckDB view over a table's Parquet parts."""
+        config = self.tables[table_key]
+        schema, table = table_key.split('.')
+        pattern = os.path.join(self._table_dir(scope, table_key), '*.parquet').replace("'", "''")
+        source = f"read_parquet('{pattern}', union_by_name = true)"
+
+        if config['watermark'] and config['key']:
+            keys = ', '.join(_quote(column) for column in config['key'])
+            source = (f"(SELECT * FROM {source} QUALIFY row_number() OVER "
+                      f"(PARTITION BY {keys} ORDER BY {_quote(config['watermark'])} DESC) = 1)")
+            keys_path = self._keys_path(scope, table_key)
+            if os.path.exists(keys_path):
+                source = (f"(SELECT _rows.* FROM {source} AS _rows SEMI JOIN "
+                          f"read_parquet('{keys_path.replace(chr(39), chr(39) * 2)}') AS _keys USING ({keys}))")
+
+        con.execute(f"CREATE SCHEMA IF NOT EXISTS {_quote(schema)}")
+        con.execute(f"CREATE OR REPLACE VIEW {_quote(schema)}.{_quote(table)} AS SELECT * FROM {source}")
+
+    def execute(self, engine: Engine, query: str, max_rows: Optional[int] = None) -> Optional[pd.DataFrame]:
+        """
+        Answer a validated SELECT from the extracts if possible.
+
+        Args:
+            engine: SQLAlchemy Engine the query is meant for
+            query: Validated SELECT query
+            max_rows: Maximum number of rows to return
+
+        Returns:
+            DataFrame, or None if the query has to go to the live server
+            (not eligible, stale snapshot or DuckDB could not run it)
+        """
+        if not self.enabled or not self.tables:
+            return None
+
+        tokens = significant_tokens(tokenize(query))
+        tables = referenced_tables(tokens, self.default_schema)
+        if not tables or any(table_key not in self.tables for table_key in tables) \
+                or (not self.case_sensitive and any(token.type == STRING for token in tokens)):
+            # String literals would be compared with DuckDB semantics, not the server collation
+            self.stats['ineligible'] += 1
+            return None
+        if not all(self.is_fresh(engine, table_key) for table_key in tables):
+            self.stats['stale'] += 1
+            return None
+
+        translated = to_duckdb_sql(query)
+        if translated is None:
+            self.stats['ineligible'] += 1
+            return None
+
+        try:
+            relation = self._connection(_engine_scope(engine)).sql(translated)
+            if max_rows is not None:
+                relation = relation.limit(max_rows)
+            df = relation.df()
+        except Exception:
+            # Dialect differences: let SQL Server answer
+            self.stats['errors'] += 1
+            return None
+
+        self.stats['hits'] += 1
+        return df
+
+    def get_stats(self) -> dict:
+        """
+        Return extract counters and snapshot state.
+
+        Returns:
+            Dictionary with hits, ineligible, stale, errors, refreshes,
+            rows_loaded and per-engine, per-table snapshot info (rows, mode,
+            age, fresh)
+        """
+        stats = dict(self.stats)
+        now = time.time()
+        with self._lock:
+            scopes = {scope: dict(meta) for scope, meta in self._meta.items()}
+        stats['tables'] = {
+            scope: {
+                table_key: {
+                    'rows': meta[table_key].get('rows'),
+                    'mode': meta[table_key].get('mode'),
+                    'age_seconds': now - meta[table_key]['refreshed_at'],
+                    'fresh': now - meta[table_key]['refreshed_at'] <= self.tables[table_key]['max_staleness'],
+                }
+                for table_key in self.tables if table_key in meta
+            }
+            for scope, meta in scopes.items()
+        }
+        return stats
+
+
+def _tables_from_env(value: Optional[str]) -> Dict[str, dict]:
+    """Parse EXTRACT_TABLES ("dbo.Campaigns:ModifiedAt:CampaignId,dbo.Channels")."""
+    tables = {}
+    for item in (value or '').split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, options = item.partition(':')
+        watermark, _, key = options.partition(':')
+        tables[name.strip()] = {
+            'watermark': watermark.strip() or None,
+            'key': [column.strip() for column in key.split('+') if column.strip()],
+        }
+    return tables
+
+
+# Process-wide extract cache (disabled unless EXTRACT_CACHE_DIR is set)
+extract_cache = ExtractCache(
+    os.getenv("EXTRACT_CACHE_DIR"),
+    tables=_tables_from_env(os.getenv("EXTRACT_TABLES")),
+    max_staleness=float(os.getenv("EXTRACT_MAX_STALENESS", "900")),
+    case_sensitive=os.getenv("EXTRACT_CASE_SENSITIVE", "").lower() in ("1", "true", "yes"),
+)
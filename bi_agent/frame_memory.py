@@ -0,0 +1,83 @@
+"""
+Memory-optimized materialization of query results.
+
+Converts the default object/float64/int64 columns of a fetched DataFrame
+into compact dtypes: Arrow-backed strings, categoricals for low-cardinality
+text columns (channel, platform, country, ...) and downcast numerics.
+Conversions are lossless; columns that would lose information stay as they
+are.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .result_cache import dataframe_bytes
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:  # optional dependency
+    STRING_DTYPE = "string"
+
+
+def _is_text(series: pd.Series) -> bool:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return False
+    if pd.api.types.is_string_dtype(series.dtype):
+        return pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty')
+    return False
+
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    """Downcast float64 to float32 only if every value survives the round trip."""
+    values = series.to_numpy()
+    narrowed = values.astype(np.float32)
+    if np.array_equal(narrowed.astype(np.float64), values, equal_nan=True):
+        return pd.Series(narrowed, index=series.index, name=series.name)
+    return series
+
+
+def optimize_dataframe(df: pd.DataFrame, category_ratio: float = 0.5,
+                       min_category_rows: int = 50) -> pd.DataFrame:
+    """
+    Return a copy of df with compact column dtypes.
+
+    The sizes before and after are stored in df.attrs as
+    memory_bytes_before and memory_bytes_after.
+
+    Args:
+        df: Fetched query result
+        category_ratio: Text columns with at most this share of distinct
+            values become categoricals (default: 0.5)
+        min_category_rows: Minimum row count for categorical conversion (default: 50)
+
+    Returns:
+        Optimized DataFrame
+    """
+    before = dataframe_bytes(df)
+    optimized = df.copy(deep=False)
+
+    # Positional access keeps duplicate column names intact
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+
+        if pd.api.types.is_bool_dtype(series.dtype):
+            pass
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series.dtype) and series.dtype == np.float64:
+            series = _downcast_float(series)
+        elif _is_text(series):
+            non_null = series.count()
+            if len(series) >= min_category_rows and series.nunique() <= category_ratio * non_null:
+                series = series.astype('category')
+            elif series.dtype == object:
+                # pandas >= 3 already materializes text as Arrow-backed str
+                series = series.astype(STRING_DTYPE)
+
+        if series.dtype != df.dtypes.iloc[position]:
+            optimized.isetitem(position, series)
+
+    optimized.attrs['memory_bytes_before'] = before
+    optimized.attrs['memory_bytes_after'] = dataframe_bytes(optimized)
+    return optimized
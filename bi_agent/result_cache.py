@@ -0,0 +1,205 @@
+"""
+Result cache for SQL queries.
+
+This module caches query results (DataFrames) keyed by database, login and
+a normalized query fingerprint, so repeated or trivially different SELECTs
+from the agents do not hit SQL Server again. Memory is bounded by the total
+DataFrame size with LRU eviction and a per-entry TTL; an optional Parquet
+directory acts as a second tier that survives restarts.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy.engine import Engine
+
+from .db_config import engine_key, engine_user
+from .sql_lexer import fingerprint_sql
+
+
+def dataframe_bytes(df: pd.DataFrame) -> int:
+    """
+    Return the in-memory size of a DataFrame in bytes.
+
+    Args:
+        df: pandas DataFrame
+
+    Returns:
+        Size including the contents of object columns
+    """
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+class ResultCache:
+    """LRU cache of query results bounded by total DataFrame bytes."""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl: float = 300.0,
+                 disk_dir: Optional[str] = None, disk_ttl: float = 3600.0):
+        """
+        Initialize the result cache.
+
+        Args:
+            max_bytes: Memory budget for all cached DataFrames
+            ttl: Seconds a cached result stays valid in memory
+            disk_dir: Optional directory for the Parquet tier (requires pyarrow)
+            disk_ttl: Seconds a Parquet file stays valid
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_ttl = disk_ttl
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0,
+                      'disk_hits': 0, 'disk_errors': 0}
+
+    @staticmethod
+    def make_key(engine: Engine, query: str, max_rows: Optional[int] = None) -> str:
+        """
+        Build the cache key for a query.
+
+        Args:
+            engine: SQLAlchemy Engine the query runs against
+            query: SQL query text
+            max_rows: Row limit applied to the query
+
+        Returns:
+            Key combining database, login, row limit and query fingerprint
+            (logins with different permissions never share results)
+        """
+        return f"{engine_key(engine)}|{engine_user(engine)}|{max_rows}|{fingerprint_sql(query)}"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Key from make_key()
+
+        Returns:
+            Cached DataFrame (shallow copy) or None
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                df, size, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return df.copy(deep=False)
+
+                del self._entries[key]
+                self.total_bytes -= size
+                self.stats['expirations'] += 1
+
+        df = self._read_disk(key)
+        if df is not None:
+            self.stats['disk_hits'] += 1
+            self._store(key, df)
+            return df.copy(deep=False)
+
+        self.stats['misses'] += 1
+        return None
+
+    def put(self, key: str, df: pd.DataFrame):
+        """
+        Store a query result.
+
+        Results larger than the whole memory budget are not cached in memory.
+
+        Args:
+            key: Key from make_key()
+            df: Query result
+        """
+        self._store(key, df)
+        self._write_disk(key, df)
+
+    def _store(self, key: str, df: pd.DataFrame):
+        size = dataframe_bytes(df)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+
+            self._entries[key] = (df, size, time.monotonic() + self.ttl)
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is left untouched)."""
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def get_stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, misses, evictions, expirations, disk hits,
+            entry count, used bytes and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self.total_bytes
+
+        lookups = stats['hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _disk_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"result_{digest}.parquet")
+
+    def _read_disk(self, key: str) -> Optional[pd.DataFrame]:
+        if not self.disk_dir:
+            return None
+
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.disk_ttl:
+                os.remove(path)
+                return None
+            return pd.read_parquet(path)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self.stats['disk_errors'] += 1
+            return None
+
+    def _write_disk(self, key: str, df: pd.DataFrame):
+        if not self.disk_dir:
+            return
+
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            # Missing pyarrow or unsupported column types: memory tier only
+            self.stats['disk_errors'] += 1
+
+
+# Result cache (memory tier, plus Parquet files if RESULT_CACHE_DIR is set)
+result_cache = ResultCache(
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+    ttl=float(os.getenv("RESULT_CACHE_TTL", "300")),
+    disk_dir=os.getenv("RESULT_CACHE_DIR"),
+)
@@ -0,0 +1,130 @@
+"""
+Columnar result formats for tool responses.
+
+Query results are converted column by column (one vectorized tolist() per
+column) instead of building one Python dict per row. Results can also be
+exported as Arrow IPC bytes (requires pyarrow), and JSON is encoded with
+orjson when it is installed.
+"""
+
+import base64
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+RESULT_FORMATS = ('records', 'columnar', 'arrow')
+ARROW_AVAILABLE = pa is not None
+
+
+def column_values(series: pd.Series) -> List[Any]:
+    """
+    Convert a column into a JSON-friendly list in one vectorized step.
+
+    Missing values become None and datetimes become ISO 8601 strings.
+
+    Args:
+        series: pandas Series
+
+    Returns:
+        List of Python values
+    """
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if getattr(series.dtype, 'tz', None) is not None:
+            series = series.dt.tz_convert('UTC').dt.tz_localize(None)
+        raw = series.to_numpy(dtype='datetime64[us]')
+        missing = np.isnat(raw)
+        # Whole seconds print without a fraction; otherwise keep microseconds
+        unit = 's' if not (raw[~missing].view('int64') % 1_000_000).any() else 'us'
+        values = np.datetime_as_string(raw, unit=unit).astype(object)
+        values[missing] = None
+        return values.tolist()
+
+    if not series.hasnans:
+        return series.tolist()
+
+    values = series.to_numpy(dtype=object, na_value=None)
+    return values.tolist()
+
+
+def to_columnar(df: Optional[pd.DataFrame]) -> Dict[str, Any]:
+    """
+    Convert a DataFrame into column arrays plus schema.
+
+    Args:
+        df: Query result (None or empty for no rows)
+
+    Returns:
+        Dictionary with schema (list of {name, type}) and columns
+        (column name -> list of values)
+    """
+    if df is None:
+        return {'schema': [], 'columns': {}}
+
+    return {
+        'schema': [{'name': str(col), 'type': str(dtype)} for col, dtype in df.dtypes.items()],
+        'columns': {str(col): column_values(df[col]) for col in df.columns},
+    }
+
+
+def to_arrow_ipc(df: pd.DataFrame) -> Optional[bytes]:
+    """
+    Serialize a DataFrame as an Arrow IPC stream.
+
+    Args:
+        df: Query result
+
+    Returns:
+        IPC stream bytes, or None if pyarrow is not installed
+    """
+    if pa is None:
+        return None
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return str(value)
+
+
+def dumps_json(obj: Any, indent: bool = False) -> str:
+    """
+    Encode an object as JSON, using orjson when available.
+
+    Args:
+        obj: JSON-compatible object (numpy scalars, dates, decimals and bytes are converted)
+        indent: Whether to indent with two spaces
+
+    Returns:
+        JSON string
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_json_default, option=option).decode('utf-8')
+
+    if indent:
+        return json.dumps(obj, indent=2, default=_json_default)
+    return json.dumps(obj, separators=(',', ':'), default=_json_default)
@@ -0,0 +1,297 @@
+"""
+Spill-to-disk handles for large query results.
+
+Results above a size threshold are written batch by batch to a temporary
+Arrow IPC file instead of being held in the process. The returned
+SpilledResult memory-maps the file and reads only the columns and row
+ranges that are asked for. Files are tracked per session and removed when
+the session ends (and at interpreter exit). Requires pyarrow.
+"""
+
+import atexit
+import os
+import tempfile
+import threading
+import uuid
+from bisect import bisect_right
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+
+def _to_record_batch(df: pd.DataFrame, schema) -> "pa.RecordBatch":
+    """Convert a DataFrame batch to the file schema (later batches may infer other types)."""
+    try:
+        return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        table = pa.Table.from_pandas(df, preserve_index=False).cast(schema, safe=False)
+        return table.combine_chunks().to_batches()[0]
+
+
+class SpilledResult:
+    """Memory-mapped, read-only handle to a spilled query result."""
+
+    def __init__(self, path: str, manager: Optional["SpillManager"] = None):
+        """
+        Open a spilled result.
+
+        Args:
+            path: Arrow IPC file written by SpillManager
+            manager: Owning manager (notified on close)
+        """
+        self.path = path
+        self._manager = manager
+        self._source = pa.memory_map(path, 'r')
+        self._reader = pa.ipc.open_file(self._source)
+        self.schema = self._reader.schema
+        self.columns = list(self.schema.names)
+
+        # Row offset of every record batch, for row-range reads
+        self._offsets = [0]
+        for i in range(self._reader.num_record_batches):
+            self._offsets.append(self._offsets[-1] + self._reader.get_batch(i).num_rows)
+        self.row_count = self._offsets[-1]
+        self.closed = False
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the spill file in bytes."""
+        return os.path.getsize(self.path)
+
+    def read(self, columns: Optional[List[str]] = None, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read a column subset and row range.
+
+        Only the record batches overlapping the range are touched.
+
+        Args:
+            columns: Column names to read (default: all)
+            start: First row (inclusive)
+            stop: Last row (exclusive, default: end)
+
+        Returns:
+            DataFrame with the requested slice
+        """
+        if self.closed:
+            raise ValueError("Spilled result is closed")
+
+        stop = self.row_count if stop is None else min(stop, self.row_count)
+        start = max(0, start)
+        if start >= stop:
+            table = self.schema.empty_table()
+        else:
+            first = bisect_right(self._offsets, start) - 1
+            last = bisect_right(self._offsets, stop - 1) - 1
+            batches = [self._reader.get_batch(i) for i in range(first, last + 1)]
+            table = pa.Table.from_batches(batches, schema=self.schema)
+            table = table.slice(start - self._offsets[first], stop - start)
+
+        if columns is not None:
+            table = table.select(columns)
+        return table.to_pandas()
+
+    def head(self, n: int = 5) -> pd.DataFrame:
+        """
+        Read the first n rows.
+
+        Args:
+            n: Number of rows
+
+        Returns:
+            DataFrame with up to n rows
+        """
+        return self.read(stop=n)
+
+    def iter_batches(self, columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over the result one record batch at a time.
+
+        Args:
+            columns: Column names to read (default: all)
+
+        Returns:
+            Iterator of DataFrames
+        """
+        for i in range(self._reader.num_record_batches):
+            batch = self._reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select(columns)
+            yield batch.to_pandas()
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        return self.iter_batches()
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Load the whole result into memory.
+
+        Returns:
+            DataFrame with all rows
+        """
+        return self.read()
+
+    def close(self):
+        """Unmap and delete the spill file."""
+        if self.closed:
+            return
+        self.closed = True
+        self._source.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        if self._manager is not None:
+            self._manager._forget(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class SpillManager:
+    """Writes large results to temporary files and tracks them per session."""
+
+    def __init__(self, threshold_bytes: int = 64 * 1024 * 1024, spill_dir: Optional[str] = None):
+        """
+        Initialize the spill manager.
+
+        Args:
+            threshold_bytes: Results larger than this (in memory) are spilled
+            spill_dir: Directory for spill files (default: system temp directory)
+        """
+        self.threshold_bytes = threshold_bytes
+        self.spill_dir = spill_dir
+        self._sessions: Dict[str, List[SpilledResult]] = {}
+        self._lock = threading.Lock()
+        self.stats = {'spilled': 0, 'bytes_written': 0, 'cleaned_up': 0}
+
+    @property
+    def available(self) -> bool:
+        """Whether spilling is possible (pyarrow installed)."""
+        return pa is not None
+
+    def spill(self, batches: Iterable[pd.DataFrame], session_id: Optional[str] = None) -> SpilledResult:
+        """
+        Write DataFrame batches to a spill file.
+
+        Args:
+            batches: DataFrames with identical columns (consumed)
+            session_id: Session owning the file (default: process-wide)
+
+        Returns:
+            SpilledResult handle
+        """
+        if pa is None:
+            raise RuntimeError("Spilling results requires pyarrow")
+
+        spill_dir = self.spill_dir or tempfile.gettempdir()
+        os.makedirs(spill_dir, exist_ok=True)
+        path = os.path.join(spill_dir, f"bi_spill_{uuid.uuid4().hex}.arrow")
+
+        writer = None
+        schema = None
+        try:
+            with pa.OSFile(path, 'wb') as sink:
+                for df in batches:
+                    if writer is None:
+                        schema = pa.Schema.from_pandas(df, preserve_index=False)
+                        # Columns that are all NULL in the first batch are stored as text
+                        schema = pa.schema([
+                            field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                            for field in schema
+                        ]).remove_metadata()
+                        writer = pa.ipc.new_file(sink, schema)
+                    if len(df):
+                        writer.write_batch(_to_record_batch(df, schema))
+                if writer is None:
+                    writer = pa.ipc.new_file(sink, pa.schema([]))
+                writer.close()
+        except BaseException:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+
+        handle = SpilledResult(path, manager=self)
+        with self._lock:
+            self._sessions.setdefault(session_id or '', []).append(handle)
+            self.stats['spilled'] += 1
+            self.stats['bytes_written'] += handle.nbytes
+        return handle
+
+    def _forget(self, handle: SpilledResult):
+        with self._lock:
+            for handles in self._sessions.values():
+                if handle in handles:
+                    handles.remove(handle)
+                    self.stats['cleaned_up'] += 1
+                    break
+
+    def cleanup_session(self, session_id: Optional[str]) -> int:
+        """
+        Delete all spill files of a session.
+
+        Args:
+            session_id: Session whose results are released
+
+        Returns:
+            Number of files removed
+        """
+        with self._lock:
+            handles = self._sessions.pop(session_id or '', [])
+        for handle in handles:
+            handle._manager = None
+            handle.close()
+        with self._lock:
+            self.stats['cleaned_up'] += len(handles)
+        return len(handles)
+
+    def cleanup_all(self) -> int:
+        """
+        Delete all spill files.
+
+        Returns:
+            Number of files removed
+        """
+        with self._lock:
+            sessions = list(self._sessions)
+        return sum(self.cleanup_session(session_id) for session_id in sessions)
+
+    def get_stats(self) -> dict:
+        """
+        Return spill counters.
+
+        Returns:
+            Dictionary with spilled, bytes_written, cleaned_up, open handles
+            and sessions with open handles
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['open'] = sum(len(handles) for handles in self._sessions.values())
+            stats['sessions'] = sum(1 for handles in self._sessions.values() if handles)
+        return stats
+
+
+# Process-wide spill manager; files are removed at interpreter exit at the latest
+result_spill = SpillManager(
+    threshold_bytes=int(os.getenv("RESULT_SPILL_THRESHOLD_BYTES", str(64 * 1024 * 1024))),
+    spill_dir=os.getenv("RESULT_SPILL_DIR"),
+)
+atexit.register(result_spill.cleanup_all)
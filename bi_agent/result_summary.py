@@ -0,0 +1,318 @@
+"""
+Compact, single-pass summaries of query results for agent prompts.
+
+This module computes dtypes, sample rows, numeric statistics (quartiles
+from a bounded uniform sample), null counts and top-k values of categorical columns in one vectorized pass per batch
+(DataFrames and ResultStream batches alike) and encodes them as compact
+columnar JSON that fits a caller-supplied size budget.
+"""
+
+import datetime
+import decimal
+import json
+import math
+from typing import Any, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Candidate values kept per categorical column while streaming (top-k is approximate beyond this)
+TOP_VALUE_CAPACITY = 200
+
+# Numeric rows sampled for quartiles (exact up to this many rows, uniform sample beyond)
+QUANTILE_SAMPLE_ROWS = 10000
+
+
+def _merge_stats(a: dict, b: dict) -> dict:
+    """Merge running count/mean/M2/min/max statistics (Chan et al.)."""
+    index = a['count'].index.union(b['count'].index, sort=False)
+    a = {key: value.reindex(index) for key, value in a.items()}
+    b = {key: value.reindex(index) for key, value in b.items()}
+    for stats in (a, b):
+        for key in ('count', 'mean', 'm2'):
+            stats[key] = stats[key].fillna(0)
+
+    n = a['count'] + b['count']
+    delta = b['mean'] - a['mean']
+    weight_b = (b['count'] / n).fillna(0)
+    return {
+        'count': n,
+        'mean': a['mean'] + delta * weight_b,
+        'm2': a['m2'] + b['m2'] + (delta ** 2 * a['count'] * weight_b).fillna(0),
+        'min': pd.concat([a['min'], b['min']], axis=1).min(axis=1),
+        'max': pd.concat([a['max'], b['max']], axis=1).max(axis=1),
+    }
+
+
+def to_jsonable(value: Any, float_digits: int = 6) -> Any:
+    """
+    Convert a cell value into a compact JSON-compatible value.
+
+    Args:
+        value: Cell value (numpy/pandas scalars, dates, decimals, ...)
+        float_digits: Significant digits kept for floats
+
+    Returns:
+        JSON-serializable value (NaN/NaT become None)
+    """
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, bool) or isinstance(value, (int, str)):
+        return value
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            return None
+        return float(f"{value:.{float_digits}g}")
+    if isinstance(value, decimal.Decimal):
+        return to_jsonable(float(value), float_digits)
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    try:
+        if pd.isna(value):
+            return None
+    except (TypeError, ValueError):
+        pass
+    return str(value)
+
+
+class ResultSummarizer:
+    """Accumulates per-column statistics over one or more DataFrame batches."""
+
+    def __init__(self, keep_rows: int = 10, top_k: int = 5):
+        """
+        Initialize the summarizer.
+
+        Args:
+            keep_rows: Number of leading rows to keep as sample
+            top_k: Number of most frequent values reported per categorical column
+        """
+        self.keep_rows = keep_rows
+        self.top_k = top_k
+        self.columns: List[str] = []
+        self.dtypes = {}
+        self.row_count = 0
+        self._head_parts = []
+        self._kept = 0
+        self._nulls = None
+        self._stats = None
+        self._quantile_sample = None
+        self._sample_keys = np.empty(0)
+        self._rng = np.random.default_rng(0)
+        self._top_values = {}
+
+    def update(self, batch: pd.DataFrame):
+        """
+        Add a batch of rows.
+
+        Args:
+            batch: DataFrame with the same columns as previous batches
+        """
+        if not self.columns:
+            self.columns = batch.columns.tolist()
+            self.dtypes = {col: str(dtype) for col, dtype in batch.dtypes.items()}
+
+        if self._kept < self.keep_rows:
+            part = batch.head(self.keep_rows - self._kept)
+            self._head_parts.append(part)
+            self._kept += len(part)
+        self.row_count += len(batch)
+
+        nulls = batch.isna().sum()
+        self._nulls = nulls if self._nulls is None else self._nulls.add(nulls, fill_value=0)
+
+        numeric = batch.select_dtypes(include=['number'])
+        if not numeric.empty:
+            count = numeric.count()
+            batch_stats = {
+                'count': count,
+                'mean': numeric.mean().fillna(0),
+                'm2': (numeric.var(ddof=0) * count).fillna(0),
+                'min': numeric.min(),
+                'max': numeric.max(),
+            }
+            self._stats = batch_stats if self._stats is None else _merge_stats(self._stats, batch_stats)
+            self._sample_numeric(numeric)
+
+        categorical = batch.select_dtypes(include=['object', 'string', 'category', 'bool'])
+        for col in categorical.columns:
+            counts = categorical[col].value_counts(dropna=True)
+            if col in self._top_values:
+                counts = self._top_values[col].add(counts, fill_value=0)
+            self._top_values[col] = counts.nlargest(TOP_VALUE_CAPACITY)
+
+    def _sample_numeric(self, numeric: pd.DataFrame):
+        """Keep the QUANTILE_SAMPLE_ROWS rows with the smallest random keys (bottom-k sample)."""
+        keys = self._rng.random(len(numeric))
+        if self._quantile_sample is not None:
+            numeric = pd.concat([self._quantile_sample, numeric], ignore_index=True)
+            keys = np.concatenate([self._sample_keys, keys])
+        if len(numeric) > QUANTILE_SAMPLE_ROWS:
+            keep = np.argpartition(keys, QUANTILE_SAMPLE_ROWS)[:QUANTILE_SAMPLE_ROWS]
+            numeric = numeric.iloc[keep]
+            keys = keys[keep]
+        self._quantile_sample = numeric.reset_index(drop=True)
+        self._sample_keys = keys
+
+    def head(self) -> pd.DataFrame:
+        """
+        Return the kept leading rows.
+
+        Returns:
+            DataFrame with up to keep_rows rows
+        """
+        if not self._head_parts:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(self._head_parts, ignore_index=True)
+
+    def numeric_stats(self) -> Optional[pd.DataFrame]:
+        """
+        Return numeric statistics in df.describe() layout.
+
+        count, mean, std, min and max are exact; the quartiles are exact up
+        to QUANTILE_SAMPLE_ROWS rows and estimated from a uniform row sample
+        beyond that.
+
+        Returns:
+            DataFrame indexed by count, mean, std, min, 25%, 50%, 75%, max
+            (None without numeric columns)
+        """
+        if self._stats is None:
+            return None
+
+        n = self._stats['count']
+        quartiles = self._quantile_sample.quantile([0.25, 0.5, 0.75]).reindex(columns=n.index)
+        stats = pd.DataFrame({
+            'count': n,
+            'mean': self._stats['mean'].where(n > 0),
+            'std': (self._stats['m2'] / (n - 1)).where(n > 1) ** 0.5,
+            'min': self._stats['min'],
+            '25%': quartiles.loc[0.25],
+            '50%': quartiles.loc[0.5],
+            '75%': quartiles.loc[0.75],
+            'max': self._stats['max'],
+        }).T
+        return stats[[col for col in self.columns if col in stats.columns]]
+
+    def summary(self) -> dict:
+        """
+        Build the compact columnar summary.
+
+        Returns:
+            Dictionary with rows, cols, types, nulls, stats, top and sample
+            (sample holds one value list per column)
+        """
+        head = self.head()
+        stats = self.numeric_stats()
+
+        summary = {
+            'rows': self.row_count,
+            'cols': self.columns,
+            'types': [self.dtypes[col] for col in self.columns],
+            'nulls': [int(self._nulls.get(col, 0)) if self._nulls is not None else 0 for col in self.columns],
+            'stats': {},
+            'top': {},
+            'sample': [[to_jsonable(value) for value in head[col].tolist()] for col in self.columns],
+        }
+
+        if stats is not None:
+            for col in stats.columns:
+                summary['stats'][col] = {
+                    name: to_jsonable(stats.at[name, col]) for name in ('min', 'max', 'mean', 'std')
+                }
+
+        for col, counts in self._top_values.items():
+            top = counts.nlargest(self.top_k)
+            if top.empty or top.iloc[0] <= 1:
+                # All values unique so far: frequencies carry no information
+                continue
+            summary['top'][col] = [[to_jsonable(value), int(count)] for value, count in top.items()]
+
+        return summary
+
+
+def summarize_result(data: Any, keep_rows: int = 10, top_k: int = 5) -> ResultSummarizer:
+    """
+    Summarize a DataFrame or an iterable of DataFrame batches.
+
+    Args:
+        data: DataFrame or iterable of DataFrames (e.g. a ResultStream, consumed)
+        keep_rows: Number of leading rows to keep as sample
+        top_k: Number of most frequent values per categorical column
+
+    Returns:
+        Filled ResultSummarizer
+    """
+    summarizer = ResultSummarizer(keep_rows=keep_rows, top_k=top_k)
+    batches: Iterable[pd.DataFrame] = [data] if isinstance(data, pd.DataFrame) else data
+    for batch in batches:
+        summarizer.update(batch)
+    return summarizer
+
+
+def _dumps(summary: dict) -> str:
+    return json.dumps(summary, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def encode_summary(summary: dict, max_chars: int = 4000) -> str:
+    """
+    Encode a summary as compact JSON within a character budget.
+
+    The sample is shrunk first, then long text values are shortened, then
+    top-k lists and finally column details are dropped until it fits.
+
+    Args:
+        summary: Dictionary from ResultSummarizer.summary()
+        max_chars: Maximum length of the encoded string
+
+    Returns:
+        Compact JSON string
+    """
+    encoded = _dumps(summary)
+    if len(encoded) <= max_chars:
+        return encoded
+
+    summary = dict(summary)
+
+    # 1) fewer sample rows
+    sample = summary['sample']
+    rows = len(sample[0]) if sample else 0
+    while rows > 1 and len(encoded) > max_chars:
+        rows //= 2
+        summary['sample'] = [values[:rows] for values in sample]
+        encoded = _dumps(summary)
+
+    # 2) shorter text values
+    if len(encoded) > max_chars:
+        summary['sample'] = [
+            [value[:40] + '…' if isinstance(value, str) and len(value) > 40 else value for value in values]
+            for values in summary['sample']
+        ]
+        summary['top'] = {
+            col: [[value[:40] if isinstance(value, str) else value, count] for value, count in top]
+            for col, top in summary['top'].items()
+        }
+        encoded = _dumps(summary)
+
+    # 3) fewer top values, then no sample
+    for key, reduced in (('top', {col: top[:2] for col, top in summary['top'].items()}),
+                         ('top', {}), ('sample', [])):
+        if len(encoded) <= max_chars:
+            break
+        summary[key] = reduced
+        encoded = _dumps(summary)
+
+    # 4) drop trailing columns
+    while len(encoded) > max_chars and summary['cols']:
+        dropped = summary['cols'][-1]
+        summary['cols'] = summary['cols'][:-1]
+        summary['types'] = summary['types'][:-1]
+        summary['nulls'] = summary['nulls'][:-1]
+        summary['stats'] = {col: value for col, value in summary['stats'].items() if col != dropped}
+        summary['truncated_cols'] = summary.get('truncated_cols', 0) + 1
+        encoded = _dumps(summary)
+
+    return encoded
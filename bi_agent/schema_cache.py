@@ -0,0 +1,223 @@
+"""
+Schema introspection cache with change detection.
+
+This module keeps the parsed table/column model per server/database in memory
+so the expensive catalog join does not run on every agent tool call.
+Entries are revalidated with a cheap catalog fingerprint, refreshed
+incrementally for changed tables, evicted after an idle TTL and optionally
+persisted as JSON snapshots so a restart does not need a cold introspection.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.engine import Engine
+
+from .db_config import (
+    engine_key,
+    fetch_catalog_fingerprint,
+    fetch_schema_model,
+    fetch_table_modify_dates,
+)
+from .single_flight import SingleFlight
+
+SNAPSHOT_VERSION = 2
+
+
+class _CacheEntry:
+    """Cached schema model for one server/database."""
+
+    def __init__(self, tables: dict, modify_dates: dict, fingerprint: tuple):
+        self.tables = tables
+        self.modify_dates = modify_dates
+        self.fingerprint = fingerprint
+        self.checked_at = time.monotonic()
+        self.last_access = time.monotonic()
+        self.lock = threading.Lock()
+
+
+class SchemaCache:
+    """In-memory (and optionally on-disk) cache of database schema models."""
+
+    def __init__(self, check_interval: float = 60.0, ttl: float = 3600.0,
+                 snapshot_dir: Optional[str] = None, snapshot_dir_env: Optional[str] = None):
+        """
+        Initialize the schema cache.
+
+        Args:
+            check_interval: Seconds between catalog change checks for an entry
+            ttl: Seconds an entry may stay unused before it is evicted from memory
+            snapshot_dir: Optional directory for on-disk JSON snapshots
+            snapshot_dir_env: Environment variable read on use when no
+                snapshot_dir is given (so .env files loaded after import apply)
+        """
+        self.check_interval = check_interval
+        self.ttl = ttl
+        self._snapshot_dir = snapshot_dir
+        self.snapshot_dir_env = snapshot_dir_env
+        self._entries: Dict[str, _CacheEntry] = {}
+        self._lock = threading.Lock()
+        # Concurrent cold loads of one database share a single introspection
+        self._loads = SingleFlight()
+        self.stats = {'hits': 0, 'checks': 0, 'full_loads': 0,
+                      'incremental_refreshes': 0, 'snapshot_loads': 0, 'evictions': 0}
+
+    @property
+    def snapshot_dir(self) -> Optional[str]:
+        """Directory for on-disk snapshots (None = memory only)."""
+        if self._snapshot_dir is None and self.snapshot_dir_env:
+            return os.getenv(self.snapshot_dir_env) or None
+        return self._snapshot_dir
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def get_tables(self, engine: Engine) -> dict:
+        """
+        Return the table/column model for the engine's database.
+
+        Args:
+            engine: SQLAlchemy Engine object
+
+        Returns:
+            Dictionary mapping "schema.table" to {'columns': [...]}
+        """
+        key = engine_key(engine)
+        self.evict_expired()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._load_snapshot(key)
+                if entry is not None:
+                    # Snapshots are always revalidated against the catalog
+                    entry.checked_at = float('-inf')
+                    self._entries[key] = entry
+                    self.stats['snapshot_loads'] += 1
+
+        if entry is None:
+            return self._loads.do(key, self._full_load, engine, key)
+
+        with entry.lock:
+            entry.last_access = time.monotonic()
+            if time.monotonic() - entry.checked_at < self.check_interval:
+                self._count('hits')
+                return entry.tables
+
+            self._revalidate(engine, key, entry)
+            return entry.tables
+
+    def invalidate(self, engine: Engine = None):
+        """
+        Drop cached entries (all entries if no engine is given).
+
+        Args:
+            engine: Optional SQLAlchemy Engine whose entry should be dropped
+        """
+        with self._lock:
+            if engine is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(engine_key(engine), None)
+
+    def evict_expired(self):
+        """Evict entries that have not been accessed within the TTL."""
+        now = time.monotonic()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items()
+                       if now - entry.last_access > self.ttl]
+            for key in expired:
+                del self._entries[key]
+            self.stats['evictions'] += len(expired)
+
+    def _full_load(self, engine: Engine, key: str) -> dict:
+        """Introspect the whole catalog and store a new entry."""
+        with engine.connect() as connection:
+            fingerprint = fetch_catalog_fingerprint(connection)
+            modify_dates = fetch_table_modify_dates(connection)
+            tables = fetch_schema_model(connection)
+
+        entry = _CacheEntry(tables, modify_dates, fingerprint)
+        with self._lock:
+            self._entries[key] = entry
+            self.stats['full_loads'] += 1
+        self._save_snapshot(key, entry)
+        return tables
+
+    def _revalidate(self, engine: Engine, key: str, entry: _CacheEntry):
+        """Check the catalog fingerprint and refresh changed tables only."""
+        self._count('checks')
+        with engine.connect() as connection:
+            fingerprint = fetch_catalog_fingerprint(connection)
+            if fingerprint == entry.fingerprint:
+                entry.checked_at = time.monotonic()
+                return
+
+            modify_dates = fetch_table_modify_dates(connection)
+            changed = [name for name, modified in modify_dates.items()
+                       if entry.modify_dates.get(name) != modified]
+            refreshed = fetch_schema_model(connection, table_names=changed)
+
+        tables = {name: info for name, info in entry.tables.items() if name in modify_dates}
+        tables.update(refreshed)
+
+        # Keep the catalog ordering (schema, table) after merging
+        entry.tables = {name: tables[name] for name in sorted(tables, key=str.lower)}
+        entry.modify_dates = modify_dates
+        entry.fingerprint = fingerprint
+        entry.checked_at = time.monotonic()
+        self._count('incremental_refreshes')
+        self._save_snapshot(key, entry)
+
+    def _snapshot_path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.snapshot_dir, f"schema_{digest}.json")
+
+    def _save_snapshot(self, key: str, entry: _CacheEntry):
+        """Write the entry to disk (no-op without snapshot_dir)."""
+        if not self.snapshot_dir:
+            return
+
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'key': key,
+            'fingerprint': list(entry.fingerprint),
+            'modify_dates': entry.modify_dates,
+            'tables': entry.tables,
+        }
+        try:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            path = self._snapshot_path(key)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, default=str)
+            os.replace(tmp_path, path)
+        except OSError:
+            # The snapshot is only an optimization
+            pass
+
+    def _load_snapshot(self, key: str) -> Optional[_CacheEntry]:
+        """Read an entry from disk, if a matching snapshot exists."""
+        if not self.snapshot_dir:
+            return None
+
+        try:
+            with open(self._snapshot_path(key), encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if snapshot.get('version') != SNAPSHOT_VERSION or snapshot.get('key') != key:
+            return None
+
+        return _CacheEntry(snapshot['tables'], snapshot['modify_dates'],
+                           tuple(snapshot['fingerprint']))
+
+
+# Schema models per server/database (snapshots in SCHEMA_CACHE_DIR if set)
+schema_cache = SchemaCache(snapshot_dir_env="SCHEMA_CACHE_DIR")
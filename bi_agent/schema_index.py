@@ -0,0 +1,207 @@
+"""
+Question-aware schema pruning for SQL generation.
+
+This module builds a local BM25 index over table names, column names and
+data types of the schema model, so only the tables relevant to a question
+are put in front of the SQL-generation prompt.
+"""
+
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .db_config import format_table_block
+
+# Field weights: a hit in the table name counts more than a hit in a column
+TABLE_NAME_WEIGHT = 3
+COLUMN_NAME_WEIGHT = 1
+DATA_TYPE_WEIGHT = 1
+
+# Coarse type families so questions like "per date" match temporal columns
+TYPE_FAMILIES = {
+    'date': 'date', 'datetime': 'date', 'datetime2': 'date', 'smalldatetime': 'date',
+    'datetimeoffset': 'date', 'time': 'date',
+    'int': 'number', 'bigint': 'number', 'smallint': 'number', 'tinyint': 'number',
+    'decimal': 'number', 'numeric': 'number', 'float': 'number', 'real': 'number',
+    'money': 'number', 'smallmoney': 'number',
+    'char': 'text', 'varchar': 'text', 'nchar': 'text', 'nvarchar': 'text',
+    'text': 'text', 'ntext': 'text',
+}
+
+_IDENTIFIER_PARTS = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+_WORDS = re.compile(r'\w+')
+
+
+def _stem(token: str) -> str:
+    """Very light plural stemming (campaigns -> campaign, categories -> category)."""
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize_identifier(name: str) -> List[str]:
+    """
+    Split an identifier into lowercase search terms.
+
+    Handles snake_case, CamelCase and schema-qualified names.
+
+    Args:
+        name: Identifier such as "dbo.CampaignPerformance" or "ad_spend"
+
+    Returns:
+        List of terms, including the full lowercase identifier parts
+    """
+    terms = []
+    for part in re.split(r'[._\s]+', name):
+        if not part:
+            continue
+        terms.append(_stem(part.lower()))
+        pieces = _IDENTIFIER_PARTS.findall(part)
+        if len(pieces) > 1:
+            terms.extend(_stem(piece.lower()) for piece in pieces)
+    return terms
+
+
+def tokenize_question(question: str) -> List[str]:
+    """
+    Split a natural language question into search terms.
+
+    Args:
+        question: User question
+
+    Returns:
+        List of lowercase, lightly stemmed terms
+    """
+    terms = []
+    for word in _WORDS.findall(question):
+        terms.extend(tokenize_identifier(word))
+    return terms
+
+
+class SchemaIndex:
+    """BM25 inverted index over the tables of a schema model."""
+
+    def __init__(self, tables: Dict[str, dict], k1: float = 1.2, b: float = 0.75):
+        """
+        Build the index.
+
+        Args:
+            tables: Schema model mapping "schema.table" to {'columns': [...]}
+            k1: BM25 term frequency saturation parameter
+            b: BM25 length normalization parameter
+        """
+        self.tables = tables
+        self.k1 = k1
+        self.b = b
+        self.table_names = list(tables)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+
+        postings = defaultdict(list)
+        for doc_id, table_name in enumerate(self.table_names):
+            term_counts = defaultdict(int)
+            for term in tokenize_identifier(table_name):
+                term_counts[term] += TABLE_NAME_WEIGHT
+            for col in tables[table_name]['columns']:
+                for term in tokenize_identifier(col['name']):
+                    term_counts[term] += COLUMN_NAME_WEIGHT
+                data_type = str(col['type']).lower()
+                term_counts[data_type] += DATA_TYPE_WEIGHT
+                if data_type in TYPE_FAMILIES:
+                    term_counts[TYPE_FAMILIES[data_type]] += DATA_TYPE_WEIGHT
+
+            for term, count in term_counts.items():
+                postings[term].append((doc_id, count))
+            self.doc_lengths.append(sum(term_counts.values()))
+
+        self.postings = dict(postings)
+        self.avg_doc_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+    def search(self, question: str, top_k: int = 10) -> List[Tuple[str, float]]:
+        """
+        Rank tables by relevance to a question.
+
+        Args:
+            question: User's natural language question
+            top_k: Maximum number of tables to return
+
+        Returns:
+            List of (table_name, score) tuples with positive scores, best first
+        """
+        n_docs = len(self.table_names)
+        if n_docs == 0:
+            return []
+
+        scores = defaultdict(float)
+        for term in set(tokenize_question(question)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_doc_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        # Ties keep catalog order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.table_names[doc_id], score) for doc_id, score in ranked[:top_k]]
+
+    def select_tables(self, question: str, top_k: int = 10, max_chars: int = 8000) -> List[str]:
+        """
+        Select the most relevant tables whose formatted schema fits a budget.
+
+        Falls back to catalog order if no table matches the question.
+
+        Args:
+            question: User's natural language question
+            top_k: Maximum number of tables to select
+            max_chars: Character budget for the formatted table blocks
+                (roughly 4 characters per prompt token)
+
+        Returns:
+            List of selected table names, most relevant first
+        """
+        candidates = [name for name, _ in self.search(question, top_k=top_k)]
+        if not candidates:
+            candidates = self.table_names[:top_k]
+
+        selected = []
+        used = 0
+        for table_name in candidates:
+            size = len(format_table_block(table_name, self.tables[table_name]))
+            if used + size > max_chars:
+                continue
+            selected.append(table_name)
+            used += size
+
+        return selected
+
+    def format_for_question(self, question: str, top_k: int = 10, max_chars: int = 8000,
+                            selected: List[str] = None) -> str:
+        """
+        Format the pruned schema for a question as LLM context.
+
+        Args:
+            question: User's natural language question
+            top_k: Maximum number of tables to include
+            max_chars: Character budget for the table blocks
+            selected: Tables already chosen with select_tables() (skips the search)
+
+        Returns:
+            Formatted string containing the relevant part of the schema
+        """
+        if selected is None:
+            selected = self.select_tables(question, top_k=top_k, max_chars=max_chars)
+
+        schema_text = "Database Schema (tables relevant to the question):\n\n"
+        schema_text += "".join(format_table_block(name, self.tables[name]) for name in selected)
+
+        omitted = len(self.table_names) - len(selected)
+        if omitted > 0:
+            schema_text += f"\n... {omitted} less relevant tables omitted\n"
+
+        return schema_text
@@ -0,0 +1,199 @@
+"""
+Lifecycle management for the agent runners' in-memory sessions.
+
+Every pipeline run creates a session in the runner's InMemorySessionService
+whose event history stays in memory until it is deleted. The manager
+deletes sessions as soon as their run has finished, and as a safety net
+evicts sessions that have been idle longer than a TTL or exceed an LRU cap
+(e.g. runs whose cleanup never happened). The size of a sample of sessions
+is measured when they are released, and live/peak counters are kept, so the
+memory profile of the long-running UI process stays observable and flat.
+"""
+
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional
+
+from .agent import copywriter_runner, editor_runner, root_runner, strategist_runner
+
+
+class _TrackedSession:
+    """Bookkeeping for one live session."""
+
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.created_at = time.monotonic()
+        self.last_access = self.created_at
+        self.in_use = 0
+
+
+class SessionManager:
+    """Creates, tracks and deletes the sessions of one runner."""
+
+    def __init__(self, runner, app_name: str, ttl: float = 900.0, max_sessions: int = 1000,
+                 size_sample_every: int = 20):
+        """
+        Initialize the session manager.
+
+        Args:
+            runner: ADK runner whose session_service holds the sessions
+            app_name: App name the sessions are created under
+            ttl: Seconds an idle session may live before it is evicted
+            max_sessions: Maximum number of live sessions (least recently
+                used idle sessions are evicted beyond this)
+            size_sample_every: Measure the serialized size of every n-th
+                released session (0 = never; measuring costs O(history))
+        """
+        self.runner = runner
+        self.app_name = app_name
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.size_sample_every = size_sample_every
+        self._sessions: Dict[str, _TrackedSession] = {}
+        self.stats = {'created': 0, 'deleted': 0, 'expired': 0, 'evicted': 0, 'peak_live': 0,
+                      'measured': 0, 'released_bytes_total': 0, 'released_bytes_max': 0}
+
+    @property
+    def session_service(self):
+        return self.runner.session_service
+
+    async def create(self, user_id: str = "user", state: Optional[dict] = None):
+        """
+        Create a tracked session (evicting expired or surplus sessions first).
+
+        Args:
+            user_id: Owner of the session
+            state: Optional initial session state
+
+        Returns:
+            ADK Session
+        """
+        await self.evict()
+        session = await self.session_service.create_session(
+            app_name=self.app_name,
+            user_id=user_id,
+            state=state
+        )
+        self._sessions[session.id] = _TrackedSession(user_id)
+        self.stats['created'] += 1
+        self.stats['peak_live'] = max(self.stats['peak_live'], len(self._sessions))
+        return session
+
+    async def session_bytes(self, session_id: str) -> int:
+        """
+        Measure the serialized size of a live session (events and state).
+
+        Args:
+            session_id: Session to measure
+
+        Returns:
+            Size in bytes (0 if the session does not exist)
+        """
+        tracked = self._sessions.get(session_id)
+        if tracked is None:
+            return 0
+        session = await self.session_service.get_session(
+            app_name=self.app_name,
+            user_id=tracked.user_id,
+            session_id=session_id
+        )
+        if session is None:
+            return 0
+        return len(session.model_dump_json().encode('utf-8'))
+
+    async def release(self, session_id: str):
+        """
+        Delete a session once its pipeline run has completed.
+
+        Args:
+            session_id: Session to delete
+        """
+        tracked = self._sessions.get(session_id)
+        if tracked is None:
+            return
+
+        if self.size_sample_every and self.stats['deleted'] % self.size_sample_every == 0:
+            size = await self.session_bytes(session_id)
+            self.stats['measured'] += 1
+            self.stats['released_bytes_total'] += size
+            self.stats['released_bytes_max'] = max(self.stats['released_bytes_max'], size)
+        await self._delete(session_id)
+        self.stats['deleted'] += 1
+
+    async def _delete(self, session_id: str):
+        tracked = self._sessions.pop(session_id, None)
+        if tracked is None:
+            return
+        await self.session_service.delete_session(
+            app_name=self.app_name,
+            user_id=tracked.user_id,
+            session_id=session_id
+        )
+
+    async def evict(self):
+        """Delete idle sessions older than the TTL and least recently used ones beyond max_sessions."""
+        now = time.monotonic()
+        idle = [(tracked.last_access, session_id) for session_id, tracked in self._sessions.items()
+                if not tracked.in_use]
+
+        expired = [session_id for last_access, session_id in idle if now - last_access > self.ttl]
+        for session_id in expired:
+            await self._delete(session_id)
+        self.stats['expired'] += len(expired)
+
+        surplus = len(self._sessions) - self.max_sessions + 1
+        if surplus > 0:
+            candidates = sorted(item for item in idle if item[1] in self._sessions)
+            for _, session_id in candidates[:surplus]:
+                await self._delete(session_id)
+                self.stats['evicted'] += 1
+
+    @asynccontextmanager
+    async def session(self, user_id: str = "user", state: Optional[dict] = None):
+        """
+        Provide a session for one pipeline run and delete it afterwards.
+
+        The session is protected from eviction while the block runs and is
+        released even if the run fails or the client disconnects.
+
+        Args:
+            user_id: Owner of the session
+            state: Optional initial session state
+        """
+        session = await self.create(user_id, state)
+        tracked = self._sessions[session.id]
+        tracked.in_use += 1
+        try:
+            yield session
+        finally:
+            tracked.in_use -= 1
+            tracked.last_access = time.monotonic()
+            await self.release(session.id)
+
+    def get_stats(self) -> dict:
+        """
+        Return session counters.
+
+        Returns:
+            Dictionary with live, in_use, created, deleted, expired, evicted,
+            peak_live and the sizes of the measured released sessions
+            (measured, total, max, average in bytes)
+        """
+        stats = dict(self.stats)
+        stats['live'] = len(self._sessions)
+        stats['in_use'] = sum(1 for tracked in self._sessions.values() if tracked.in_use)
+        stats['released_bytes_avg'] = stats['released_bytes_total'] / stats['measured'] if stats['measured'] else 0.0
+        return stats
+
+
+SESSION_TTL = float(os.getenv("SESSION_TTL", "900"))
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+SESSION_SIZE_SAMPLE = int(os.getenv("SESSION_SIZE_SAMPLE", "20"))
+
+# Session managers of the UI's runners
+_LIMITS = dict(ttl=SESSION_TTL, max_sessions=SESSION_MAX, size_sample_every=SESSION_SIZE_SAMPLE)
+campaign_sessions = SessionManager(root_runner, "marketing_agent", **_LIMITS)
+editor_sessions = SessionManager(editor_runner, "marketing_editor", **_LIMITS)
+strategist_sessions = SessionManager(strategist_runner, "marketing_strategist", **_LIMITS)
+copywriter_sessions = SessionManager(copywriter_runner, "marketing_copywriter", **_LIMITS)
@@ -0,0 +1,113 @@
+"""
+Single-flight coalescing of concurrent identical calls.
+
+While a call for a key is in flight, later callers with the same key wait
+for the same future instead of running the work again. Errors are delivered
+to every waiter. Works for threads (do) and asyncio tasks (ado).
+"""
+
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def _raise(error: BaseException):
+    raise error
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'executions': 0, 'coalesced': 0}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for key and whether the caller leads."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                return future, False
+
+            future = Future()
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            self.stats['executions'] += 1
+            return future, True
+
+    def _run(self, key: str, future: Future, fn: Callable, *args, **kwargs):
+        """Run fn as leader and publish its outcome to all waiters."""
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs), or wait for an identical call in flight.
+
+        Args:
+            key: Identifies identical calls
+            fn: Function to run if no call for key is in flight
+
+        Returns:
+            Result of fn (shared by all callers of the same flight)
+
+        Raises:
+            Whatever fn raised, in every waiting caller
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, *args, **kwargs)
+        return future.result()
+
+    async def ado(self, key: str, fn: Callable, *args, executor: Optional[Executor] = None,
+                  timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Async variant of do(): the blocking fn runs on an executor.
+
+        Cancelling or timing out one waiter does not cancel the shared call;
+        the other waiters (sync or async) still receive its result.
+
+        Args:
+            key: Identifies identical calls
+            fn: Blocking function to run if no call for key is in flight
+            executor: Executor for fn (default: the loop's default executor)
+            timeout: Optional seconds to wait before raising TimeoutError
+
+        Returns:
+            Result of fn (shared by all callers of the same flight)
+        """
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            try:
+                loop.run_in_executor(executor, functools.partial(self._run, key, future, fn, *args, **kwargs))
+            except BaseException as e:
+                # e.g. executor shut down: release the waiters
+                self._run(key, future, _raise, e)
+
+        # shield() keeps a cancelled waiter from cancelling the shared future
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+
+    def in_flight(self) -> int:
+        """
+        Return the number of keys currently in flight.
+
+        Returns:
+            Number of running calls
+        """
+        with self._lock:
+            return len(self._calls)
+
+
+# Process-wide coalescer for SQL executions
+query_flights = SingleFlight()
@@ -5,25 +5,78 @@ This module provides safe SQL query execution with validation to prevent
 dangerous operations and ensure only SELECT queries are executed.
 """
 
-import re
+import asyncio
+import functools
+import itertools
+from collections import deque
+from concurrent.futures import Executor
+from functools import lru_cache
+from typing import Callable, Iterator, NamedTuple, Optional, Union
+
 import pandas as pd
-from sqlalchemy import text
+from sqlalchemy import bindparam, event, text
 from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+from .sql_lexer import ERROR, OPERATOR, QUOTED_IDENT, WORD, main_statement_start, significant_tokens, tokenize
+from .sql_rewrite import limit_rows, paginate
+from .result_cache import ResultCache, dataframe_bytes
+from .frame_memory import optimize_dataframe
+from .result_spill import SpilledResult, SpillManager
+from .extract_cache import ExtractCache
+from .admission import AdmissionController
+from .statement_cache import PreparedStatement, StatementCache, parameterize_sql
+from .single_flight import SingleFlight
+from .result_summary import summarize_result
 
 
 # Dangerous SQL keywords that should be blocked
 BLACKLIST_KEYWORDS = [
     'DROP', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE',
     'TRUNCATE', 'EXEC', 'EXECUTE', 'GRANT', 'REVOKE',
+    'MERGE', 'INTO', 'DBCC', 'OPENROWSET', 'OPENQUERY', 'OPENDATASOURCE',
     'sp_', 'xp_'  # System stored procedures
 ]
 
+# Entries ending with "_" block procedure names with that prefix in call position
+_BLOCKED_WORDS = {keyword.upper(): keyword for keyword in BLACKLIST_KEYWORDS if not keyword.endswith('_')}
+_BLOCKED_PREFIXES = tuple((keyword.upper(), keyword) for keyword in BLACKLIST_KEYWORDS if keyword.endswith('_'))
+
+# Words after which a (dotted) name is a call target or row source
+_CALL_POSITION_WORDS = ('FROM', 'JOIN', 'APPLY', 'EXEC', 'EXECUTE')
+
+
+def _identifier_name(token) -> str:
+    """Uppercased identifier text without [..] / ".." quoting."""
+    value = token.value[1:-1] if token.type == QUOTED_IDENT else token.value
+    return value.upper()
+
+
+def _in_call_position(tokens: list, i: int) -> bool:
+    """Whether the name at tokens[i] is called ("name(") or read from (FROM/JOIN/APPLY name)."""
+    if i + 1 < len(tokens) and tokens[i + 1].value == '(':
+        return True
+
+    # Walk back over a dotted prefix (master.dbo.name, master..name)
+    j = i - 1
+    while j >= 0 and (tokens[j].value == '.' or tokens[j].type in (WORD, QUOTED_IDENT)) \
+            and not tokens[j].is_keyword(*_CALL_POSITION_WORDS):
+        if tokens[j].value != '.' and tokens[j + 1].value != '.':
+            return False  # two names in a row: the previous one is not part of this name
+        j -= 1
+    return j >= 0 and tokens[j].is_keyword(*_CALL_POSITION_WORDS)
+
 
 def validate_sql(query: str) -> tuple[bool, str]:
     """
     Validate that SQL query is safe to execute.
 
-    Only SELECT statements are allowed. Blocks dangerous operations.
+    Only SELECT statements (optionally preceded by common table expressions)
+    are allowed. Blocks dangerous operations. The query is tokenized in one
+    pass, so keywords or semicolons inside string literals, comments and
+    [quoted] identifiers are ignored. sp_/xp_ names are only blocked where a
+    procedure could run (called or used as row source), so columns such as
+    sp_count stay valid. Verdicts are cached per query text.
 
     Args:
         query: SQL query string to validate
@@ -34,34 +87,410 @@ def validate_sql(query: str) -> tuple[bool, str]:
     if not query or not query.strip():
         return False, "Query is empty"
 
-    # Remove comments and normalize whitespace
-    query_clean = re.sub(r'--.*$', '', query, flags=re.MULTILINE)
-    query_clean = re.sub(r'/\*.*?\*/', '', query_clean, flags=re.DOTALL)
-    query_clean = query_clean.strip().upper()
+    return _validate_sql_cached(query)
 
-    # Check if query starts with SELECT
-    if not query_clean.startswith('SELECT'):
-        return False, "Only SELECT queries are allowed"
 
-    # Check for blacklisted keywords
-    for keyword in BLACKLIST_KEYWORDS:
-        # Use word boundaries to avoid false positives (e.g., "DELETE" in column name)
-        pattern = r'\b' + re.escape(keyword.upper()) + r'\b'
-        if re.search(pattern, query_clean):
-            return False, f"Dangerous keyword detected: {keyword}"
-
-    # Check for multiple statements (semicolon-separated)
-    # Allow semicolon at the end, but not in the middle
-    semicolons = [i for i, char in enumerate(query.strip()) if char == ';']
-    if semicolons:
-        # Only allow semicolon as the last character
-        if len(semicolons) > 1 or semicolons[0] != len(query.strip()) - 1:
+@lru_cache(maxsize=2048)
+def _validate_sql_cached(query: str) -> tuple[bool, str]:
+    """Validate a non-empty query (see validate_sql)."""
+    tokens = significant_tokens(tokenize(query))
+
+    for token in tokens:
+        if token.type == ERROR:
+            return False, f"Unterminated or invalid SQL near: {token.value[:20]}"
+
+    # Allow a single semicolon as the last token only
+    for i, token in enumerate(tokens):
+        if token.type == OPERATOR and token.value == ';' and i != len(tokens) - 1:
             return False, "Multiple statements not allowed"
 
+    # Skip common table expressions and leading parentheses
+    start = main_statement_start(tokens)
+    if start == -1:
+        return False, "Malformed WITH clause"
+    while start < len(tokens) and tokens[start].value == '(':
+        start += 1
+
+    if start >= len(tokens) or not tokens[start].is_keyword('SELECT'):
+        return False, "Only SELECT queries are allowed"
+
+    # Check for blacklisted keywords (unquoted words) and system procedures in call position
+    for i, token in enumerate(tokens):
+        if token.type not in (WORD, QUOTED_IDENT):
+            continue
+        if token.type == WORD and token.upper in _BLOCKED_WORDS:
+            return False, f"Dangerous keyword detected: {_BLOCKED_WORDS[token.upper]}"
+        name = _identifier_name(token)
+        for prefix, keyword in _BLOCKED_PREFIXES:
+            if name.startswith(prefix) and _in_call_position(tokens, i):
+                return False, f"Dangerous keyword detected: {keyword}"
+
     return True, ""
 
 
-def execute_query(engine: Engine, query: str, timeout: int = 30, max_rows: int = 1000) -> dict:
+class ResultStream:
+    """
+    Iterator over DataFrame batches of a running query.
+
+    Rows are fetched from the open cursor one batch at a time, so memory use
+    is bounded by the batch size and the first rows are available before
+    the last ones arrive. Batches read ahead by head() are kept and yielded
+    again by the iterator, so peeking never loses rows.
+    """
+
+    def __init__(self, connection, result, batch_size: int = 1000, max_bytes: Optional[int] = None,
+                 max_rows: Optional[int] = None, on_close: Optional[Callable[[], None]] = None):
+        """
+        Wrap an executed query.
+
+        Args:
+            connection: Open SQLAlchemy connection (closed when the stream ends)
+            result: CursorResult of the executed query
+            batch_size: Number of rows per DataFrame batch
+            max_bytes: Optional memory ceiling; fetching stops (and the stream
+                is marked truncated) once this many bytes have been produced
+            max_rows: Optional hard cap on the number of rows fetched
+            on_close: Optional callback run once the stream is closed
+        """
+        self._connection = connection
+        self._on_close = on_close
+        self._result = result
+        self._pending = deque()
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.max_rows = max_rows
+        self.columns = list(result.keys())
+        self.rows_fetched = 0
+        self.bytes_fetched = 0
+        self.truncated = False
+        self.exhausted = False
+
+    def _fetch_batch(self) -> Optional[pd.DataFrame]:
+        """Fetch the next batch from the cursor (None when done)."""
+        if self.exhausted:
+            return None
+
+        if self.max_bytes is not None and self.bytes_fetched >= self.max_bytes:
+            self.truncated = True
+            self.close()
+            return None
+
+        size = self.batch_size
+        if self.max_rows is not None:
+            size = min(size, self.max_rows - self.rows_fetched)
+            if size <= 0:
+                self.close()
+                return None
+
+        rows = self._result.fetchmany(size)
+        if not rows:
+            self.close()
+            return None
+
+        batch = pd.DataFrame.from_records(rows, columns=self.columns, coerce_float=True)
+        self.rows_fetched += len(batch)
+        self.bytes_fetched += int(batch.memory_usage(deep=True).sum())
+        return batch
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        while True:
+            if self._pending:
+                yield self._pending.popleft()
+                continue
+
+            batch = self._fetch_batch()
+            if batch is None:
+                return
+            yield batch
+
+    def head(self, n: int) -> pd.DataFrame:
+        """
+        Return the first n rows without consuming them.
+
+        Args:
+            n: Number of rows
+
+        Returns:
+            DataFrame with up to n rows
+        """
+        buffered = sum(len(batch) for batch in self._pending)
+        while buffered < n:
+            batch = self._fetch_batch()
+            if batch is None:
+                break
+            self._pending.append(batch)
+            buffered += len(batch)
+
+        if not self._pending:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(list(self._pending), ignore_index=True).head(n)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Consume the remaining batches into a single DataFrame.
+
+        Returns:
+            DataFrame with all remaining rows
+        """
+        batches = list(self)
+        if not batches:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(batches, ignore_index=True)
+
+    def close(self):
+        """Release the cursor and return the connection to the pool."""
+        if self.exhausted:
+            return
+        self.exhausted = True
+        try:
+            self._result.close()
+        finally:
+            try:
+                self._connection.close()
+            finally:
+                if self._on_close is not None:
+                    self._on_close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+def _reset_query_timeout(dbapi_connection, connection_record):
+    """Pool check-in hook: clear a query timeout before the connection is reused."""
+    if dbapi_connection is not None and getattr(dbapi_connection, 'timeout', 0):
+        dbapi_connection.timeout = 0
+
+
+def set_query_timeout(connection, timeout: Optional[int]):
+    """
+    Apply a query timeout to the pooled DBAPI connection (pyodbc).
+
+    The timeout is cleared again when the connection is returned to the
+    pool, so it never leaks to the next borrower (e.g. schema loads).
+
+    Args:
+        connection: Open SQLAlchemy connection
+        timeout: Timeout in seconds (None or 0 = no timeout)
+    """
+    dbapi_connection = connection.connection.dbapi_connection
+    if timeout and hasattr(dbapi_connection, 'timeout'):
+        pool = connection.engine.pool
+        if not event.contains(pool, 'checkin', _reset_query_timeout):
+            event.listen(pool, 'checkin', _reset_query_timeout)
+        dbapi_connection.timeout = timeout
+
+
+def _as_statement(query: Union[str, TextClause]) -> TextClause:
+    """Accept raw SQL text or an already prepared (parameter-bound) statement."""
+    return query if isinstance(query, TextClause) else text(query)
+
+
+def _prepare_statement(query: str, max_rows: Optional[int], statements: StatementCache) -> tuple:
+    """
+    Auto-parameterize a query and look up its shape in the statement cache.
+
+    Returns:
+        Tuple of (is_valid, error_message, statement with bound literals or None)
+    """
+    parameterized = parameterize_sql(query)
+    key = (parameterized.shape, max_rows)
+    prepared = statements.get(key)
+    if prepared is None:
+        # Literals cannot carry code, so the parameterized text validates the same
+        is_valid, error_msg = validate_sql(parameterized.text)
+        statement = None
+        if is_valid:
+            limited = limit_rows(parameterized.text, max_rows) if max_rows is not None else parameterized.text
+            # String literals keep their varchar/nvarchar type (part of the shape)
+            statement = text(limited).bindparams(
+                *(bindparam(name, type_=type_) for name, type_ in parameterized.types.items()))
+        prepared = PreparedStatement(is_valid, error_msg, statement)
+        statements.put(key, prepared)
+
+    if not prepared.valid:
+        return False, prepared.error, None
+    return True, "", prepared.statement.bindparams(**parameterized.params)
+
+
+def _fetch_frame(engine: Engine, query: Union[str, TextClause], timeout: int, max_rows: Optional[int],
+                 optimize_memory: bool = False) -> pd.DataFrame:
+    """Run a query and fetch at most max_rows rows into a DataFrame."""
+    with engine.connect() as connection:
+        set_query_timeout(connection, timeout)
+
+        result = connection.execute(_as_statement(query))
+        columns = list(result.keys())
+
+        # Stop fetching at max_rows even if the rewrite could not cap the query
+        rows = result.fetchall() if max_rows is None else result.fetchmany(max_rows)
+        result.close()
+
+    df = pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    return optimize_dataframe(df) if optimize_memory else df
+
+
+def _fetch_and_cache(engine: Engine, query: Union[str, TextClause], timeout: int, max_rows: Optional[int],
+                     cache: Optional[ResultCache], key: str, optimize_memory: bool = False) -> pd.DataFrame:
+    """Fetch a result and store it in the cache (if any)."""
+    df = _fetch_frame(engine, query, timeout, max_rows, optimize_memory)
+    if cache is not None:
+        cache.put(key, df)
+    return df
+
+
+def _result_key(engine: Engine, query: str, max_rows: Optional[int], optimize_memory: bool) -> str:
+    """Cache/single-flight key; optimized and plain materializations are kept apart."""
+    key = ResultCache.make_key(engine, query, max_rows)
+    return f"{key}|mem" if optimize_memory else key
+
+
+def _frame_result(df: pd.DataFrame, optimize_memory: bool) -> dict:
+    """Build the success result dict for a materialized DataFrame."""
+    result = {
+        'success': True,
+        'data': df,
+        'error': None,
+        'row_count': len(df),
+        'columns': df.columns.tolist()
+    }
+    if optimize_memory:
+        after = df.attrs.get('memory_bytes_after', dataframe_bytes(df))
+        result['memory_bytes_before'] = df.attrs.get('memory_bytes_before', after)
+        result['memory_bytes_after'] = after
+    return result
+
+
+def _open_stream(engine: Engine, query: Union[str, TextClause], timeout: int, batch_size: int,
+                 max_bytes: Optional[int], max_rows: Optional[int],
+                 admission: Optional[AdmissionController] = None, user: Optional[str] = None) -> ResultStream:
+    """Start a server-side cursor and wrap it in a ResultStream."""
+    # The query slot is held, like the connection, until the stream is closed
+    on_close = None
+    if admission is not None:
+        admission.acquire(user)
+        on_close = functools.partial(admission.release, user)
+
+    try:
+        # The connection stays checked out until the stream is exhausted or closed
+        connection = engine.connect().execution_options(
+            stream_results=True, max_row_buffer=batch_size
+        )
+        try:
+            set_query_timeout(connection, timeout)
+            result = connection.execute(_as_statement(query))
+        except Exception:
+            connection.close()
+            raise
+    except BaseException:
+        if on_close is not None:
+            on_close()
+        raise
+
+    return ResultStream(connection, result, batch_size=batch_size, max_bytes=max_bytes, max_rows=max_rows,
+                        on_close=on_close)
+
+
+def _run_admitted(admission: AdmissionController, user: Optional[str], fn: Callable, *args):
+    """Run fn(*args) while holding a query slot."""
+    with admission.admit(user):
+        return fn(*args)
+
+
+def _admitted(fn: Callable, admission: Optional[AdmissionController], user: Optional[str]) -> Callable:
+    """Wrap a blocking database call in admission control (if any)."""
+    if admission is None:
+        return fn
+    return functools.partial(_run_admitted, admission, user, fn)
+
+
+def _execute_spilling(engine: Engine, query: Union[str, TextClause], timeout: int, batch_size: int,
+                      max_rows: Optional[int], spill: SpillManager, session_id: Optional[str],
+                      admission: Optional[AdmissionController] = None, user: Optional[str] = None) -> dict:
+    """Fetch in batches; switch to a spill file once the threshold is crossed."""
+    with _open_stream(engine, query, timeout, batch_size, None, max_rows, admission, user) as stream:
+        batches = []
+        size = 0
+        for batch in stream:
+            batches.append(batch)
+            size += dataframe_bytes(batch)
+            if size > spill.threshold_bytes:
+                # Write what we have, then the rest of the stream, without holding it all
+                handle = spill.spill(itertools.chain(batches, stream), session_id=session_id)
+                batches.clear()
+                return {
+                    'success': True,
+                    'data': handle,
+                    'error': None,
+                    'row_count': len(handle),
+                    'columns': handle.columns,
+                    'spilled': True
+                }
+
+        df = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame(columns=stream.columns)
+
+    result = _frame_result(df, False)
+    result['spilled'] = False
+    return result
+
+
+def _extract_result(df: pd.DataFrame, optimize_memory: bool) -> dict:
+    """Build the result dict for a query answered from local extracts."""
+    if optimize_memory:
+        df = optimize_dataframe(df)
+    result = _frame_result(df, optimize_memory)
+    result['source'] = 'extract'
+    return result
+
+
+def _error_result(error: str) -> dict:
+    """Build the result dict of a failed query."""
+    return {
+        'success': False,
+        'data': None,
+        'error': error,
+        'row_count': 0,
+        'columns': []
+    }
+
+
+class _QueryPlan(NamedTuple):
+    """Validated, row-limited form of a query shared by the sync and async paths."""
+
+    error: Optional[str]                    # validation error (None if valid)
+    statement: Union[str, TextClause, None]  # row-limited query text or bound statement
+
+
+def _plan_query(query: str, max_rows: Optional[int], statements: Optional[StatementCache]) -> _QueryPlan:
+    """Validate a query and cap its rows (cached per literal-free shape with a statement cache)."""
+    if statements is not None:
+        is_valid, error_msg, prepared = _prepare_statement(query, max_rows, statements)
+        if not is_valid:
+            return _QueryPlan(f"SQL validation failed: {error_msg}", None)
+        return _QueryPlan(None, prepared)
+
+    is_valid, error_msg = validate_sql(query)
+    if not is_valid:
+        return _QueryPlan(f"SQL validation failed: {error_msg}", None)
+    # Cap the rows structurally (TOP / OFFSET-FETCH)
+    return _QueryPlan(None, limit_rows(query, max_rows) if max_rows is not None else query.strip().rstrip(';'))
+
+
+def execute_query(engine: Engine, query: str, timeout: int = 30, max_rows: Optional[int] = 1000,
+                  stream: bool = False, batch_size: int = 1000, max_bytes: Optional[int] = None,
+                  cache: Optional[ResultCache] = None, single_flight: Optional[SingleFlight] = None,
+                  optimize_memory: bool = False, spill: Optional[SpillManager] = None,
+                  session_id: Optional[str] = None, extracts: Optional[ExtractCache] = None,
+                  statements: Optional[StatementCache] = None, admission: Optional[AdmissionController] = None,
+                  user: Optional[str] = None) -> dict:
     """
     Execute SQL query safely and return results.
 
@@ -69,17 +498,189 @@ def execute_query(engine: Engine, query: str, timeout: int = 30, max_rows: int =
         engine: SQLAlchemy Engine object
         query: SQL query to execute
         timeout: Query timeout in seconds (default: 30)
-        max_rows: Maximum number of rows to return (default: 1000)
+        max_rows: Maximum number of rows to return (default: 1000, None = no limit)
+        stream: Return a ResultStream of DataFrame batches instead of one DataFrame
+        batch_size: Rows per batch in streaming mode (default: 1000)
+        max_bytes: Memory ceiling for streaming mode (default: None = no ceiling)
+        cache: Optional ResultCache to serve repeated queries from (not used for streams)
+        single_flight: Optional SingleFlight; concurrent identical queries then run
+            once and share the result (not used for streams)
+        optimize_memory: Materialize with compact dtypes (Arrow strings,
+            categoricals, downcast numerics; not used for streams)
+        spill: Optional SpillManager; results larger than its threshold are
+            written to disk while fetching and returned as a SpilledResult
+            (bypasses cache and single_flight)
+        session_id: Session owning spilled results (see SpillManager.cleanup_session)
+        extracts: Optional ExtractCache; queries that only read fresh extracted
+            tables are answered locally (not used for streams)
+        statements: Optional StatementCache; literals are then sent as bound
+            parameters (one server plan per query shape) and validation and
+            row limiting run once per shape
+        admission: Optional AdmissionController; database work waits for a
+            query slot (cache and extract hits do not need one) and is
+            rejected with an error when the queue is full or times out
+        user: User or session identifier for per-user admission quotas
 
     Returns:
         Dictionary with keys:
             - success: bool
-            - data: pandas DataFrame (if successful)
+            - data: pandas DataFrame, ResultStream in streaming mode or
+              SpilledResult for spilled results (if successful)
             - error: str (if failed)
-            - row_count: int
+            - row_count: int (None in streaming mode, see ResultStream.rows_fetched)
             - columns: list of column names
+            - memory_bytes_before / memory_bytes_after: int (with optimize_memory)
+            - spilled: bool (with spill)
+            - source: 'extract' (only when answered from local extracts)
+    """
+    plan = _plan_query(query, max_rows, statements)
+    if plan.error is not None:
+        return _error_result(plan.error)
+
+    try:
+        if extracts is not None and not stream:
+            df = extracts.execute(engine, query, max_rows)
+            if df is not None:
+                return _extract_result(df, optimize_memory)
+
+        if stream:
+            data = _open_stream(engine, plan.statement, timeout, batch_size, max_bytes, max_rows, admission, user)
+            return {
+                'success': True,
+                'data': data,
+                'error': None,
+                'row_count': None,
+                'columns': data.columns
+            }
+
+        if spill is not None and spill.available:
+            return _execute_spilling(engine, plan.statement, timeout, batch_size, max_rows, spill, session_id,
+                                     admission, user)
+
+        df = None
+        if cache is not None or single_flight is not None:
+            key = _result_key(engine, query, max_rows, optimize_memory)
+            if cache is not None:
+                df = cache.get(key)
+
+            if df is None and single_flight is not None:
+                # Only the leader of a flight takes a query slot
+                df = single_flight.do(key, _admitted(_fetch_and_cache, admission, user), engine, plan.statement,
+                                      timeout, max_rows, cache, key, optimize_memory)
+                # Every waiter gets its own (cheap) frame object
+                df = df.copy(deep=False)
+            elif df is None:
+                df = _admitted(_fetch_and_cache, admission, user)(engine, plan.statement, timeout, max_rows, cache,
+                                                                   key, optimize_memory)
+        else:
+            df = _admitted(_fetch_frame, admission, user)(engine, plan.statement, timeout, max_rows,
+                                                          optimize_memory)
+
+        return _frame_result(df, optimize_memory)
+
+    except Exception as e:
+        return _error_result(str(e))
+
+
+async def aexecute_query(engine: Engine, query: str, timeout: int = 30, max_rows: Optional[int] = 1000,
+                         cache: Optional[ResultCache] = None, single_flight: Optional[SingleFlight] = None,
+                         executor: Optional[Executor] = None, optimize_memory: bool = False,
+                         spill: Optional[SpillManager] = None, session_id: Optional[str] = None,
+                         batch_size: int = 1000, extracts: Optional[ExtractCache] = None,
+                         statements: Optional[StatementCache] = None,
+                         admission: Optional[AdmissionController] = None, user: Optional[str] = None) -> dict:
+    """
+    Async variant of execute_query() that never blocks the event loop.
+
+    Validation and row limiting are shared with execute_query(); the
+    database call runs on the given executor (see db_executor). The timeout
+    is applied to the query on the server and to the wait on the event loop;
+    cancelling the awaiting task releases the caller right away. Streaming
+    mode is not available here (a ResultStream would block the loop while
+    iterating); use spill for large results.
+
+    Args:
+        engine: SQLAlchemy Engine object
+        query: SQL query to execute
+        timeout: Query timeout in seconds (default: 30)
+        max_rows: Maximum number of rows to return (default: 1000, None = no limit)
+        cache: Optional ResultCache to serve repeated queries from
+        single_flight: Optional SingleFlight shared with synchronous callers
+        executor: Executor for the blocking work (default: the loop's default executor)
+        optimize_memory: Materialize with compact dtypes (see execute_query)
+        spill: Optional SpillManager for large results (see execute_query)
+        session_id: Session owning spilled results
+        batch_size: Rows fetched per batch when spilling (default: 1000)
+        extracts: Optional ExtractCache for locally answerable queries
+        statements: Optional StatementCache for auto-parameterization (see execute_query)
+        admission: Optional AdmissionController (the wait happens on the executor)
+        user: User or session identifier for per-user admission quotas
+
+    Returns:
+        Dictionary with the same keys as execute_query()
+    """
+    plan = _plan_query(query, max_rows, statements)
+    if plan.error is not None:
+        return _error_result(plan.error)
+
+    loop = asyncio.get_running_loop()
+    # Allow the server-side timeout to fire before the client gives up
+    wait_timeout = timeout + 5 if timeout else None
+    try:
+        if extracts is not None:
+            df = await loop.run_in_executor(executor, extracts.execute, engine, query, max_rows)
+            if df is not None:
+                return _extract_result(df, optimize_memory)
+
+        if spill is not None and spill.available:
+            future = loop.run_in_executor(executor, _execute_spilling, engine, plan.statement, timeout, batch_size,
+                                          max_rows, spill, session_id, admission, user)
+            return await asyncio.wait_for(future, wait_timeout)
+
+        key = _result_key(engine, query, max_rows, optimize_memory)
+        df = cache.get(key) if cache is not None else None
+        if df is None:
+            if single_flight is not None:
+                df = await single_flight.ado(key, _admitted(_fetch_and_cache, admission, user), engine,
+                                             plan.statement, timeout, max_rows, cache, key, optimize_memory,
+                                             executor=executor, timeout=wait_timeout)
+                df = df.copy(deep=False)
+            else:
+                future = loop.run_in_executor(executor, _admitted(_fetch_and_cache, admission, user), engine,
+                                              plan.statement, timeout, max_rows, cache, key, optimize_memory)
+                df = await asyncio.wait_for(future, wait_timeout)
+
+        return _frame_result(df, optimize_memory)
+
+    except (asyncio.TimeoutError, TimeoutError):
+        return _error_result(f"Query timed out after {timeout} seconds")
+
+    except Exception as e:
+        return _error_result(str(e))
+
+
+def execute_query_page(engine: Engine, query: str, page: int = 1, page_size: int = 100,
+                       timeout: int = 30) -> dict:
+    """
+    Execute SQL query and return a single page of results.
+
+    The page is selected on the server with OFFSET/FETCH, so fetching page N
+    does not transfer the rows of the previous pages. Add an ORDER BY on a
+    unique key to get stable pages.
+
+    Args:
+        engine: SQLAlchemy Engine object
+        query: SQL query to execute
+        page: 1-based page number (default: 1)
+        page_size: Rows per page (default: 100)
+        timeout: Query timeout in seconds (default: 30)
+
+    Returns:
+        Dictionary like execute_query() with additional keys:
+            - page: int
+            - page_size: int
+            - has_more: bool (whether a next page exists)
     """
-    # Validate query first
     is_valid, error_msg = validate_sql(query)
     if not is_valid:
         return {
@@ -87,38 +688,29 @@ def execute_query(engine: Engine, query: str, timeout: int = 30, max_rows: int =
             'data': None,
             'error': f"SQL validation failed: {error_msg}",
             'row_count': 0,
-            'columns': []
+            'columns': [],
+            'page': page,
+            'page_size': page_size,
+            'has_more': False
         }
 
     try:
-        # Add row limit if not already present
-        query_limited = query.strip().rstrip(';')
-
-        # Simple check if query already has TOP or LIMIT
-        query_upper = query_limited.upper()
-        if 'TOP' not in query_upper and 'LIMIT' not in query_upper:
-            # For SQL Server, we need to add TOP after SELECT
-            # This is a simple implementation - may need refinement for complex queries
-            if query_upper.startswith('SELECT DISTINCT'):
-                query_limited = query_limited[:15] + f' TOP {max_rows}' + query_limited[15:]
-            else:
-                query_limited = query_limited[:6] + f' TOP {max_rows}' + query_limited[6:]
-
-        # Execute query with timeout
-        with engine.connect() as connection:
-            # Set query timeout (SQL Server specific)
-            connection = connection.execution_options(timeout=timeout)
+        # Fetch one extra row to find out whether another page follows
+        query_page = paginate(query, offset=(max(page, 1) - 1) * page_size, limit=page_size + 1)
+        df = _fetch_frame(engine, query_page, timeout, page_size + 1)
+        has_more = len(df) > page_size
+        df = df.head(page_size)
 
-            # Execute and fetch results
-            df = pd.read_sql(text(query_limited), connection)
-
-            return {
-                'success': True,
-                'data': df,
-                'error': None,
-                'row_count': len(df),
-                'columns': df.columns.tolist()
-            }
+        return {
+            'success': True,
+            'data': df,
+            'error': None,
+            'row_count': len(df),
+            'columns': df.columns.tolist(),
+            'page': page,
+            'page_size': page_size,
+            'has_more': has_more
+        }
 
     except Exception as e:
         return {
@@ -126,59 +718,145 @@ def execute_query(engine: Engine, query: str, timeout: int = 30, max_rows: int =
             'data': None,
             'error': str(e),
             'row_count': 0,
-            'columns': []
+            'columns': [],
+            'page': page,
+            'page_size': page_size,
+            'has_more': False
         }
 
 
-def serialize_dataframe(df: pd.DataFrame, include_sample: bool = True, sample_rows: int = 5) -> str:
+def iter_batches(data: Union[pd.DataFrame, ResultStream, SpilledResult, None]) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over query results as DataFrame batches.
+
+    Args:
+        data: DataFrame (yielded as a single batch), ResultStream or SpilledResult
+
+    Returns:
+        Iterator of DataFrames
+    """
+    if data is None:
+        return
+    if isinstance(data, pd.DataFrame):
+        yield data
+    else:
+        yield from data
+
+
+def serialize_dataframe(df: Union[pd.DataFrame, ResultStream, SpilledResult], include_sample: bool = True,
+                        sample_rows: int = 5) -> str:
     """
     Serialize DataFrame to JSON string for agent state.
 
+    DataFrames and ResultStreams go through the same single-pass summarizer;
+    only the leading rows are kept in memory. For a SpilledResult only the
+    leading rows and the numeric columns are read from disk.
+
     Args:
-        df: pandas DataFrame to serialize
+        df: pandas DataFrame, ResultStream (consumed) or SpilledResult to serialize
         include_sample: Whether to include sample rows (default: True)
         sample_rows: Number of sample rows to include (default: 5)
 
     Returns:
         JSON string representation
     """
-    if df is None or df.empty:
+    if df is None or (isinstance(df, pd.DataFrame) and df.empty):
         return "{}"
 
+    if isinstance(df, SpilledResult):
+        return _serialize_spilled(df, include_sample, sample_rows)
+
+    summarizer = summarize_result(df, keep_rows=max(sample_rows, 101))
+    if summarizer.row_count == 0:
+        return "{}"
+
+    head = summarizer.head()
     result = {
-        'row_count': len(df),
-        'columns': df.columns.tolist(),
-        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'row_count': summarizer.row_count,
+        'columns': summarizer.columns,
+        'dtypes': summarizer.dtypes,
     }
 
     if include_sample:
         # Include first N rows as sample
-        sample_df = df.head(sample_rows)
-        result['sample_data'] = sample_df.to_dict(orient='records')
+        result['sample_data'] = head.head(sample_rows).to_dict(orient='records')
 
     # Full data for small datasets
-    if len(df) <= 100:
-        result['full_data'] = df.to_dict(orient='records')
+    if summarizer.row_count <= 100:
+        result['full_data'] = head.to_dict(orient='records')
     else:
         # For large datasets, only include summary statistics
-        numeric_cols = df.select_dtypes(include=['number']).columns.tolist()
+        stats = summarizer.numeric_stats()
+        if stats is not None:
+            result['summary_stats'] = stats.to_dict()
+
+    return pd.Series(result).to_json()
+
+
+def _serialize_spilled(handle: SpilledResult, include_sample: bool, sample_rows: int) -> str:
+    """serialize_dataframe() for a spilled result, reading only the needed slices."""
+    if len(handle) == 0:
+        return "{}"
+
+    head = handle.head(max(sample_rows, 101))
+    result = {
+        'row_count': len(handle),
+        'columns': handle.columns,
+        'dtypes': {col: str(dtype) for col, dtype in head.dtypes.items()},
+    }
+
+    if include_sample:
+        result['sample_data'] = head.head(sample_rows).to_dict(orient='records')
+
+    if len(handle) <= 100:
+        result['full_data'] = head.to_dict(orient='records')
+    else:
+        numeric_cols = head.select_dtypes(include=['number']).columns.tolist()
         if numeric_cols:
-            result['summary_stats'] = df[numeric_cols].describe().to_dict()
+            stats = summarize_result(handle.iter_batches(columns=numeric_cols), keep_rows=0).numeric_stats()
+            result['summary_stats'] = stats.to_dict()
 
     return pd.Series(result).to_json()
 
 
-def dataframe_to_markdown(df: pd.DataFrame, max_rows: int = 10) -> str:
+def dataframe_to_markdown(df: Union[pd.DataFrame, ResultStream, SpilledResult], max_rows: int = 10) -> str:
     """
     Convert DataFrame to markdown table for display.
 
+    For a ResultStream only the first max_rows rows are fetched; they stay
+    buffered in the stream, so it can still be iterated afterwards. For a
+    SpilledResult only the first max_rows rows are read from disk.
+
     Args:
-        df: pandas DataFrame
+        df: pandas DataFrame, ResultStream or SpilledResult
         max_rows: Maximum rows to display (default: 10)
 
     Returns:
         Markdown formatted table string
     """
+    if isinstance(df, SpilledResult):
+        if len(df) == 0:
+            return "*No data available*"
+
+        markdown = df.head(max_rows).to_markdown(index=False)
+        if len(df) > max_rows:
+            markdown += f"\n\n*Showing {max_rows} of {len(df)} rows*"
+        return markdown
+
+    if isinstance(df, ResultStream):
+        # Peek one extra row to know whether more rows follow
+        display_df = df.head(max_rows + 1)
+        if display_df.empty:
+            return "*No data available*"
+
+        markdown = display_df.head(max_rows).to_markdown(index=False)
+        if len(display_df) > max_rows:
+            if df.exhausted and not df.truncated:
+                markdown += f"\n\n*Showing {max_rows} of {df.rows_fetched} rows*"
+            else:
+                markdown += f"\n\n*Showing first {max_rows} rows (more rows are still loading)*"
+        return markdown
+
     if df is None or df.empty:
         return "*No data available*"
 
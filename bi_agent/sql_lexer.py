@@ -0,0 +1,267 @@
+"""
+Lightweight T-SQL lexer.
+
+This module splits a query into tokens in one linear pass and understands
+string literals, comments (including nested block comments) and quoted
+identifiers. It is the basis for SQL validation and rewriting, so keywords
+inside literals or identifiers are never mistaken for code.
+"""
+
+import hashlib
+import re
+from typing import List, NamedTuple
+
+# Token types
+WHITESPACE = 'whitespace'
+COMMENT = 'comment'
+STRING = 'string'
+QUOTED_IDENT = 'quoted_ident'
+NUMBER = 'number'
+WORD = 'word'
+OPERATOR = 'operator'
+ERROR = 'error'
+
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<whitespace>\s+)
+  | (?P<line_comment>--[^\n]*)
+  | (?P<block_comment>/\*)
+  | (?P<string>[Nn]?'(?:[^']|'')*')
+  | (?P<bracket>\[(?:[^\]]|\]\])*\])
+  | (?P<dquote>"(?:[^"]|"")*")
+  | (?P<number>0[xX][0-9a-fA-F]*|(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|\$(?:\d+\.?\d*|\.\d+))
+  | (?P<word>[^\W\d][\w@#$]*|[@#][\w@#$]*|\$[^\W\d]\w*)
+  | (?P<operator><>|!=|<=|>=|!<|!>|::|[-+*/%=<>!~&|^;,().:])
+  | (?P<unterminated>[Nn]?'|\[|")
+  | (?P<other>.)
+""", re.VERBOSE | re.DOTALL)
+
+# T-SQL reserved words and common clause words; only these are case-folded
+# when fingerprinting (identifiers may be case-sensitive under the collation)
+KEYWORDS = frozenset("""
+    ADD ALL ALTER AND ANY AS ASC AUTHORIZATION BACKUP BEGIN BETWEEN BREAK BROWSE BULK BY CASCADE CASE
+    CHECK CHECKPOINT CLOSE CLUSTERED COALESCE COLLATE COLUMN COMMIT COMPUTE CONSTRAINT CONTAINS
+    CONTAINSTABLE CONTINUE CONVERT CREATE CROSS CURRENT CURRENT_DATE CURRENT_TIME CURRENT_TIMESTAMP
+    CURRENT_USER CURSOR DATABASE DBCC DEALLOCATE DECLARE DEFAULT DELETE DENY DESC DISK DISTINCT
+    DISTRIBUTED DOUBLE DROP DUMP ELSE END ERRLVL ESCAPE EXCEPT EXEC EXECUTE EXISTS EXIT EXTERNAL FETCH
+    FILE FILLFACTOR FOR FOREIGN FREETEXT FREETEXTTABLE FROM FULL FUNCTION GOTO GRANT GROUP HAVING
+    HOLDLOCK IDENTITY IDENTITY_INSERT IDENTITYCOL IF IN INDEX INNER INSERT INTERSECT INTO IS JOIN KEY
+    KILL LEFT LIKE LINENO LOAD MERGE NATIONAL NOCHECK NONCLUSTERED NOT NULL NULLIF OF OFF OFFSETS ON
+    OPEN OPENDATASOURCE OPENQUERY OPENROWSET OPENXML OPTION OR ORDER OUTER OVER PERCENT PIVOT PLAN
+    PRECISION PRIMARY PRINT PROC PROCEDURE PUBLIC RAISERROR READ READTEXT RECONFIGURE REFERENCES
+    REPLICATION RESTORE RESTRICT RETURN REVERT REVOKE RIGHT ROLLBACK ROWCOUNT ROWGUIDCOL RULE SAVE
+    SCHEMA SECURITYAUDIT SELECT SEMANTICKEYPHRASETABLE SEMANTICSIMILARITYDETAILSTABLE
+    SEMANTICSIMILARITYTABLE SESSION_USER SET SETUSER SHUTDOWN SOME STATISTICS SYSTEM_USER TABLE
+    TABLESAMPLE TEXTSIZE THEN TO TOP TRAN TRANSACTION TRIGGER TRUNCATE TRY_CONVERT TSEQUAL UNION
+    UNIQUE UNPIVOT UPDATE UPDATETEXT USE USER VALUES VARYING VIEW WAITFOR WHEN WHERE WHILE WITH
+    WITHIN WRITETEXT
+    APPLY FIRST FOLLOWING JSON NEXT OFFSET ONLY PARTITION PRECEDING RANGE ROW ROWS TIES UNBOUNDED XML
+    AVG CAST COUNT COUNT_BIG MAX MIN SUM
+""".split())
+
+_GROUP_TYPES = {
+    'whitespace': WHITESPACE,
+    'line_comment': COMMENT,
+    'string': STRING,
+    'bracket': QUOTED_IDENT,
+    'dquote': QUOTED_IDENT,
+    'number': NUMBER,
+    'word': WORD,
+    'operator': OPERATOR,
+    'unterminated': ERROR,
+    'other': ERROR,
+}
+
+
+class Token(NamedTuple):
+    """A lexical token with its position in the query text."""
+
+    type: str
+    value: str
+    start: int
+    end: int
+
+    @property
+    def upper(self) -> str:
+        """Uppercased token text (keywords are case-insensitive)."""
+        return self.value.upper()
+
+    def is_keyword(self, *keywords: str) -> bool:
+        """Check whether this is an unquoted word matching one of the keywords."""
+        return self.type == WORD and self.value.upper() in keywords
+
+
+def _block_comment_end(sql: str, start: int) -> int:
+    """Return the end offset of a (possibly nested) block comment, -1 if unterminated."""
+    depth = 0
+    pos = start
+    length = len(sql)
+    while pos < length:
+        if sql.startswith('/*', pos):
+            depth += 1
+            pos += 2
+        elif sql.startswith('*/', pos):
+            depth -= 1
+            pos += 2
+            if depth == 0:
+                return pos
+        else:
+            pos += 1
+    return -1
+
+
+def tokenize(sql: str) -> List[Token]:
+    """
+    Split a query into tokens.
+
+    Unterminated strings, identifiers or comments and unknown characters
+    are returned as ERROR tokens instead of raising.
+
+    Args:
+        sql: Query text
+
+    Returns:
+        List of tokens covering the whole text
+    """
+    tokens = []
+    pos = 0
+    length = len(sql)
+
+    while pos < length:
+        match = _TOKEN_PATTERN.match(sql, pos)
+        kind = match.lastgroup
+
+        if kind == 'block_comment':
+            end = _block_comment_end(sql, pos)
+            if end == -1:
+                tokens.append(Token(ERROR, sql[pos:], pos, length))
+                break
+            tokens.append(Token(COMMENT, sql[pos:end], pos, end))
+            pos = end
+            continue
+
+        end = match.end()
+        tokens.append(Token(_GROUP_TYPES[kind], match.group(), pos, end))
+        pos = end
+
+    return tokens
+
+
+def significant_tokens(tokens: List[Token]) -> List[Token]:
+    """
+    Drop whitespace and comment tokens.
+
+    Args:
+        tokens: Tokens returned by tokenize()
+
+    Returns:
+        Tokens that carry meaning for the statement
+    """
+    return [token for token in tokens if token.type not in (WHITESPACE, COMMENT)]
+
+
+def matching_paren(tokens: List[Token], index: int) -> int:
+    """
+    Find the closing parenthesis for the opening one at tokens[index].
+
+    Args:
+        tokens: Significant tokens
+        index: Index of an opening "(" token
+
+    Returns:
+        Index of the matching ")" token, -1 if unbalanced
+    """
+    depth = 0
+    for i in range(index, len(tokens)):
+        value = tokens[i].value
+        if tokens[i].type != OPERATOR:
+            continue
+        if value == '(':
+            depth += 1
+        elif value == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+
+def main_statement_start(tokens: List[Token]) -> int:
+    """
+    Skip a leading WITH clause (common table expressions).
+
+    Args:
+        tokens: Significant tokens of one statement
+
+    Returns:
+        Index of the first token after the CTE list (0 without WITH clause),
+        -1 if the WITH clause is malformed
+    """
+    if not tokens or not tokens[0].is_keyword('WITH'):
+        return 0
+
+    i = 1
+    while True:
+        # CTE name
+        if i >= len(tokens) or tokens[i].type not in (WORD, QUOTED_IDENT):
+            return -1
+        i += 1
+
+        # Optional column list
+        if i < len(tokens) and tokens[i].value == '(':
+            i = matching_paren(tokens, i)
+            if i == -1:
+                return -1
+            i += 1
+
+        if i >= len(tokens) or not tokens[i].is_keyword('AS'):
+            return -1
+        i += 1
+
+        # CTE body
+        if i >= len(tokens) or tokens[i].value != '(':
+            return -1
+        i = matching_paren(tokens, i)
+        if i == -1:
+            return -1
+        i += 1
+
+        if i < len(tokens) and tokens[i].value == ',':
+            i += 1
+            continue
+        return i
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    Normalize a query for fingerprinting.
+
+    Comments, whitespace differences, keyword casing and a trailing
+    semicolon are removed; identifiers, literals and quoted identifiers are
+    kept verbatim, since they can be case-sensitive under the collation.
+
+    Args:
+        sql: Query text
+
+    Returns:
+        Normalized query text
+    """
+    tokens = significant_tokens(tokenize(sql))
+    if tokens and tokens[-1].value == ';':
+        tokens = tokens[:-1]
+    return ' '.join(token.upper if token.type == WORD and token.upper in KEYWORDS else token.value
+                    for token in tokens)
+
+
+def fingerprint_sql(sql: str) -> str:
+    """
+    Compute a stable fingerprint of a query.
+
+    Queries that differ only in whitespace, comments, keyword casing or a
+    trailing semicolon share the same fingerprint.
+
+    Args:
+        sql: Query text
+
+    Returns:
+        Hex digest identifying the normalized query
+    """
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()
@@ -0,0 +1,262 @@
+"""
+Structural rewrites of validated SELECT statements.
+
+This module caps the number of returned rows and adds OFFSET/FETCH paging
+based on the token structure of the query (see sql_lexer) instead of string
+positions, so it works for DISTINCT, CTEs, set operations (UNION, EXCEPT,
+INTERSECT) and columns whose names contain "TOP" or "LIMIT".
+"""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+from .sql_lexer import NUMBER, OPERATOR, Token, main_statement_start, significant_tokens, tokenize
+
+
+class QueryStructure(NamedTuple):
+    """Top-level layout of the main statement of a query."""
+
+    tokens: List[Token]
+    start: int                  # index of the first token of the main statement
+    simple_select: bool         # single SELECT, no set operation / parentheses
+    select_end: int             # index of SELECT, or of a following ALL/DISTINCT
+    distinct: bool              # SELECT DISTINCT
+    top: Optional[tuple]        # (first index, last index, literal index or None, percent)
+    order_by: Optional[int]     # index of the top-level ORDER keyword
+    offset: Optional[int]       # index of the top-level OFFSET keyword
+    fetch: Optional[int]        # index of the FETCH keyword following OFFSET
+    fetch_count: Optional[int]  # index of the literal row count after FETCH NEXT/FIRST
+    tail: int                   # index where trailing FOR XML/JSON or OPTION starts
+
+
+def analyze_query(query: str) -> Optional[QueryStructure]:
+    """
+    Analyze the top-level layout of the main statement of a query.
+
+    Args:
+        query: Validated SELECT query
+
+    Returns:
+        QueryStructure with token indices of TOP, ORDER BY, OFFSET/FETCH and
+        trailing clauses, or None if the query cannot be parsed
+    """
+    tokens = significant_tokens(tokenize(query))
+    if tokens and tokens[-1].value == ';':
+        tokens = tokens[:-1]
+
+    start = main_statement_start(tokens)
+    if start == -1 or start >= len(tokens):
+        return None
+
+    depth = 0
+    set_operation = False
+    order_by = offset = fetch = fetch_count = None
+    tail = len(tokens)
+
+    for i in range(start, len(tokens)):
+        token = tokens[i]
+        if token.type == OPERATOR and token.value == '(':
+            depth += 1
+        elif token.type == OPERATOR and token.value == ')':
+            depth -= 1
+        elif depth == 0:
+            if token.is_keyword('UNION', 'EXCEPT', 'INTERSECT'):
+                set_operation = True
+                order_by = offset = fetch = fetch_count = None
+            elif token.is_keyword('ORDER') and i + 1 < len(tokens) and tokens[i + 1].is_keyword('BY'):
+                order_by = i
+            elif token.is_keyword('OFFSET') and order_by is not None:
+                offset = i
+            elif token.is_keyword('FETCH') and offset is not None:
+                fetch = i
+            elif token.is_keyword('NEXT', 'FIRST') and fetch is not None \
+                    and i + 1 < len(tokens) and tokens[i + 1].type == NUMBER:
+                fetch_count = i + 1
+            elif token.is_keyword('OPTION') or (
+                    token.is_keyword('FOR') and i + 1 < len(tokens)
+                    and tokens[i + 1].is_keyword('XML', 'JSON', 'BROWSE')):
+                tail = i
+                break
+
+    simple_select = tokens[start].is_keyword('SELECT') and not set_operation
+
+    select_end = start
+    distinct = False
+    top = None
+    if simple_select:
+        i = start + 1
+        if i < len(tokens) and tokens[i].is_keyword('ALL', 'DISTINCT'):
+            distinct = tokens[i].is_keyword('DISTINCT')
+            select_end = i
+            i += 1
+        if i < len(tokens) and tokens[i].is_keyword('TOP'):
+            first = i
+            literal = None
+            if i + 1 < len(tokens) and tokens[i + 1].type == NUMBER:
+                literal, last = i + 1, i + 1
+            elif i + 3 < len(tokens) and tokens[i + 1].value == '(' \
+                    and tokens[i + 2].type == NUMBER and tokens[i + 3].value == ')':
+                literal, last = i + 2, i + 3
+            else:
+                last = i
+            percent = last + 1 < len(tokens) and tokens[last + 1].is_keyword('PERCENT')
+            top = (first, last, literal, percent)
+
+    return QueryStructure(tokens, start, simple_select, select_end, distinct, top,
+                          order_by, offset, fetch, fetch_count, tail)
+
+
+def _int_literal(token: Token) -> Optional[int]:
+    try:
+        return int(token.value)
+    except ValueError:
+        return None
+
+
+def _splice(query: str, structure: QueryStructure, edits: list) -> str:
+    """Apply (offset, remove_until, text) edits and cut the trailing semicolon."""
+    end = structure.tokens[-1].end if structure.tokens else 0
+    result = []
+    pos = 0
+    for offset, remove_until, new_text in sorted(edits):
+        result.append(query[pos:offset])
+        result.append(new_text)
+        pos = remove_until
+    result.append(query[pos:end])
+    return ''.join(result)
+
+
+def tail_offset(structure: QueryStructure) -> int:
+    """
+    Return the text offset where clauses appended to the statement have to go.
+
+    Args:
+        structure: Result of analyze_query()
+
+    Returns:
+        Offset after the last token before a trailing FOR XML/JSON or OPTION clause
+    """
+    tokens = structure.tokens
+    if structure.tail < len(tokens):
+        return tokens[structure.tail - 1].end
+    return tokens[-1].end
+
+
+def derived_table_parts(query: str) -> Optional[Tuple[str, str, str]]:
+    """
+    Split a SELECT so that its main statement can be wrapped as a derived table.
+
+    A top-level ORDER BY without TOP/OFFSET is dropped from the body, since
+    SQL Server does not allow it in a derived table.
+
+    Args:
+        query: Validated SELECT query
+
+    Returns:
+        Tuple of (leading WITH clause, statement body, trailing FOR XML/JSON or
+        OPTION clause with a leading space), or None if the query cannot be parsed
+    """
+    structure = analyze_query(query)
+    if structure is None:
+        return None
+
+    tokens = structure.tokens
+    body_start = tokens[structure.start].start
+    body_end = tail_offset(structure)
+    if structure.order_by is not None and structure.top is None and structure.offset is None:
+        body_end = tokens[structure.order_by - 1].end
+    tail = ""
+    if structure.tail < len(tokens):
+        tail = " " + query[tokens[structure.tail].start:tokens[-1].end]
+    return query[tokens[0].start:body_start], query[body_start:body_end], tail
+
+
+def limit_rows(query: str, max_rows: int) -> str:
+    """
+    Rewrite a SELECT so that it returns at most max_rows rows.
+
+    - Simple SELECT: adds TOP (n), or lowers an existing larger TOP/FETCH count.
+    - Set operations and parenthesized queries: adds OFFSET 0 ROWS FETCH NEXT n
+      ROWS ONLY (with ORDER BY 1 if the statement has no ORDER BY).
+    Shapes that cannot be rewritten safely (e.g. TOP ... PERCENT) are returned
+    unchanged; execute_query additionally stops fetching after max_rows rows.
+
+    Args:
+        query: Validated SELECT query
+        max_rows: Maximum number of rows
+
+    Returns:
+        Rewritten query without trailing semicolon
+    """
+    structure = analyze_query(query)
+    if structure is None:
+        return query.strip().rstrip(';')
+
+    tokens = structure.tokens
+    edits = []
+    limit_clause = f" OFFSET 0 ROWS FETCH NEXT {max_rows} ROWS ONLY"
+
+    if structure.fetch is not None:
+        if structure.fetch_count is not None:
+            token = tokens[structure.fetch_count]
+            value = _int_literal(token)
+            if value is None or value > max_rows:
+                edits.append((token.start, token.end, str(max_rows)))
+    elif structure.offset is not None:
+        # OFFSET without FETCH returns all remaining rows
+        edits.append((tail_offset(structure), tail_offset(structure),
+                      f" FETCH NEXT {max_rows} ROWS ONLY"))
+    elif structure.simple_select:
+        if structure.top is None:
+            position = tokens[structure.select_end].end
+            edits.append((position, position, f" TOP ({max_rows})"))
+        else:
+            first, last, literal, percent = structure.top
+            if literal is not None and not percent:
+                value = _int_literal(tokens[literal])
+                if value is None or value > max_rows:
+                    edits.append((tokens[literal].start, tokens[literal].end, str(max_rows)))
+    else:
+        if structure.order_by is None:
+            limit_clause = " ORDER BY 1" + limit_clause
+        edits.append((tail_offset(structure), tail_offset(structure), limit_clause))
+
+    return _splice(query, structure, edits)
+
+
+def paginate(query: str, offset: int, limit: int) -> str:
+    """
+    Rewrite a SELECT to return only rows [offset, offset + limit).
+
+    Uses OFFSET/FETCH. Without ORDER BY the page order is not guaranteed to
+    be stable across calls, so callers should order by a unique key.
+
+    Args:
+        query: Validated SELECT query
+        offset: Number of rows to skip
+        limit: Number of rows to return
+
+    Returns:
+        Rewritten query without trailing semicolon
+
+    Raises:
+        ValueError: If the query already limits its rows with TOP or OFFSET
+    """
+    structure = analyze_query(query)
+    if structure is None:
+        return query.strip().rstrip(';')
+
+    tokens = structure.tokens
+    paging = f" OFFSET {offset} ROWS FETCH NEXT {limit} ROWS ONLY"
+
+    if structure.offset is not None or structure.top is not None:
+        # Wrapping would need named, unique columns and would lose the inner order
+        raise ValueError("Queries with TOP or OFFSET/FETCH cannot be paginated; "
+                         "remove the row limit and add ORDER BY on a unique key")
+
+    if structure.order_by is None:
+        order = " ORDER BY (SELECT NULL)" if structure.simple_select and not structure.distinct \
+            else " ORDER BY 1"
+        paging = order + paging
+
+    position = tail_offset(structure)
+    return _splice(query, structure, [(position, position, paging)])
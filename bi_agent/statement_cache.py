@@ -0,0 +1,273 @@
+"""
+Auto-parameterization of SQL literals and a client-side statement cache.
+
+Agent-generated queries often differ only in their literals ("same query,
+different date"). Replacing the literals with bound parameters lets SQL
+Server reuse one plan per query shape, and the statement cache keyed by
+that shape lets execute_query skip validation and rewriting on repeats.
+"""
+
+import decimal
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy import String, Unicode
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.types import TypeEngine
+
+from .sql_lexer import NUMBER, OPERATOR, STRING, WORD, Token, significant_tokens, tokenize
+
+# Functions/types whose numeric arguments must stay literal (lengths, precision, styles)
+_LITERAL_ARGUMENT_WORDS = {
+    'CHAR', 'NCHAR', 'VARCHAR', 'NVARCHAR', 'BINARY', 'VARBINARY', 'DECIMAL', 'NUMERIC', 'FLOAT',
+    'DATETIME2', 'DATETIMEOFFSET', 'TIME', 'CONVERT', 'TRY_CONVERT', 'TABLESAMPLE',
+}
+
+
+class ParameterizedQuery(NamedTuple):
+    """A query with its literals replaced by bind parameters."""
+
+    text: str                  # executable text with :pN placeholders
+    shape: str                 # literal-free normalized shape (statement cache key)
+    params: Dict[str, Any]     # placeholder name -> literal value
+    types: Dict[str, TypeEngine]  # placeholder name -> bind type for string literals
+
+
+class PreparedStatement(NamedTuple):
+    """Cached outcome of validating and rewriting one query shape."""
+
+    valid: bool
+    error: str
+    statement: Optional[TextClause]  # row-limited statement, ready to execute
+
+
+def _literal_value(token: Token) -> Any:
+    """Python value of a STRING or NUMBER token."""
+    if token.type == STRING:
+        value = token.value[1:] if token.value[0] in 'Nn' else token.value
+        return value[1:-1].replace("''", "'")
+
+    if token.value.isdigit():
+        return int(token.value)
+    if 'e' in token.value.lower():
+        return float(token.value)
+    # Exact numeric literal, as SQL Server would treat it
+    return decimal.Decimal(token.value)
+
+
+def _keeps_literal(tokens: List[Token], i: int, literal_parens: List[bool], order_by_depth: Optional[int],
+                   depth: int) -> bool:
+    """Whether the literal at tokens[i] has to stay in the query text."""
+    token = tokens[i]
+    prev = tokens[i - 1] if i > 0 else None
+    following = tokens[i + 1] if i + 1 < len(tokens) else None
+
+    if token.type == NUMBER and (token.value[:2].lower() == '0x' or token.value.startswith('$')):
+        return True  # binary or money literal
+    if literal_parens and literal_parens[-1] and token.type == NUMBER:
+        return True  # varchar(50), decimal(10, 2), CONVERT style, TABLESAMPLE
+    if prev is not None and prev.is_keyword('TOP', 'OFFSET', 'NEXT', 'FIRST'):
+        return True
+    if prev is not None and prev.value == '(' and i > 1 and tokens[i - 2].is_keyword('TOP'):
+        return True
+    if following is not None and following.is_keyword('PRECEDING', 'FOLLOWING', 'ROWS', 'ROW', 'PERCENT'):
+        return True
+    if token.type == NUMBER and order_by_depth == depth and prev is not None \
+            and (prev.is_keyword('BY') or prev.value == ','):
+        # ORDER BY 1, 2 refers to select-list positions
+        return following is None or following.value in (',', ')', ';') \
+            or following.is_keyword('ASC', 'DESC', 'OFFSET', 'OPTION', 'FOR')
+    return False
+
+
+def _grouped_literals(tokens: List[Token]) -> Set[int]:
+    """
+    Positions of literals that must stay verbatim because the query groups.
+
+    SQL Server matches select-list, HAVING and ORDER BY expressions against
+    the GROUP BY expressions textually; LEFT(name, :p0) and LEFT(name, :p1)
+    are different expressions (error 8120). In every SELECT that has a GROUP
+    BY, only the literals in FROM/ON and WHERE are parameterized.
+    """
+    branches: List[dict] = []  # one per SELECT: grouped flag and (position, clause) of its literals
+    stack = []
+    current = None
+    clause = None
+    nested = 0  # function-call/list parens inside the current SELECT
+
+    for i, token in enumerate(tokens):
+        following = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token.type == OPERATOR and token.value == '(':
+            stack.append((current, clause, nested))
+            if following is not None and following.is_keyword('SELECT', 'WITH'):
+                current, clause, nested = None, None, 0
+            else:
+                nested += 1
+        elif token.type == OPERATOR and token.value == ')':
+            if stack:
+                current, clause, nested = stack.pop()
+        elif token.is_keyword('SELECT'):
+            branches.append({'grouped': False, 'literals': []})
+            current, clause, nested = len(branches) - 1, 'SELECT', 0
+        elif current is not None and nested == 0:
+            if token.is_keyword('GROUP', 'ORDER') and following is not None and following.is_keyword('BY'):
+                clause = token.upper
+                if clause == 'GROUP':
+                    branches[current]['grouped'] = True
+            elif token.is_keyword('FROM', 'WHERE', 'HAVING'):
+                clause = token.upper
+
+        if token.type in (STRING, NUMBER) and current is not None:
+            branches[current]['literals'].append((i, clause))
+
+    return {i for branch in branches if branch['grouped']
+            for i, clause in branch['literals'] if clause in ('SELECT', 'GROUP', 'HAVING', 'ORDER')}
+
+
+def parameterize_sql(query: str) -> ParameterizedQuery:
+    """
+    Replace string and numeric literals with bind parameters.
+
+    Literals that SQL Server requires verbatim stay in place: TOP/OFFSET/
+    FETCH counts, ORDER BY ordinals, window frame offsets, type lengths,
+    CONVERT styles, anything in trailing FOR XML/JSON or OPTION clauses and
+    the grouping expressions of GROUP BY queries. Every literal gets its own
+    parameter, so the placeholder layout depends on the shape alone and a
+    cached statement fits every query of that shape. String literals bind as
+    varchar, N'...' literals as nvarchar, so comparisons against varchar
+    columns need no implicit conversion.
+
+    Args:
+        query: SQL query text
+
+    Returns:
+        ParameterizedQuery with executable text, shape and parameters
+    """
+    tokens = significant_tokens(tokenize(query))
+    if tokens and tokens[-1].value == ';':
+        tokens = tokens[:-1]
+
+    params: Dict[str, Any] = {}
+    types: Dict[str, TypeEngine] = {}
+    grouped = _grouped_literals(tokens)
+    parts = []
+    shape = []
+    pos = 0
+    depth = 0
+    literal_parens: List[bool] = []
+    order_by_depth = None
+    tail = False
+
+    for i, token in enumerate(tokens):
+        if token.type == OPERATOR and token.value == '(':
+            prev = tokens[i - 1] if i > 0 else None
+            literal_parens.append(prev is not None and prev.type == WORD and prev.upper in _LITERAL_ARGUMENT_WORDS)
+            depth += 1
+        elif token.type == OPERATOR and token.value == ')':
+            if literal_parens:
+                literal_parens.pop()
+            depth -= 1
+            if order_by_depth is not None and depth < order_by_depth:
+                order_by_depth = None
+        elif token.is_keyword('ORDER') and i + 1 < len(tokens) and tokens[i + 1].is_keyword('BY'):
+            order_by_depth = depth
+        elif depth == 0 and (token.is_keyword('OPTION') or (
+                token.is_keyword('FOR') and i + 1 < len(tokens) and tokens[i + 1].is_keyword('XML', 'JSON'))):
+            tail = True
+
+        if token.type in (STRING, NUMBER) and not tail and i not in grouped \
+                and not _keeps_literal(tokens, i, literal_parens, order_by_depth, depth):
+            name = f"p{len(params)}"
+            params[name] = _literal_value(token)
+            marker = '?'
+            if token.type == STRING:
+                national = token.value[0] in 'Nn'
+                types[name] = Unicode() if national else String()
+                marker = 'N?' if national else '?'
+
+            parts.append(query[pos:token.start])
+            parts.append(f":{name}")
+            pos = token.end
+            shape.append(marker)
+        else:
+            shape.append(token.value)
+
+    end = tokens[-1].end if tokens else 0
+    parts.append(query[pos:end])
+    return ParameterizedQuery(''.join(parts), ' '.join(shape), params, types)
+
+
+class StatementCache:
+    """LRU cache of prepared statements keyed by parameterized query shape."""
+
+    def __init__(self, max_entries: int = 1024):
+        """
+        Initialize the statement cache.
+
+        Args:
+            max_entries: Maximum number of cached shapes
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key: tuple) -> Optional[PreparedStatement]:
+        """
+        Look up a prepared statement.
+
+        Args:
+            key: (shape, max_rows)
+
+        Returns:
+            PreparedStatement or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry
+
+    def put(self, key: tuple, entry: PreparedStatement):
+        """
+        Store a prepared statement.
+
+        Args:
+            key: (shape, max_rows)
+            entry: Validation outcome and row-limited statement
+        """
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        """Drop all cached statements."""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        """
+        Return cache counters.
+
+        Returns:
+            Dictionary with hits, misses, evictions, entries and hit rate
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+
+# Process-wide statement cache for auto-parameterized queries
+statement_cache = StatementCache(max_entries=int(os.getenv("STATEMENT_CACHE_SIZE", "1024")))
@@ -5,17 +5,28 @@ This module defines tools that agents can call to interact with the database,
 execute queries, and process results.
 """
 
+import base64
 import os
 import json
 import pandas as pd
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from dotenv import load_dotenv
-from .db_config import create_db_engine, get_schema_info
-from .sql_executor import execute_query, validate_sql
+from sqlalchemy.engine import Engine
 
-# Load environment variables
+# Load environment variables (before the shared caches and pools below read their settings on import)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
+from .db_config import get_schema_info
+from .engine_registry import get_engine
+from .sql_executor import aexecute_query, execute_query, validate_sql
+from .schema_cache import schema_cache
+from .result_cache import result_cache
+from .single_flight import query_flights
+from .db_executor import db_executor
+from .extract_cache import extract_cache
+from .admission import admission_controller
+from .result_format import ARROW_AVAILABLE, RESULT_FORMATS, dumps_json, to_arrow_ipc, to_columnar
+
 
 class DatabaseTools:
     """Tools for database operations that agents can use."""
@@ -30,9 +41,9 @@ class DatabaseTools:
             username: Database username
             password: Database password
         """
-        self.engine = create_db_engine(server, database, username, password)
+        self.engine = get_engine(server, database, username, password)
 
-    def execute_sql_query(self, sql_query: str) -> Dict[str, Any]:
+    def execute_sql_query(self, sql_query: str, result_format: str = "records") -> Dict[str, Any]:
         """
         Execute a SQL query and return the results.
 
@@ -41,41 +52,98 @@ class DatabaseTools:
 
         Args:
             sql_query: The SQL query to execute
+            result_format: "records" (list of row dicts), "columnar" (column
+                arrays plus schema, no per-row dicts) or "arrow" (base64 Arrow IPC)
 
         Returns:
             Dictionary containing:
                 - success: Boolean indicating if query succeeded
-                - data: List of dictionaries with query results
+                - data: Query results in the requested format
                 - columns: List of column names
                 - row_count: Number of rows returned
                 - error: Error message if query failed
+                - schema: List of {name, type} (columnar and arrow formats)
+        """
+        # Validate and execute the query (repeated queries come from the result cache)
+        result = execute_query(self.engine, sql_query, cache=result_cache, single_flight=query_flights,
+                               extracts=extract_cache, admission=admission_controller)
+        return _to_tool_response(result, result_format)
+
+    async def aexecute_sql_query(self, sql_query: str, timeout: int = 30,
+                                 result_format: str = "records") -> Dict[str, Any]:
         """
-        # Validate and execute the query
-        result = execute_query(self.engine, sql_query)
+        Async variant of execute_sql_query() that never blocks the event loop.
+
+        Args:
+            sql_query: The SQL query to execute
+            timeout: Query timeout in seconds (default: 30)
+            result_format: "records", "columnar" or "arrow" (see execute_sql_query)
 
-        if result['success']:
+        Returns:
+            Dictionary with the same keys as execute_sql_query()
+        """
+        result = await aexecute_query(self.engine, sql_query, timeout=timeout, cache=result_cache,
+                                      single_flight=query_flights, executor=db_executor,
+                                      extracts=extract_cache, admission=admission_controller)
+        return _to_tool_response(result, result_format)
+
+
+def _to_tool_response(result: Dict[str, Any], result_format: str = "records") -> Dict[str, Any]:
+    """Convert an execute_query() result into a JSON-serializable tool response."""
+    if result['success'] and result_format not in RESULT_FORMATS:
+        result = {'success': False, 'error': f"Unknown result_format: {result_format}"}
+    elif result['success'] and result_format == 'arrow' and not ARROW_AVAILABLE:
+        result = {'success': False, 'error': 'Arrow format requires pyarrow'}
+
+    if result['success']:
+        df = result['data']
+        response = {
+            'success': True,
+            'data': [],
+            'columns': result['columns'],
+            'row_count': result['row_count'],
+            'error': None
+        }
+
+        if result_format == 'columnar':
+            # Column arrays straight from the fetched frame, no per-row dicts
+            columnar = to_columnar(df)
+            response['data'] = columnar['columns']
+            response['schema'] = columnar['schema']
+        elif result_format == 'arrow':
+            if df is not None:
+                response['data'] = base64.b64encode(to_arrow_ipc(df)).decode('ascii')
+                response['schema'] = to_columnar(df.head(0))['schema']
+        elif df is not None and not df.empty:
             # Convert DataFrame to list of dicts for JSON serialization
-            df = result['data']
-            data_list = df.to_dict(orient='records') if df is not None else []
-
-            return {
-                'success': True,
-                'data': data_list,
-                'columns': result['columns'],
-                'row_count': result['row_count'],
-                'error': None
-            }
-        else:
-            return {
-                'success': False,
-                'data': [],
-                'columns': [],
-                'row_count': 0,
-                'error': result['error']
-            }
+            response['data'] = df.to_dict(orient='records')
+
+        return response
+    else:
+        return {
+            'success': False,
+            'data': [],
+            'columns': [],
+            'row_count': 0,
+            'error': result['error']
+        }
+
 
+def _get_env_engine() -> Optional[Engine]:
+    """Return the shared engine for the credentials in the environment (None if incomplete)."""
+    server = os.getenv("MSSQL_SERVER")
+    database = os.getenv("MSSQL_DATABASE")
+    username = os.getenv("MSSQL_USERNAME")
+    password = os.getenv("MSSQL_PASSWORD")
 
-def execute_sql_and_format(sql_query: str) -> str:
+    if not all([server, database, username, password]):
+        return None
+
+    # Reuse the shared pooled engine
+    return get_engine(server, database, username, password)
+
+
+def execute_sql_and_format(sql_query: str, result_format: str = "records") -> str:
     """
     Execute a SQL query against the configured database and return formatted results.
 
@@ -86,6 +154,8 @@ def execute_sql_and_format(sql_query: str) -> str:
 
     Args:
         sql_query: The SQL SELECT query to execute
+        result_format: "records" (indented list of row dicts), "columnar"
+            (compact column arrays plus schema) or "arrow" (base64 Arrow IPC)
 
     Returns:
         JSON string containing:
@@ -101,13 +171,8 @@ def execute_sql_and_format(sql_query: str) -> str:
         {"success": true, "data": [...], "row_count": 5}
     """
     try:
-        # Get database credentials from environment
-        server = os.getenv("MSSQL_SERVER")
-        database = os.getenv("MSSQL_DATABASE")
-        username = os.getenv("MSSQL_USERNAME")
-        password = os.getenv("MSSQL_PASSWORD")
-
-        if not all([server, database, username, password]):
+        engine = _get_env_engine()
+        if engine is None:
             return json.dumps({
                 'success': False,
                 'data': [],
@@ -116,37 +181,52 @@ def execute_sql_and_format(sql_query: str) -> str:
                 'error': 'Database credentials not configured in environment variables'
             })
 
-        # Create database engine
-        engine = create_db_engine(server, database, username, password)
+        # Execute query (repeated queries come from the result cache)
+        result = execute_query(engine, sql_query, cache=result_cache, single_flight=query_flights,
+                               extracts=extract_cache, admission=admission_controller)
 
-        # Execute query
-        result = execute_query(engine, sql_query)
+        return dumps_json(_to_tool_response(result, result_format), indent=result_format == 'records')
 
-        if result['success']:
-            # Convert DataFrame to list of dicts for JSON serialization
-            df = result['data']
-            data_list = df.to_dict(orient='records') if df is not None and not df.empty else []
-
-            response = {
-                'success': True,
-                'data': data_list,
-                'columns': result['columns'],
-                'row_count': result['row_count'],
-                'error': None
-            }
-        else:
-            response = {
+    except Exception as e:
+        return json.dumps({
+            'success': False,
+            'data': [],
+            'columns': [],
+            'row_count': 0,
+            'error': f'Tool error: {str(e)}'
+        })
+
+
+async def aexecute_sql_and_format(sql_query: str, result_format: str = "records") -> str:
+    """
+    Execute a SQL query against the configured database and return formatted results.
+
+    Async variant of execute_sql_and_format(): the query runs on the bounded
+    database executor, so it never blocks the event loop.
+
+    Args:
+        sql_query: The SQL SELECT query to execute
+        result_format: "records", "columnar" or "arrow" (see execute_sql_and_format)
+
+    Returns:
+        JSON string with the same keys as execute_sql_and_format()
+    """
+    try:
+        engine = _get_env_engine()
+        if engine is None:
+            return json.dumps({
                 'success': False,
                 'data': [],
                 'columns': [],
                 'row_count': 0,
-                'error': result['error']
-            }
+                'error': 'Database credentials not configured in environment variables'
+            })
 
-        # Close engine
-        engine.dispose()
+        result = await aexecute_query(engine, sql_query, cache=result_cache,
+                                      single_flight=query_flights, executor=db_executor,
+                                      extracts=extract_cache, admission=admission_controller)
 
-        return json.dumps(response, indent=2)
+        return dumps_json(_to_tool_response(result, result_format), indent=result_format == 'records')
 
     except Exception as e:
         return json.dumps({
@@ -180,25 +260,24 @@ def get_database_schema() -> str:
           ...
     """
     try:
-        # Get database credentials from environment
-        server = os.getenv("MSSQL_SERVER")
-        database = os.getenv("MSSQL_DATABASE")
-        username = os.getenv("MSSQL_USERNAME")
-        password = os.getenv("MSSQL_PASSWORD")
-
-        if not all([server, database, username, password]):
+        engine = _get_env_engine()
+        if engine is None:
             return "Error: Database credentials not configured in environment variables"
 
-        # Create database engine
-        engine = create_db_engine(server, database, username, password)
-
         # Get schema info
-        schema_info = get_schema_info(engine, max_tables=20)
-
-        # Close engine
-        engine.dispose()
-
-        return schema_info
+        return get_schema_info(engine, max_tables=20, cache=schema_cache)
 
     except Exception as e:
         return f"Error retrieving schema: {str(e)}"
+
+
+async def aget_database_schema() -> str:
+    """
+    Retrieve database schema information for SQL query generation.
+
+    Async variant of get_database_schema() running on the database executor.
+
+    Returns:
+        Formatted string containing database schema information
+    """
+    return await db_executor.run(get_database_schema)
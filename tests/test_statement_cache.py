@@ -0,0 +1,46 @@
+from sqlalchemy import String, Unicode
+
+from bi_agent.sql_executor import _prepare_statement
+from bi_agent.statement_cache import StatementCache, parameterize_sql
+
+
+def test_group_by_expressions_stay_literal():
+    query = ("SELECT LEFT(name, 3) AS prefix, COUNT(*) FROM customers WHERE region = 'EU' "
+             "GROUP BY LEFT(name, 3) HAVING COUNT(*) > 10 ORDER BY LEFT(name, 3)")
+
+    parameterized = parameterize_sql(query)
+
+    assert parameterized.text.count('LEFT(name, 3)') == 3
+    assert 'HAVING COUNT(*) > 10' in parameterized.text
+    assert parameterized.params == {'p0': 'EU'}
+
+
+def test_grouped_case_expression_stays_literal():
+    case = "CASE WHEN amount > 100 THEN 'large' ELSE 'small' END"
+    query = f"SELECT {case} AS size, SUM(amount) FROM orders WHERE year = 2024 GROUP BY {case}"
+
+    parameterized = parameterize_sql(query)
+
+    assert parameterized.text.count(case) == 2
+    assert parameterized.params == {'p0': 2024}
+
+
+def test_subquery_grouping_is_scoped_to_its_select():
+    parameterized = parameterize_sql(
+        "SELECT id FROM t WHERE k IN (SELECT k FROM u WHERE y = 3 GROUP BY k HAVING COUNT(*) > 2) AND z = 'q'")
+
+    assert parameterized.params == {'p0': 3, 'p1': 'q'}
+    assert 'COUNT(*) > 2' in parameterized.text
+
+
+def test_string_literals_bind_as_varchar_unless_national():
+    parameterized = parameterize_sql("SELECT id FROM t WHERE code = 'x' AND label = N'ü'")
+
+    assert isinstance(parameterized.types['p0'], String)
+    assert not isinstance(parameterized.types['p0'], Unicode)
+    assert isinstance(parameterized.types['p1'], Unicode)
+
+    _, _, statement = _prepare_statement("SELECT id FROM t WHERE code = 'y' AND label = N'z'", 10, StatementCache())
+    binds = statement._bindparams
+    assert (binds['p0'].value, type(binds['p0'].type)) == ('y', String)
+    assert (binds['p1'].value, type(binds['p1'].type)) == ('z', Unicode)